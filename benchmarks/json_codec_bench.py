@@ -0,0 +1,118 @@
+# benchmarks/json_codec_bench.py
+"""
+JSON ayrıştırma benchmark'ı: stdlib json ve orjson (kuruluysa)
+
+Gerçekçi yükler:
+    update_message    belge ekli Telegram mesaj update'i (Excel yüklemesi)
+    update_callback   inline buton callback update'i
+    groups            data/groups/groups.json
+
+Her yük için her backend'in loads süresi (mikrosaniye, --repeat içinde en
+iyisi) ve utils.json_codec'in seçtiği backend JSON olarak yazılır.
+
+Kullanım:
+    python -m benchmarks.json_codec_bench --number 20000
+"""
+import argparse
+import json
+import timeit
+from pathlib import Path
+
+from utils import json_codec
+
+GROUPS_FILE = Path(__file__).resolve().parent.parent / "data" / "groups" / "groups.json"
+
+_USER = {
+    "id": 123456789,
+    "is_bot": False,
+    "first_name": "Hıdır",
+    "last_name": "Öztürk",
+    "username": "hidir_ozturk",
+    "language_code": "tr",
+}
+
+UPDATE_MESSAGE = {
+    "update_id": 912345678,
+    "message": {
+        "message_id": 4521,
+        "from": _USER,
+        "chat": {"id": 123456789, "first_name": "Hıdır", "last_name": "Öztürk",
+                 "username": "hidir_ozturk", "type": "private"},
+        "date": 1729350000,
+        "document": {
+            "file_name": "Ekim_hasar_listesi_şube_dağıtım.xlsx",
+            "mime_type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            "file_id": "BQACAgQAAxkBAAIRaWcT" + "x" * 48,
+            "file_unique_id": "AgADaRUAAlVZoVA",
+            "file_size": 1834211,
+        },
+        "caption": "Ekim ayı listesi, gruplara dağıtılsın",
+    },
+}
+
+UPDATE_CALLBACK = {
+    "update_id": 912345679,
+    "callback_query": {
+        "id": "5302934873412345678",
+        "from": _USER,
+        "message": {
+            "message_id": 4522,
+            "from": {"id": 7000000001, "is_bot": True, "first_name": "Kova", "username": "kova_bot"},
+            "chat": {"id": 123456789, "first_name": "Hıdır", "type": "private"},
+            "date": 1729350010,
+            "text": "📊 Yönetici paneli",
+            "reply_markup": {"inline_keyboard": [
+                [{"text": "📈 İstatistikler", "callback_data": "admin_stats"},
+                 {"text": "📋 Loglar", "callback_data": "admin_logs"}],
+                [{"text": "👥 Gruplar", "callback_data": "admin_groups"}],
+            ]},
+        },
+        "chat_instance": "-4820394857320948573",
+        "data": "admin_stats",
+    },
+}
+
+
+def payloads() -> dict:
+    result = {
+        "update_message": json.dumps(UPDATE_MESSAGE, ensure_ascii=False).encode("utf-8"),
+        "update_callback": json.dumps(UPDATE_CALLBACK, ensure_ascii=False).encode("utf-8"),
+    }
+    if GROUPS_FILE.exists():
+        result["groups"] = GROUPS_FILE.read_bytes()
+    return result
+
+
+def backends() -> dict:
+    found = {"json": json.loads}
+    try:
+        import orjson
+        found["orjson"] = orjson.loads
+    except ImportError:
+        pass
+    return found
+
+
+def run(number: int, repeat: int) -> dict:
+    report = {"selected_backend": json_codec.BACKEND, "number": number, "payloads": {}}
+    for name, data in payloads().items():
+        entry = {"bytes": len(data)}
+        for backend, loads in backends().items():
+            best = min(timeit.repeat(lambda: loads(data), number=number, repeat=repeat))
+            entry[f"{backend}_us"] = round(best / number * 1e6, 2)
+        if "orjson_us" in entry and entry["orjson_us"] > 0:
+            entry["speedup"] = round(entry["json_us"] / entry["orjson_us"], 2)
+        report["payloads"][name] = entry
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON codec benchmark'ı")
+    parser.add_argument("--number", type=int, default=20000, help="Tekrar başına çağrı sayısı")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.number, args.repeat), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
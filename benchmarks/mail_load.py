@@ -0,0 +1,209 @@
+# benchmarks/mail_load.py
+"""
+utils/mailer yük testi (gerçek mail gönderilmez)
+
+Süreç içinde bir SMTPSink başlatır, mailer'ı ona yönlendirir ve iki modda
+yük üretir:
+    direct   --messages adet send_email_with_attachment çağrısı, aynı anda
+             en fazla --concurrency tanesi çalışır
+    fanout   sentetik bir Excel ile process_excel görevinin ayır + grup
+             mailleri + toplu mail akışı (alıcılar groups.json'dan, hepsi sink'e);
+             toplam süreye temizleme/ayırma da dahildir. Mailler outbox üzerinden
+             gider
+
+Mail süresi her mesaj için ayrı ölçülür: direct modunda çağrının süresi
+(tekrar beklemeleri dahil, çağıranın gördüğü süre), fanout modunda teslimatın
+outbox'a yazılmasından gönderilmesine kadar geçen süre (sent_at - created_at).
+
+Sink'in throttle / hata enjeksiyonu SMTP devre kesicisini (utils/smtp_health.py)
+açar ve kalan mesajlar beklemeden başarısız sayılır. Bu yüzden devre kesici
+varsayılan olarak ölçüm boyunca kapatılır (eşik çok yüksek); --breaker ile
+üretimdeki davranış ölçülür.
+
+İş kayıtları ve SMTP kullanım sayaçları geçici bir jobs.db'ye yazılır
+(data/jobs.db'deki günlük kota etkilenmez).
+
+--concurrency config.SMTP_CONCURRENCY'ye de yazılır; böylece fanout modunda
+mailer'ın kendi sınırı ölçülür. Rapor: mesaj/sn, mail süresi p50/p95/max,
+tekrar sayısı ve sink istatistikleri.
+
+Kullanım:
+    python -m benchmarks.mail_load --messages 200 --concurrency 10 --latency 0.05
+    python -m benchmarks.mail_load --tls starttls --throttle-rate 20 --messages 100
+    python -m benchmarks.mail_load --mode fanout --rows 5000 --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.smtp_sink import SMTPSink, make_self_signed_cert
+from benchmarks.workbook_generator import generate_workbook
+from config import config
+from jobs.process_excel import _run_excel_task
+from utils.logger import logger
+from utils.mailer import send_email_with_attachment
+from utils.metrics import SMTP_FAILURES, SMTP_RETRIES
+from utils.job_store import job_store
+from utils.outbox import outbox
+from utils.perf import percentile
+from utils.smtp_health import smtp_health
+from utils.workspace import JobWorkspace
+
+OVERRIDDEN = (
+    "SMTP_SERVER", "SMTP_PORTS", "SMTP_SECURITY", "SMTP_USERNAME", "SMTP_PASSWORD",
+    "SMTP_CA_FILE", "SMTP_CONCURRENCY", "PERSONAL_EMAIL", "OUTPUT_DIR", "SCRATCH_DIR", "OUTBOX_DIR",
+)
+
+
+def configure(sink: SMTPSink, args, ca_file: str, work_dir: Path):
+    """Mailer ayarlarını sink'e göre değiştirir"""
+    config.SMTP_SERVER = sink.host  # sertifika IP:127.0.0.1 SAN içerir
+    config.SMTP_PORTS = [sink.port]
+    config.SMTP_SECURITY = args.tls
+    config.SMTP_USERNAME = "bench@bench.local"
+    config.SMTP_PASSWORD = "bench"
+    config.SMTP_CA_FILE = ca_file
+    config.SMTP_CONCURRENCY = args.concurrency
+    config.PERSONAL_EMAIL = "personal@bench.local"
+    config.OUTPUT_DIR = work_dir / "output"
+    config.SCRATCH_DIR = work_dir / "scratch"
+    config.OUTBOX_DIR = work_dir / "outbox"
+
+
+async def run_direct(args, work_dir: Path):
+    attachment = work_dir / "attachment.xlsx"
+    attachment.write_bytes(os.urandom(args.attachment_kb * 1024))
+
+    latencies = []
+
+    async def one(index: int) -> bool:
+        started = time.perf_counter()
+        try:
+            return await send_email_with_attachment(
+                [f"alici{index}@bench.local"], f"yük testi {index}", "yük testi", attachment,
+                max_retries=args.max_retries,
+            )
+        finally:
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    results = await asyncio.gather(*(one(i) for i in range(args.messages)), return_exceptions=True)
+    sent = sum(1 for r in results if r is True)
+    return sent, len(results) - sent, latencies
+
+
+async def run_fanout(args, work_dir: Path):
+    input_path = generate_workbook(work_dir / "input.xlsx", args.rows, args.columns, seed=args.seed)
+    # Teslimatlar geçici veritabanına yazılır; ilk denemede gönderilemeyenler başarısız sayılır
+    db_path, outbox.db_path = outbox.db_path, work_dir / "outbox.db"
+    try:
+        with JobWorkspace.create("mailload") as workspace:
+            result = await _run_excel_task(workspace, input_path, 0)
+            if not result["success"]:
+                raise RuntimeError(result["error"])
+            # İş gönderimi beklemez; sonuçlar teslimatlardan okunur
+            states = await outbox.wait(result["delivery_ids"], config.OUTBOX_WAIT_SECONDS)
+    finally:
+        await outbox.stop()
+        outbox.close()
+        outbox.db_path = db_path
+    sent_rows = [row for row in states.values() if row["state"] == "sent"]
+    latencies = [(row["sent_at"] - row["created_at"]) * 1000 for row in sent_rows]
+    return len(sent_rows), len(states) - len(sent_rows), latencies
+
+
+async def run_load(args) -> dict:
+    logger.remove()
+    logger.add(sys.stderr, level="CRITICAL" if args.quiet else "WARNING")
+
+    original = {name: getattr(config, name) for name in OVERRIDDEN}
+    with tempfile.TemporaryDirectory(prefix="kova-mail-load-") as tmp:
+        work_dir = Path(tmp)
+        sink_options = {
+            "latency": args.latency, "jitter": args.jitter, "tls": args.tls,
+            "throttle_rate": args.throttle_rate, "fail_ratio": args.fail_ratio, "seed": args.seed,
+        }
+        ca_file = ""
+        if args.tls != "none":
+            cert, key = make_self_signed_cert(work_dir / "certs")
+            sink_options.update(certfile=cert, keyfile=key)
+            ca_file = str(cert)
+
+        retries_before, failures_before = SMTP_RETRIES.total(), SMTP_FAILURES.total()
+        async with SMTPSink(**sink_options) as sink:
+            configure(sink, args, ca_file, work_dir)
+            config.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+            jobs_db, job_store.db_path = job_store.db_path, work_dir / "jobs.db"
+            job_store.close()
+            threshold = smtp_health.threshold
+            if not args.breaker:
+                smtp_health.threshold = sys.maxsize
+            try:
+                started = time.perf_counter()
+                if args.mode == "direct":
+                    sent, failed, mail_ms = await run_direct(args, work_dir)
+                else:
+                    sent, failed, mail_ms = await run_fanout(args, work_dir)
+                elapsed = time.perf_counter() - started
+            finally:
+                smtp_health.threshold = threshold
+                job_store.close()
+                job_store.db_path = jobs_db
+                for name, value in original.items():
+                    setattr(config, name, value)
+
+    return {
+        "mode": args.mode,
+        "concurrency": args.concurrency,
+        "breaker": args.breaker,
+        "sink": {key: sink_options[key] for key in ("latency", "jitter", "tls", "throttle_rate", "fail_ratio")},
+        "messages": sent + failed,
+        "sent": sent,
+        "failed": failed,
+        "seconds": round(elapsed, 3),
+        "messages_per_s": round(sent / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(mail_ms, 50), 1),
+            "p95": round(percentile(mail_ms, 95), 1),
+            "max": round(max(mail_ms, default=0.0), 1),
+        },
+        "retries": int(SMTP_RETRIES.total() - retries_before),
+        "failed_attempts": int(SMTP_FAILURES.total() - failures_before),
+        "sink_stats": sink.stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mailer yük testi (yerel SMTP sink)")
+    parser.add_argument("--mode", choices=["direct", "fanout"], default="direct")
+    parser.add_argument("--messages", type=int, default=50, help="direct modunda mesaj sayısı")
+    parser.add_argument("--concurrency", type=int, default=5, help="Eşzamanlı SMTP oturumu (0 = sınırsız)")
+    parser.add_argument("--attachment-kb", type=int, default=200)
+    parser.add_argument("--max-retries", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=5000, help="fanout modunda satır sayısı")
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0, help="Sink yanıt gecikmesi (sn)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--tls", choices=["none", "tls", "starttls"], default="none")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Sink'in kabul ettiği mesaj/sn")
+    parser.add_argument("--fail-ratio", type=float, default=0.0)
+    parser.add_argument("--breaker", action="store_true", help="SMTP devre kesicisini açık bırak (üretim davranışı)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--quiet", action="store_true", help="Mailer hata loglarını gizle")
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(args))
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        args.out.write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
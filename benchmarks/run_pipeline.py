@@ -0,0 +1,289 @@
+# benchmarks/run_pipeline.py
+"""
+Temizle / ayır / arşivle / mail hattının tekrarlanabilir benchmark'ı
+
+Sentetik bir girdi üretir (benchmarks/workbook_generator.py) ve her aşamayı
+ayrı ölçer:
+    validate      utils.validator.validate_excel_file
+    clean         utils.excel_cleaner.clean_excel_headers
+    split         ExcelSplitter.process_excel_file
+    archive       grup dosyalarının ZIP_DEFLATED arşivi (toplu mail ile aynı)
+    mail_encode   utils.mailer.build_message + chunks (akış halinde)
+    mail_send     utils.mailer.send_email_with_attachment -> yerel SMTPSink
+
+Her aşama için süre (--repeat içinde en iyisi), CPU süresi, satır/s ve aşama
+boyunca örneklenen en yüksek RSS JSON olarak yazılır. Kayıtlı bir baseline
+varsa aşama süreleri onunla karşılaştırılır. SMTP kullanım sayaçları geçici
+bir jobs.db'ye yazılır (data/jobs.db'deki günlük kota etkilenmez).
+
+Kullanım:
+    python -m benchmarks.run_pipeline --rows 20000 --save-baseline
+    python -m benchmarks.run_pipeline --rows 20000 --fail-on-regression
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import psutil
+
+from benchmarks.smtp_sink import SMTPSink
+from benchmarks.workbook_generator import generate_workbook
+from config import config
+from utils.excel_cleaner import clean_excel_headers
+from utils.excel_splitter import ExcelSplitter
+from utils.job_store import job_store
+from utils.logger import logger
+from utils.mailer import build_message, send_email_with_attachment
+from utils.validator import validate_excel_file
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+STAGES = ["validate", "clean", "split", "archive", "mail_encode", "mail_send"]
+
+
+class RssSampler:
+    """Bir aşama boyunca RSS'i arka planda örnekler, en yüksek değeri tutar"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.peak = self.process.memory_info().rss
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="bench-rss", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.process.memory_info().rss)
+
+
+@contextmanager
+def measure(results: Dict[str, List[dict]], stage: str, rows: int):
+    """Aşamanın duvar saati, CPU süresi ve tepe RSS'ini ölçer"""
+    sampler = RssSampler()
+    cpu_started = time.process_time()
+    with sampler:
+        started = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - started
+    results.setdefault(stage, []).append({
+        "seconds": elapsed,
+        "cpu_seconds": time.process_time() - cpu_started,
+        "rows_per_s": rows / elapsed if elapsed > 0 else 0.0,
+        "peak_rss_mb": sampler.peak / (1024 * 1024),
+    })
+
+
+async def run_once(input_path: Path, work_dir: Path, rows: int, sink: SMTPSink) -> Dict[str, List[dict]]:
+    """Hattı bir kez çalıştırır, aşama ölçümlerini döndürür"""
+    results: Dict[str, List[dict]] = {}
+    output_dir = work_dir / "output"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    config.OUTPUT_DIR = output_dir
+
+    with measure(results, "validate", rows):
+        validation = validate_excel_file(str(input_path))
+    if not validation["valid"]:
+        raise RuntimeError(f"Doğrulama başarısız: {validation['message']}")
+
+    with measure(results, "clean", rows):
+        cleaning = clean_excel_headers(str(input_path))
+    if not cleaning["success"]:
+        raise RuntimeError(f"Temizleme başarısız: {cleaning['error']}")
+
+    try:
+        with measure(results, "split", rows):
+            split = ExcelSplitter().process_excel_file(cleaning["temp_path"], cleaning["headers"])
+        if not split["success"]:
+            raise RuntimeError(f"Ayırma başarısız: {split['error']}")
+    finally:
+        Path(cleaning["temp_path"]).unlink(missing_ok=True)
+
+    output_files = split["output_files"]
+    output_rows = sum(info["row_count"] for info in output_files.values())
+
+    zip_path = work_dir / "bench.zip"
+    with measure(results, "archive", output_rows):
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+            for info in output_files.values():
+                zipf.write(info["path"], info["filename"])
+
+    with measure(results, "mail_encode", output_rows):
+        for group_id, info in output_files.items():
+            for _ in build_message([f"{group_id}@bench.local"], "benchmark", "benchmark", info["path"]).chunks():
+                pass
+
+    with measure(results, "mail_send", output_rows):
+        for group_id, info in output_files.items():
+            sent = await send_email_with_attachment(
+                [f"{group_id}@bench.local"], "benchmark", "benchmark", info["path"], max_retries=0
+            )
+            if not sent:
+                raise RuntimeError(f"Mail gönderilemedi: {group_id}")
+
+    for info in output_files.values():
+        Path(info["path"]).unlink(missing_ok=True)
+    zip_path.unlink(missing_ok=True)
+
+    results["_meta"] = [{"groups": len(output_files), "output_rows": output_rows, "sink_bytes": sink.stats["bytes"]}]
+    return results
+
+
+def use_sink(sink: SMTPSink):
+    """Mailer'ı yerel SMTPSink'e yönlendirir (gerçek hesap bilgileri kullanılmaz)"""
+    config.SMTP_SERVER = sink.host
+    config.SMTP_PORTS = [sink.port]
+    config.SMTP_SECURITY = "none"
+    config.SMTP_USERNAME = "bench@bench.local"
+    config.SMTP_PASSWORD = "bench"
+
+
+def summarize(runs: List[Dict[str, List[dict]]]) -> Dict[str, dict]:
+    """Tekrarlar içinde en iyi süreyi ve en yüksek RSS'i seçer"""
+    stages = {}
+    for stage in STAGES:
+        samples = [sample for run in runs for sample in run.get(stage, [])]
+        if not samples:
+            continue
+        best = min(samples, key=lambda s: s["seconds"])
+        stages[stage] = {
+            "seconds": round(best["seconds"], 4),
+            "cpu_seconds": round(best["cpu_seconds"], 4),
+            "rows_per_s": round(best["rows_per_s"], 1),
+            "peak_rss_mb": round(max(s["peak_rss_mb"] for s in samples), 1),
+            "runs": [round(s["seconds"], 4) for s in samples],
+        }
+    return stages
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> Dict[str, dict]:
+    """Aşama sürelerini baseline ile karşılaştırır"""
+    comparison = {}
+    for stage, stats in current.items():
+        base = baseline.get(stage)
+        if not base or not base.get("seconds"):
+            continue
+        ratio = stats["seconds"] / base["seconds"]
+        if ratio > 1 + tolerance:
+            status = "regression"
+        elif ratio < 1 - tolerance:
+            status = "improved"
+        else:
+            status = "ok"
+        comparison[stage] = {
+            "baseline_seconds": base["seconds"],
+            "seconds": stats["seconds"],
+            "change_pct": round((ratio - 1) * 100, 1),
+            "peak_rss_change_mb": round(stats["peak_rss_mb"] - base.get("peak_rss_mb", 0), 1),
+            "status": status,
+        }
+    return comparison
+
+
+async def run_benchmark(args) -> dict:
+    # Aşama logları ölçümü bozmasın
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    smtp_fields = ("SMTP_SERVER", "SMTP_PORTS", "SMTP_SECURITY", "SMTP_USERNAME", "SMTP_PASSWORD")
+    original = {name: getattr(config, name) for name in smtp_fields + ("OUTPUT_DIR",)}
+    runs = []
+    with tempfile.TemporaryDirectory(prefix="kova-bench-") as tmp:
+        work_dir = Path(tmp)
+        input_path = generate_workbook(
+            work_dir / "input.xlsx", args.rows, args.columns, args.unmatched_ratio, args.seed
+        )
+        async with SMTPSink() as sink:
+            use_sink(sink)
+            jobs_db, job_store.db_path = job_store.db_path, work_dir / "jobs.db"
+            job_store.close()
+            try:
+                for _ in range(args.repeat):
+                    runs.append(await run_once(input_path, work_dir, args.rows, sink))
+            finally:
+                job_store.close()
+                job_store.db_path = jobs_db
+                for name, value in original.items():
+                    setattr(config, name, value)
+
+    meta = runs[-1]["_meta"][0]
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rows": args.rows,
+            "columns": args.columns,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "groups": meta["groups"],
+            "output_rows": meta["output_rows"],
+            "smtp_bytes": meta["sink_bytes"],
+        },
+        "stages": summarize(runs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Excel hattı benchmark'ı")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--unmatched-ratio", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", type=Path, help="Sonuç JSON dosyası (varsayılan: stdout)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Sonucu baseline olarak kaydet")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Gerileme eşiği (oran)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+
+    regressions = []
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("meta", {}).get("rows") != args.rows:
+            print("⚠️ Baseline farklı satır sayısıyla alınmış, karşılaştırma yaklaşık", file=sys.stderr)
+        report["comparison"] = compare(report["stages"], baseline.get("stages", {}), args.tolerance)
+        regressions = [s for s, c in report["comparison"].items() if c["status"] == "regression"]
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        args.out.write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+    if args.save_baseline:
+        args.baseline.write_text(output, encoding="utf-8")
+        print(f"Baseline kaydedildi: {args.baseline}", file=sys.stderr)
+
+    if regressions:
+        print(f"❌ Gerileme: {', '.join(regressions)}", file=sys.stderr)
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
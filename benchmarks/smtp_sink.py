@@ -0,0 +1,268 @@
+# benchmarks/smtp_sink.py
+"""
+Yerel SMTP sunucusu (benchmark / deneme için)
+
+Gerçek mail göndermeden utils/mailer'ı uçtan uca çalıştırmak için minimal bir
+ESMTP sunucusu: EHLO, AUTH PLAIN/LOGIN (her parola kabul), MAIL, RCPT, DATA,
+RSET, NOOP, QUIT, STARTTLS. Gelen mesajlar saklanmaz, sadece sayılır.
+
+Gerçek sunucu davranışını taklit etmek için:
+    latency / jitter   her yanıt öncesi gecikme (saniye, çok satırlı yanıtta bir kez)
+    tls                "none" | "tls" (465 gibi) | "starttls" (587 gibi);
+                       sertifika make_self_signed_cert() ile üretilebilir
+    throttle_rate      saniyede kabul edilen mesaj (token bucket), fazlası
+                       451 4.7.1 ile reddedilir (Gmail/Yandex hız sınırı gibi)
+    fail_ratio         bu oranda DATA sonrası 421 verip bağlantıyı kapatır
+
+    async with SMTPSink() as sink:
+        config.SMTP_SERVER, config.SMTP_PORTS = sink.host, [sink.port]
+        config.SMTP_SECURITY = "none"
+        ...
+        print(sink.stats)
+"""
+import asyncio
+import random
+import ssl
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+def make_self_signed_cert(directory: Path) -> Tuple[Path, Path]:
+    """127.0.0.1/localhost için kendinden imzalı sertifika üretir (openssl CLI)"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    cert, key = directory / "sink-cert.pem", directory / "sink-key.pem"
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-subj", "/CN=localhost",
+            "-addext", "subjectAltName=IP:127.0.0.1,DNS:localhost",
+            "-keyout", str(key), "-out", str(cert),
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+class SMTPSink:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        tls: str = "none",
+        certfile: Optional[Path] = None,
+        keyfile: Optional[Path] = None,
+        throttle_rate: float = 0.0,
+        fail_ratio: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        if tls not in ("none", "tls", "starttls"):
+            raise ValueError(f"Geçersiz tls modu: {tls}")
+        if tls != "none" and not (certfile and keyfile):
+            raise ValueError("TLS için certfile ve keyfile gerekli")
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.tls = tls
+        self.throttle_rate = throttle_rate
+        self.fail_ratio = fail_ratio
+        self._random = random.Random(seed)
+        self._ssl_context = None
+        if tls != "none":
+            self._ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            self._ssl_context.load_cert_chain(certfile, keyfile)
+        self._tokens = max(throttle_rate, 1.0)
+        self._tokens_at = time.monotonic()
+        self._server = None
+        self.stats: Dict[str, float] = {
+            "connections": 0,
+            "messages": 0,
+            "recipients": 0,
+            "bytes": 0,
+            "errors": 0,
+            "throttled": 0,
+            "injected_failures": 0,
+        }
+
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._handle, self.host, self.port,
+            ssl=self._ssl_context if self.tls == "tls" else None,
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    # ---- protokol ----
+
+    def ehlo_lines(self, secure: bool):
+        """EHLO yanıtındaki uzantılar"""
+        lines = ["sink.local", "8BITMIME"]
+        if self.tls == "starttls" and not secure:
+            lines.append("STARTTLS")
+        lines.append("AUTH PLAIN LOGIN")
+        return lines
+
+    async def _reply(self, writer: asyncio.StreamWriter, line: str, delay: bool = True):
+        if delay and (self.latency or self.jitter):
+            await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+        writer.write(line.encode("ascii") + b"\r\n")
+        await writer.drain()
+
+    def _take_token(self) -> bool:
+        """Token bucket: throttle_rate kapalıysa her zaman True"""
+        if self.throttle_rate <= 0:
+            return True
+        now = time.monotonic()
+        capacity = max(self.throttle_rate, 1.0)
+        self._tokens = min(capacity, self._tokens + (now - self._tokens_at) * self.throttle_rate)
+        self._tokens_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    async def _read_data(self, reader: asyncio.StreamReader) -> int:
+        """DATA gövdesini '.' satırına kadar okur, bayt sayısını döndürür"""
+        size = 0
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("DATA sırasında bağlantı koptu")
+            if line in (b".\r\n", b".\n"):
+                return size
+            size += len(line)
+
+    async def on_message(self, size: int, recipients: int) -> str:
+        """Mesaj alındıktan sonra dönülecek yanıt"""
+        if self.fail_ratio and self._random.random() < self.fail_ratio:
+            self.stats["injected_failures"] += 1
+            return "421 4.4.2 Connection dropped (injected)"
+        if not self._take_token():
+            self.stats["throttled"] += 1
+            return "451 4.7.1 Rate limit exceeded, try again later"
+        return "250 2.0.0 OK queued"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats["connections"] += 1
+        recipients = 0
+        secure = self.tls == "tls"
+        try:
+            await self._reply(writer, "220 sink.local ESMTP ready")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("utf-8", "replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+
+                if verb == "EHLO":
+                    lines = self.ehlo_lines(secure)
+                    for extension in lines[:-1]:
+                        await self._reply(writer, f"250-{extension}", delay=False)
+                    await self._reply(writer, f"250 {lines[-1]}")
+                elif verb == "STARTTLS" and self.tls == "starttls" and not secure:
+                    await self._reply(writer, "220 2.0.0 Ready to start TLS")
+                    await writer.start_tls(self._ssl_context)
+                    secure = True
+                elif verb == "HELO":
+                    await self._reply(writer, "250 sink.local")
+                elif verb == "AUTH":
+                    parts = command.split()
+                    if parts[1].upper() == "LOGIN":
+                        # kullanıcı adı ve parola sırayla istenir
+                        for _ in range(2 - (len(parts) > 2)):
+                            await self._reply(writer, "334 VXNlcm5hbWU6")
+                            await reader.readline()
+                    elif len(parts) == 2:
+                        await self._reply(writer, "334 ")
+                        await reader.readline()
+                    await self._reply(writer, "235 2.7.0 Authentication successful")
+                elif verb == "MAIL":
+                    recipients = 0
+                    await self._reply(writer, "250 2.1.0 OK")
+                elif verb == "RCPT":
+                    recipients += 1
+                    await self._reply(writer, "250 2.1.5 OK")
+                elif verb == "DATA":
+                    await self._reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                    size = await self._read_data(reader)
+                    reply = await self.on_message(size, recipients)
+                    if reply.startswith("250"):
+                        self.stats["messages"] += 1
+                        self.stats["recipients"] += recipients
+                        self.stats["bytes"] += size
+                    await self._reply(writer, reply)
+                    if reply.startswith("421"):
+                        break
+                elif verb == "RSET":
+                    recipients = 0
+                    await self._reply(writer, "250 2.0.0 OK")
+                elif verb == "NOOP":
+                    await self._reply(writer, "250 2.0.0 OK")
+                elif verb == "QUIT":
+                    await self._reply(writer, "221 2.0.0 Bye")
+                    break
+                else:
+                    await self._reply(writer, "502 5.5.2 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError, ssl.SSLError):
+            self.stats["errors"] += 1
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+
+async def _serve_forever(host: str, port: int, **options):
+    async with SMTPSink(host, port, **options) as sink:
+        print(f"SMTP sink dinliyor: {sink.host}:{sink.port}")
+        started = time.monotonic()
+        try:
+            while True:
+                await asyncio.sleep(10)
+                print(f"{time.monotonic() - started:.0f}s {sink.stats}")
+        except asyncio.CancelledError:
+            pass
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Yerel SMTP sink")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--tls", choices=["none", "tls", "starttls"], default="none")
+    parser.add_argument("--cert-dir", type=Path, default=Path("/tmp/kova-smtp-sink"))
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--fail-ratio", type=float, default=0.0)
+    args = parser.parse_args()
+
+    options = {"latency": args.latency, "tls": args.tls,
+               "throttle_rate": args.throttle_rate, "fail_ratio": args.fail_ratio}
+    if args.tls != "none":
+        options["certfile"], options["keyfile"] = make_self_signed_cert(args.cert_dir)
+        print(f"Sertifika: {options['certfile']} (SMTP_CA_FILE olarak verin)")
+    try:
+        asyncio.run(_serve_forever(args.host, args.port, **options))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,141 @@
+# benchmarks/workbook_generator.py
+"""
+Sentetik Excel üretici (benchmark girdisi)
+
+Şehir dağılımı data/groups/groups.json'daki gruplardan alınır: bir şehir kaç
+gruba bağlıysa o kadar ağırlık alır, ayrıca unmatched_ratio oranında hiçbir
+gruba uymayan şehir yazılır. Aynı seed ile her çalıştırmada aynı dosya üretilir.
+
+Kullanım:
+    python -m benchmarks.workbook_generator --rows 50000 --columns 10 --out /tmp/bench.xlsx
+"""
+import argparse
+import json
+import random
+from datetime import date, timedelta
+from pathlib import Path
+from typing import List, Tuple
+
+from openpyxl import Workbook
+
+GROUPS_FILE = Path(__file__).resolve().parent.parent / "data" / "groups" / "groups.json"
+
+# İlk sütunlar bilerek karışık sırada: temizleyici TARİH/İL'i öne taşımak zorunda kalsın
+BASE_HEADERS = ["SIRA", "AD SOYAD", "İL", "TARİH", "TELEFON", "ADRES", "AÇIKLAMA", "TUTAR"]
+# "İL" veya "TARİH" içermeyen ek sütun adları (temizleyici alt dize araması yapar)
+EXTRA_HEADER_PREFIX = "EK ALAN"
+
+FIRST_NAMES = ["Ayşe", "Fatma", "Şükrü", "Gülşen", "Çağrı", "Özgür", "İsmail", "Ömer", "Ümran", "Hıdır", "Nurhan", "Ebru"]
+LAST_NAMES = ["Yılmaz", "Şahin", "Çelik", "Öztürk", "Doğan", "Güneş", "Kılıç", "Aydın", "Işık", "Koç"]
+STREETS = ["Atatürk Cad.", "İnönü Sok.", "Cumhuriyet Mah.", "Gazi Bulvarı", "Şehitler Cad.", "Çınarlı Sok."]
+NOTES = [
+    "Hasar tespiti yapıldı",
+    "Eksper ataması bekleniyor",
+    "Müşteri ile görüşüldü, evrak eksik",
+    "Ödeme onaylandı",
+    "Dosya kapatıldı",
+    "Araç servise çekildi, fotoğraflar yüklendi",
+]
+UNMATCHED_CITIES = ["Bilinmiyor", "Yurtdışı", "KKTC", ""]
+
+
+def load_city_weights(groups_file: Path = GROUPS_FILE) -> Tuple[List[str], List[int]]:
+    """groups.json'dan şehirleri ve ağırlıklarını (bağlı grup sayısı) döndürür"""
+    with open(groups_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    weights = {}
+    for group in data.get("groups", []):
+        for city in group.get("cities", []):
+            weights[city] = weights.get(city, 0) + 1
+
+    cities = sorted(weights)
+    return cities, [weights[c] for c in cities]
+
+
+def build_headers(columns: int) -> List[str]:
+    """İstenen sütun sayısına göre başlık listesi (en az TARİH ve İL)"""
+    if columns <= len(BASE_HEADERS):
+        # İL ve TARİH her zaman kalır
+        headers = [h for h in BASE_HEADERS if h in ("İL", "TARİH")]
+        for h in BASE_HEADERS:
+            if len(headers) >= columns:
+                break
+            if h not in headers:
+                headers.append(h)
+        return [h for h in BASE_HEADERS if h in headers]
+
+    extra = columns - len(BASE_HEADERS)
+    return BASE_HEADERS + [f"{EXTRA_HEADER_PREFIX} {i}" for i in range(1, extra + 1)]
+
+
+def _cell_value(header: str, row_no: int, rng: random.Random, city: str, day: date):
+    if header == "SIRA":
+        return row_no
+    if header == "İL":
+        return city
+    if header == "TARİH":
+        return day
+    if header == "AD SOYAD":
+        return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    if header == "TELEFON":
+        return f"05{rng.randint(300000000, 599999999)}"
+    if header == "ADRES":
+        return f"{rng.choice(STREETS)} No:{rng.randint(1, 250)} {city}"
+    if header == "AÇIKLAMA":
+        return rng.choice(NOTES)
+    if header == "TUTAR":
+        return round(rng.uniform(100, 250000), 2)
+    return f"değer {rng.randint(1, 99999)}"
+
+
+def generate_workbook(
+    path: Path,
+    rows: int = 10000,
+    columns: int = 8,
+    unmatched_ratio: float = 0.02,
+    seed: int = 42,
+    groups_file: Path = GROUPS_FILE,
+) -> Path:
+    """Sentetik girdi dosyasını yazar ve yolunu döndürür"""
+    rng = random.Random(seed)
+    cities, weights = load_city_weights(groups_file)
+    headers = build_headers(columns)
+    start_day = date(2024, 1, 1)
+
+    # write_only kullanılmaz: <dimension> yazmadığı için read_only okuyucu
+    # max_row/max_column'u bilemez, gerçek Excel dosyaları ise bunu içerir
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Veriler"
+    ws.append(headers)
+
+    for row_no in range(1, rows + 1):
+        if not cities or rng.random() < unmatched_ratio:
+            city = rng.choice(UNMATCHED_CITIES)
+        else:
+            city = rng.choices(cities, weights)[0]
+        day = start_day + timedelta(days=rng.randint(0, 365))
+        ws.append([_cell_value(h, row_no, rng, city, day) for h in headers])
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    wb.save(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sentetik benchmark Excel dosyası üretir")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--unmatched-ratio", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=Path, required=True)
+    args = parser.parse_args()
+
+    path = generate_workbook(args.out, args.rows, args.columns, args.unmatched_ratio, args.seed)
+    print(f"{path} ({path.stat().st_size / 1024:.1f} KB, {args.rows} satır)")
+
+
+if __name__ == "__main__":
+    main()
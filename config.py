@@ -14,19 +14,11 @@ from dotenv import load_dotenv
 
 # Önce dotenv'i yükle
 env_path = Path('.') / '.env'
-logging.info(f".env dosya yolu: {env_path.absolute()}")
-logging.info(f".env dosyası var mı: {env_path.exists()}")
-
 load_dotenv()
 
-# Tüm env değişkenlerini debug için göster
-logging.info("Mevcut env değişkenleri:")
-for key in ['TELEGRAM_TOKEN', 'ADMIN_CHAT_IDS', 'USE_WEBHOOK', 'WEBHOOK_URL', 'WEBHOOK_SECRET']:
-    value = os.getenv(key)
-    if value:
-        logging.info(f"  {key}: {value}")
-    else:
-        logging.warning(f"  {key}: TANIMSIZ")
+# Açılışta loglanan env değişkenleri (Config.log_environment); gizliler değeriyle yazılmaz
+LOGGED_ENV_KEYS = ['TELEGRAM_TOKEN', 'ADMIN_CHAT_IDS', 'USE_WEBHOOK', 'WEBHOOK_URL', 'WEBHOOK_SECRET', 'SMTP_ACCOUNTS']
+SECRET_ENV_KEYS = {'TELEGRAM_TOKEN', 'WEBHOOK_SECRET', 'SMTP_ACCOUNTS', 'DOWNLOAD_SECRET'}
 
 @dataclass
 class Config:
@@ -37,6 +29,16 @@ class Config:
     USE_WEBHOOK: bool = field(default_factory=lambda: os.getenv("USE_WEBHOOK", "False").lower() == "true")
     WEBHOOK_URL: str = os.getenv("WEBHOOK_URL", "")
     WEBHOOK_SECRET: str = os.getenv("WEBHOOK_SECRET", "")
+    # Webhook kuyruğu (utils/update_queue.py): hemen 200 dönülür, update'ler worker'larda işlenir
+    WEBHOOK_QUEUE_SIZE: int = int(os.getenv("WEBHOOK_QUEUE_SIZE", 1000))
+    WEBHOOK_WORKERS: int = int(os.getenv("WEBHOOK_WORKERS", 8))
+    WEBHOOK_DEDUPE_SIZE: int = int(os.getenv("WEBHOOK_DEDUPE_SIZE", 10000))  # hatırlanan son update_id
+    
+    # Local Bot API sunucusu (telegram-bot-api) - 20 MB yerine 2 GB dosya sınırı
+    TELEGRAM_API_URL: str = os.getenv("TELEGRAM_API_URL", "")  # Örn: http://telegram-bot-api:8081
+    TELEGRAM_API_LOCAL: bool = field(default_factory=lambda: os.getenv("TELEGRAM_API_LOCAL", "False").lower() == "true")
+    TELEGRAM_API_SERVER_DIR: str = os.getenv("TELEGRAM_API_SERVER_DIR", "")  # Sunucunun --dir yolu
+    TELEGRAM_API_LOCAL_DIR: str = os.getenv("TELEGRAM_API_LOCAL_DIR", "")  # Aynı dizinin bot konteynerindeki yolu
     
     # Render için port ayarı - main.py'de WEBHOOK_PORT olarak kullanılıyor
     PORT: int = int(os.getenv("PORT", 10000))
@@ -54,6 +56,32 @@ class Config:
     SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")
     # SMTP_PORTS: list[int] = field(default_factory=lambda: [465, 587])  # ESKİ 2 portlu
     SMTP_PORTS: list[int] = field(default_factory=list)  # YENİ: Boş liste> yandex + gmail için. ALTTA port
+    # auto: 465 -> SSL, diğerleri -> STARTTLS | tls | starttls | none (yerel test sunucusu)
+    SMTP_SECURITY: str = os.getenv("SMTP_SECURITY", "auto").lower()
+    SMTP_CA_FILE: str = os.getenv("SMTP_CA_FILE", "")  # boşsa sistem sertifikaları
+    SMTP_CONCURRENCY: int = int(os.getenv("SMTP_CONCURRENCY", 0))  # aynı anda açık SMTP oturumu, 0 = sınırsız
+    # Çoklu SMTP hesabı (utils/smtp_pool.py): JSON liste; boşsa yukarıdaki tek hesap kullanılır
+    SMTP_ACCOUNTS: str = os.getenv("SMTP_ACCOUNTS", "")
+    SMTP_DAILY_LIMIT: int = int(os.getenv("SMTP_DAILY_LIMIT", 0))  # tek hesap için günlük sınır, 0 = sınırsız
+    SMTP_PER_MINUTE: int = int(os.getenv("SMTP_PER_MINUTE", 0))  # tek hesap için dakikalık sınır, 0 = sınırsız
+    # Port devre kesici (utils/smtp_health.py)
+    SMTP_BREAKER_THRESHOLD: int = int(os.getenv("SMTP_BREAKER_THRESHOLD", 3))  # ardışık hata → devre açılır
+    SMTP_BREAKER_COOLDOWN: float = float(os.getenv("SMTP_BREAKER_COOLDOWN", 30))  # sn, ilk açık kalma süresi
+    SMTP_BREAKER_MAX_COOLDOWN: float = float(os.getenv("SMTP_BREAKER_MAX_COOLDOWN", 600))  # sn
+    # Kalıcı mail kutusu (utils/outbox.py)
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))  # sonra failed (/outbox retry)
+    OUTBOX_RETRY_BASE: float = float(os.getenv("OUTBOX_RETRY_BASE", 30))  # sn, her denemede iki katı
+    OUTBOX_RETRY_MAX: float = float(os.getenv("OUTBOX_RETRY_MAX", 1800))  # sn, bekleme üst sınırı
+    OUTBOX_CONCURRENCY: int = int(os.getenv("OUTBOX_CONCURRENCY", 10))  # aynı anda denenen teslimat
+    OUTBOX_WAIT_SECONDS: float = float(os.getenv("OUTBOX_WAIT_SECONDS", 120))  # iş ilk denemeyi en fazla bu kadar bekler
+    # Mesaj boyutu sınırı (utils/attachment_plan.py): aşan ekler ZIP'lenir / bölünür, 0 = sınırsız
+    MAIL_MAX_MB: float = float(os.getenv("MAIL_MAX_MB", 25))
+    # Ek yerine indirme linki (utils/download_links.py): attach | link | auto (MAIL_LINK_MIN_MB ve üstü)
+    MAIL_DELIVERY_MODE: str = os.getenv("MAIL_DELIVERY_MODE", "attach").lower()
+    MAIL_LINK_MIN_MB: float = float(os.getenv("MAIL_LINK_MIN_MB", 5))
+    DOWNLOAD_LINK_HOURS: float = float(os.getenv("DOWNLOAD_LINK_HOURS", 72))
+    DOWNLOAD_BASE_URL: str = os.getenv("DOWNLOAD_BASE_URL", "")  # boşsa WEBHOOK_URL
+    DOWNLOAD_SECRET: str = os.getenv("DOWNLOAD_SECRET", "")  # boşsa TELEGRAM_TOKEN'dan türetilir
 
     
     
@@ -62,10 +90,41 @@ class Config:
     DEFAULT_EMAIL_RECIPIENTS = ["admin@example.com"]  # Varsayılan email alıcıları
     MAX_EMAIL_RETRIES = 2  # Mail gönderme deneme sayısı
     CHUNK_SIZE = 1000  # Excel işleme chunk boyutu
+    # Ayırma sırasında grup satırları için bellek bütçesi (tüm eşzamanlı işler için toplam,
+    # iş başına JOB_WORKERS'a bölünür); aşılınca satırlar geçici dosyalara taşınır
+    SPLIT_MEMORY_BUDGET_MB: float = float(os.getenv("SPLIT_MEMORY_BUDGET_MB", 64))
+    # İş zamanlayıcısı (utils/scheduler.py)
+    # Aynı anda çalışan process/tek işi. Temizleme her işte tüm workbook'u belleğe yükler:
+    # 512 MB'lık konteynerde 1 kalmalı; artırmak tepe belleği işçi sayısıyla çarpar
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", 1))
+    JOB_USER_LIMIT: int = int(os.getenv("JOB_USER_LIMIT", 1))  # kullanıcı başına aynı anda çalışan iş
+    SMALL_JOB_ROWS: int = int(os.getenv("SMALL_JOB_ROWS", 5000))  # altı "small" önceliğinde çalışır
+    JOB_SEC_PER_ROW: float = float(os.getenv("JOB_SEC_PER_ROW", 0.002))  # ilk bekleme tahmini, işlerle güncellenir
     LOG_RETENTION_DAYS = 30  # Log tutma süresi
     
+    # Dosya saklama / janitor (utils/janitor.py); kota 0 = sınırsız
+    JANITOR_INTERVAL_MINUTES: float = float(os.getenv("JANITOR_INTERVAL_MINUTES", 30))  # 0 = kapalı
+    INPUT_RETENTION_HOURS: float = float(os.getenv("INPUT_RETENTION_HOURS", 24))
+    INPUT_QUOTA_MB: float = float(os.getenv("INPUT_QUOTA_MB", 1024))
+    OUTPUT_RETENTION_DAYS: float = float(os.getenv("OUTPUT_RETENTION_DAYS", 7))
+    OUTPUT_QUOTA_MB: float = float(os.getenv("OUTPUT_QUOTA_MB", 2048))
+    SCRATCH_RETENTION_HOURS: float = float(os.getenv("SCRATCH_RETENTION_HOURS", 6))
+    
+    # Loglama: arka plan yazıcı + toplu flush (utils/log_sink.py)
+    LOG_ASYNC: bool = field(default_factory=lambda: os.getenv("LOG_ASYNC", "True").lower() == "true")
+    LOG_FLUSH_INTERVAL: float = float(os.getenv("LOG_FLUSH_INTERVAL", 0.5))  # saniye
+    LOG_BATCH_SIZE: int = int(os.getenv("LOG_BATCH_SIZE", 512))  # flush başına en fazla mesaj
+    
+    # Event loop watchdog (utils/loop_watchdog.py)
+    LOOP_WATCHDOG: bool = field(default_factory=lambda: os.getenv("LOOP_WATCHDOG", "True").lower() == "true")
+    LOOP_LAG_THRESHOLD: float = float(os.getenv("LOOP_LAG_THRESHOLD", 0.5))  # saniye
+    
     
     
+    # FSM deposu (utils/fsm_storage.py): sqlite | redis (ulaşılamazsa sqlite) | memory
+    FSM_STORAGE: str = os.getenv("FSM_STORAGE", "sqlite").lower()
+    FSM_FLUSH_INTERVAL: float = float(os.getenv("FSM_FLUSH_INTERVAL", 1.0))  # saniye, toplu yazma aralığı
+    
     # Redis (eğer kullanıyorsanız)
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
@@ -113,8 +172,31 @@ class Config:
         self.OUTPUT_DIR = self.DATA_DIR / "output"
         self.GROUPS_DIR = self.DATA_DIR / "groups"
         self.LOGS_DIR = self.DATA_DIR / "logs"
+        self.SCRATCH_DIR = self.DATA_DIR / "scratch"  # iş ara dosyaları (utils/workspace.py)
+        self.OUTBOX_DIR = self.DATA_DIR / "outbox"  # gönderilmeyi bekleyen toplu ZIP'ler
 
-        for directory in [self.DATA_DIR, self.INPUT_DIR, self.OUTPUT_DIR, self.GROUPS_DIR, self.LOGS_DIR]:
+        for directory in [self.DATA_DIR, self.INPUT_DIR, self.OUTPUT_DIR, self.GROUPS_DIR, self.LOGS_DIR,
+                          self.SCRATCH_DIR, self.OUTBOX_DIR]:
             directory.mkdir(parents=True, exist_ok=True)
 
+        # İş metrikleri veritabanı (utils/job_store.py)
+        self.JOBS_DB = self.DATA_DIR / "jobs.db"
+        # FSM durumları (utils/fsm_storage.py)
+        self.FSM_DB = self.DATA_DIR / "fsm.db"
+        # Mail teslimatları (utils/outbox.py)
+        self.OUTBOX_DB = self.DATA_DIR / "outbox.db"
+
+    def log_environment(self):
+        """Env durumunu loglar (main açılışta bir kez çağırır, import sırasında değil)"""
+        logging.info(f".env dosya yolu: {env_path.absolute()} (var mı: {env_path.exists()})")
+        logging.info("Mevcut env değişkenleri:")
+        for key in LOGGED_ENV_KEYS:
+            value = os.getenv(key)
+            if not value:
+                logging.warning(f"  {key}: TANIMSIZ")
+            elif key in SECRET_ENV_KEYS:
+                logging.info(f"  {key}: tanımlı ({len(value)} karakter)")
+            else:
+                logging.info(f"  {key}: {value}")
+
 config = Config()
\ No newline at end of file
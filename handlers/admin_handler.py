@@ -12,22 +12,32 @@ Admin Handler (handlers/admin_handler.py)
 
 """
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, BufferedInputFile
+from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, FSInputFile
 from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from datetime import datetime, timedelta
-import aiofiles
-import aiofiles.os
-import json
+from datetime import datetime
+import asyncio
 import shutil
 from typing import Dict, List, Any
 
 from config import config
 from utils.logger import logger
-from utils.file_utils import get_file_stats, get_directory_size, get_recent_processed_files
+from utils.file_utils import get_file_stats
 from utils.group_manager import group_manager
 from utils.mailer import send_email_with_attachment
+from utils.telegram_files import download_document
+from utils import json_codec
+from utils.log_reader import tail_lines, count_lines
+from utils.job_store import job_store
+from utils.perf import summarize_stages
+from utils.loop_watchdog import loop_watchdog
+from utils.profiler import profile_manager
+from utils.workspace import JobWorkspace
+from utils.janitor import janitor, summarize
+from utils.outbox import outbox, PENDING_STATES
+from utils.smtp_health import smtp_health
+from utils.smtp_pool import smtp_pool
 
 router = Router()
 
@@ -101,24 +111,20 @@ async def show_admin_stats(message: Message):
     try:
         stats = await get_file_stats(detailed=True)
         
-        # Disk kullanımı
-        input_size = await get_directory_size(config.INPUT_DIR)
-        output_size = await get_directory_size(config.OUTPUT_DIR)
-        logs_size = await get_directory_size(config.LOGS_DIR)
-        
         stats_message = (
             "📈 **Admin İstatistikleri**\n\n"
             f"📊 Toplam işlenen dosya: {stats['total_processed']}\n"
             f"✅ Başarılı işlem: {stats['successful_processed']}\n"
             f"❌ Başarısız işlem: {stats['failed_processed']}\n"
-            f"📧 Gönderilen mail: {stats['emails_sent']}\n\n"
+            f"📧 Gönderilen mail: {stats['emails_sent']}\n"
+            f"⚠️ Başarısız mail: {stats['emails_failed']}\n\n"
             f"📅 Zaman Bazlı:\n"
             f"  Son 24 saat: {stats['last_24h_processed']} dosya\n"
             f"  Son 7 gün: {stats['last_7d_processed']} dosya\n\n"
             f"💾 Disk Kullanımı:\n"
-            f"  Input: {input_size}\n"
-            f"  Output: {output_size}\n"
-            f"  Logs: {logs_size}\n\n"
+            f"  Input: {stats['input_dir_size']}\n"
+            f"  Output: {stats['output_dir_size']}\n"
+            f"  Logs: {stats['logs_dir_size']}\n\n"
             f"📈 Toplam satır: {stats['total_rows']}"
         )
         
@@ -138,23 +144,17 @@ async def show_admin_logs(message: Message):
             await message.answer("📝 Log dosyası bulunamadı.")
             return
         
-        # Son 50 satırı oku
-        async with aiofiles.open(log_path, 'r', encoding='utf-8') as f:
-            lines = await f.readlines()
-            last_lines = lines[-50:] if len(lines) > 50 else lines
+        # Son 50 satırı oku (dosya sonundan geriye doğru)
+        last_lines = await asyncio.to_thread(tail_lines, log_path, 50)
         
         if not last_lines:
             await message.answer("📝 Log dosyası boş.")
             return
         
-        log_content = "".join(last_lines)
+        log_content = "\n".join(last_lines)
         
         # Hata loglarını da kontrol et
-        error_count = 0
-        if error_path.exists():
-            async with aiofiles.open(error_path, 'r', encoding='utf-8') as f:
-                error_lines = await f.readlines()
-                error_count = len(error_lines)
+        error_count = await asyncio.to_thread(count_lines, error_path)
         
         # Telegram mesaj sınırı
         if len(log_content) > 4000:
@@ -254,16 +254,12 @@ async def handle_group_file_upload(message: Message, state: FSMContext):
             return
         
         # Dosyayı indir
-        bot = message.bot
-        file = await bot.get_file(file_id)
         file_path = config.GROUPS_DIR / "groups_new.json"
-        
-        await bot.download_file(file.file_path, file_path)
+        await download_document(message.bot, file_id, file_path)
         
         # Dosyayı doğrula
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                groups_data = json.load(f)
+            groups_data = json_codec.load_file(file_path)
             
             # Basit doğrulama
             if "groups" not in groups_data or not isinstance(groups_data["groups"], list):
@@ -334,59 +330,20 @@ async def handle_broadcast_message(message: Message, state: FSMContext):
 async def clean_system(message: Message):
     """Sistem temizliği yapar"""
     try:
-        cleaned_files = 0
-        cleaned_size = 0
-        now = datetime.now()
-        
-        # Input dizini (24 saatten eski)
-        for file_path in config.INPUT_DIR.glob("*"):
-            if file_path.is_file():
-                file_time = datetime.fromtimestamp(file_path.stat().st_mtime)
-                if now - file_time > timedelta(hours=24):
-                    file_size = file_path.stat().st_size
-                    file_path.unlink()
-                    cleaned_files += 1
-                    cleaned_size += file_size
-        
-        # Output dizini (7 günden eski)
-        for file_path in config.OUTPUT_DIR.glob("*"):
-            if file_path.is_file():
-                file_time = datetime.fromtimestamp(file_path.stat().st_mtime)
-                if now - file_time > timedelta(days=7):
-                    file_size = file_path.stat().st_size
-                    file_path.unlink()
-                    cleaned_files += 1
-                    cleaned_size += file_size
-        
-        # Eski log backup'ları (30 günden eski)
-        for file_path in config.LOGS_DIR.glob("*.log.*"):
-            if file_path.is_file():
-                file_time = datetime.fromtimestamp(file_path.stat().st_mtime)
-                if now - file_time > timedelta(days=30):
-                    file_size = file_path.stat().st_size
-                    file_path.unlink()
-                    cleaned_files += 1
-                    cleaned_size += file_size
-        
-        # Eski grup backup'ları (30 günden eski)
-        for file_path in config.GROUPS_DIR.glob("groups_backup_*.json"):
-            if file_path.is_file():
-                file_time = datetime.fromtimestamp(file_path.stat().st_mtime)
-                if now - file_time > timedelta(days=30):
-                    file_size = file_path.stat().st_size
-                    file_path.unlink()
-                    cleaned_files += 1
-                    cleaned_size += file_size
-        
+        # Janitor politikaları hemen uygulanır (yaş + kota, çalışan işler hariç)
+        results = await janitor.run()
+        cleaned_files, cleaned_size = summarize(results)
         cleaned_size_mb = cleaned_size / (1024 * 1024)
+        kept_mb = {name: result.kept_bytes / (1024 * 1024) for name, result in results.items()}
         
         await message.answer(
             f"🧹 **Sistem Temizliği Tamamlandı**\n\n"
             f"Silinen dosya: {cleaned_files}\n"
             f"Kazanılan alan: {cleaned_size_mb:.2f} MB\n\n"
-            f"• 24 saatten eski input dosyaları\n"
-            f"• 7 günden eski output dosyaları\n"
-            f"• 30 günden eski yedekler"
+            f"• {config.INPUT_RETENTION_HOURS:g} saatten eski input dosyaları (kalan {kept_mb['input']:.1f} MB)\n"
+            f"• {config.OUTPUT_RETENTION_DAYS:g} günden eski output dosyaları (kalan {kept_mb['output']:.1f} MB)\n"
+            f"• {config.LOG_RETENTION_DAYS} günden eski yedekler\n"
+            f"• Kota aşımında en eski dosyalar"
         )
         
     except Exception as e:
@@ -436,6 +393,26 @@ async def show_system_status(message: Message):
             f"👑 **Admin Sayısı:** {len(config.ADMIN_CHAT_IDS)}"
         )
         
+        # SMTP hesapları (utils/smtp_pool.py) ve uç noktaları (utils/smtp_health.py)
+        status_message += "\n\n📮 **SMTP Hesapları:**"
+        for account in smtp_pool.snapshot():
+            limit = account["daily_limit"] or "∞"
+            status_message += (
+                f"\n  {'🟢' if account['ready'] else '⛔'} {account['name']}: "
+                f"bugün {account['sent_today']}/{limit}, ağırlık {account['weight']:g}"
+            )
+        
+        endpoints = smtp_health.snapshot()
+        if endpoints:
+            state_icons = {"closed": "🟢", "half_open": "🟡", "open": "🔴"}
+            status_message += "\n\n🔌 **SMTP Uç Noktaları:**"
+            for health in endpoints:
+                status_message += (
+                    f"\n  {state_icons[health.state]} {health.endpoint}: "
+                    f"hata %{health.error_rate * 100:.0f}, {health.latency:.1f} sn, "
+                    f"{health.successes}/{health.successes + health.failures} başarılı"
+                )
+        
         await message.answer(status_message)
         
     except Exception as e:
@@ -465,20 +442,18 @@ async def cmd_send_test_email(message: Message, command: CommandObject):
         test_ws['A1'] = "Test"
         test_ws['A2'] = "Başarılı!"
         
-        test_file = config.OUTPUT_DIR / "test_email.xlsx"
-        test_wb.save(test_file)
-        test_wb.close()
-        
-        # E-posta gönder
-        success = await send_email_with_attachment(
-            [email],
-            "📧 Test E-postası - Data_listesi_Hıdır",
-            "Bu bir test e-postasıdır. Bot e-posta gönderme işlevi çalışıyor.",
-            test_file
-        )
-        
-        # Test dosyasını sil
-        test_file.unlink()
+        with JobWorkspace.create("test_email") as workspace:
+            test_file = workspace.scratch_path("test_email.xlsx")
+            test_wb.save(test_file)
+            test_wb.close()
+            
+            # E-posta gönder (test dosyası workspace kapanınca silinir)
+            success = await send_email_with_attachment(
+                [email],
+                "📧 Test E-postası - Data_listesi_Hıdır",
+                "Bu bir test e-postasıdır. Bot e-posta gönderme işlevi çalışıyor.",
+                test_file
+            )
         
         if success:
             await message.answer(f"✅ Test e-postası gönderildi: {email}")
@@ -511,11 +486,11 @@ async def cmd_get_logfile(message: Message):
             await message.answer("❌ Log dosyası çok büyük (50MB+).")
             return
         
-        # Dosyayı gönder
+        # Dosyayı diskten parça parça okuyarak gönder
         await message.bot.send_document(
             chat_id=message.chat.id,
-            document=BufferedInputFile(
-                log_path.read_bytes(),
+            document=FSInputFile(
+                log_path,
                 filename=f"bot_log_{datetime.now().strftime('%Y%m%d_%H%M')}.log"
             ),
             caption="📝 Bot log dosyası"
@@ -526,6 +501,157 @@ async def cmd_get_logfile(message: Message):
         await message.answer("❌ Log dosyası gönderilemedi.")
 
 
+# Performans raporu
+STAGE_ORDER = ["job", "clean", "split", "zip", "mail"]
+
+@router.message(Command("perf"))
+async def cmd_perf(message: Message, command: CommandObject):
+    """Son N işin aşama bazlı süre raporu (p50/p95)"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ Bu komutu kullanma yetkiniz yok.")
+        return
+    
+    try:
+        limit = int(command.args) if command.args else 20
+        stages = await asyncio.to_thread(job_store.recent_stages, max(1, min(limit, 500)))
+        
+        if not stages:
+            await message.answer("⏱️ Henüz ölçülmüş iş yok.")
+            return
+        
+        summary = summarize_stages(stages)
+        job_count = len({s["job_id"] for s in stages})
+        ordered = sorted(
+            summary.items(),
+            key=lambda item: STAGE_ORDER.index(item[0]) if item[0] in STAGE_ORDER else len(STAGE_ORDER)
+        )
+        
+        lines = [f"⏱️ <b>Performans Raporu</b> (son {job_count} iş)", ""]
+        for stage, s in ordered:
+            lines.append(
+                f"<b>{stage}</b> ×{s['count']}\n"
+                f"  p50: {s['p50_ms']:.0f} ms | p95: {s['p95_ms']:.0f} ms | CPU ort: {s['avg_cpu_ms']:.0f} ms\n"
+                f"  {s['rows_per_s']:.0f} satır/sn | {s['bytes'] / 1024 / 1024:.1f} MB | RSS tepe: {s['peak_rss_mb']:.0f} MB"
+            )
+        
+        await message.answer("\n".join(lines))
+        
+    except ValueError:
+        await message.answer("❌ Kullanım: /perf [iş sayısı]")
+    except Exception as e:
+        logger.error(f"Perf raporu hatası: {e}")
+        await message.answer("❌ Performans raporu alınamadı.")
+
+
+# Profil modu
+@router.message(Command("profile"))
+async def cmd_profile(message: Message, command: CommandObject):
+    """
+    /profile on [N] → sonraki N işi profiller (varsayılan 1)
+    /profile off    → profillemeyi kapatır
+    /profile        → durum
+    """
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ Bu komutu kullanma yetkiniz yok.")
+        return
+    
+    args = (command.args or "").split()
+    mode = args[0].lower() if args else ""
+    
+    if mode == "on":
+        try:
+            runs = max(1, min(int(args[1]), 20)) if len(args) > 1 else 1
+        except ValueError:
+            await message.answer("❌ Kullanım: /profile on [iş sayısı]")
+            return
+        profile_manager.enable(message.bot, message.chat.id, runs)
+        await message.answer(
+            f"🔬 Profil modu açık: sonraki {runs} iş profillenecek.\n"
+            "Rapor ve collapsed stack dosyası buraya gönderilecek."
+        )
+    elif mode == "off":
+        profile_manager.disable()
+        await message.answer("🔬 Profil modu kapatıldı.")
+    else:
+        await message.answer(
+            f"🔬 Profil modu: {'açık' if profile_manager.remaining else 'kapalı'}\n"
+            f"Kalan iş: {profile_manager.remaining}\n\n"
+            "/profile on [N] - /profile off"
+        )
+
+
+# Event loop'u bloke eden çağrılar
+@router.message(Command("blockers"))
+async def cmd_blockers(message: Message):
+    """Watchdog'un yakaladığı loop blokajlarını listeler"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ Bu komutu kullanma yetkiniz yok.")
+        return
+    
+    blockers = loop_watchdog.top_blockers()
+    if not blockers:
+        await message.answer(f"🐕 Eşiği ({loop_watchdog.threshold}s) aşan loop blokajı yok.")
+        return
+    
+    lines = ["🐢 <b>Loop'u Bloke Eden Çağrılar</b>", ""]
+    for i, item in enumerate(blockers, 1):
+        lines.append(f"{i}. <code>{item['location']}</code> ×{item['count']} (en uzun: {item['max_stall']:.1f}s)")
+    
+    await message.answer("\n".join(lines))
+
+
+# Mail teslimat kutusu
+@router.message(Command("outbox"))
+async def cmd_outbox(message: Message, command: CommandObject):
+    """
+    /outbox        → teslimat durumları, bekleyen ve başarısız son teslimatlar
+    /outbox retry  → başarısız teslimatları yeniden sıraya alır
+    """
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ Bu komutu kullanma yetkiniz yok.")
+        return
+    
+    try:
+        if (command.args or "").strip().lower() == "retry":
+            count = await outbox.retry_failed()
+            await message.answer(f"📮 {count} başarısız teslimat yeniden sıraya alındı.")
+            return
+        
+        summary = await outbox.summary()
+        lines = [
+            "📮 <b>Mail Teslimat Kutusu</b>",
+            f"• Bekleyen: {summary.get('pending', 0) + summary.get('sending', 0)}",
+            f"• Gönderilen: {summary.get('sent', 0)}",
+            f"• Başarısız: {summary.get('failed', 0)}",
+        ]
+        if summary.get("cancelled"):
+            lines.append(f"• İptal: {summary['cancelled']}")
+        
+        now = datetime.now().timestamp()
+        pending = await outbox.recent(PENDING_STATES, limit=5)
+        if pending:
+            lines.extend(["", "⏳ <b>Bekleyenler:</b>"])
+            for row in pending:
+                wait = max(0, row["next_attempt_at"] - now)
+                lines.append(
+                    f"• {row['recipient']} ({row['job_id']}) - {row['attempts']} deneme, "
+                    f"sonraki ~{wait / 60:.0f} dk\n  {row['last_error'] or ''}"
+                )
+        
+        failed = await outbox.recent(("failed",), limit=5)
+        if failed:
+            lines.extend(["", "❌ <b>Başarısızlar:</b>"])
+            for row in failed:
+                lines.append(f"• {row['recipient']} ({row['job_id']}): {row['last_error']}")
+            lines.append("\n/outbox retry ile yeniden denenebilir.")
+        
+        await message.answer("\n".join(lines))
+        
+    except Exception as e:
+        logger.error(f"Outbox raporu hatası: {e}")
+        await message.answer("❌ Outbox durumu alınamadı.")
+
+
 # Grup detaylarını gösterir
 @router.callback_query(F.data == "admin_group_details")
 async def show_group_details(callback: CallbackQuery):
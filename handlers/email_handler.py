@@ -11,7 +11,6 @@ Reply keyboard desteği
 Bu şekilde iki aşamalı işleminiz tamamlanmış olur!
 """
 import zipfile
-import tempfile
 from pathlib import Path
 from aiogram import Router, F
 from aiogram.types import Message
@@ -20,6 +19,7 @@ from aiogram.filters import Command
 from config import config
 from utils.mailer import send_email_with_attachment
 from utils.logger import logger
+from utils.workspace import JobWorkspace, iter_files
 
 router = Router()
 
@@ -30,22 +30,20 @@ async def cmd_toplu_mail(message: Message):
         await message.answer("📧 Input ve Output dosyaları ZIP yapılıp mail gönderiliyor...")
         
         # Input ve Output klasörlerini kontrol et
-        if not any(config.INPUT_DIR.iterdir()) and not any(config.OUTPUT_DIR.iterdir()):
+        if not any(iter_files(config.INPUT_DIR)) and not any(iter_files(config.OUTPUT_DIR)):
             await message.answer("❌ Input veya Output klasörü boş. Önce /process komutu ile işlem yapın.")
             return
         
-        # ZIP oluştur
-        zip_path = await create_input_output_zip()
-        
-        if not zip_path:
-            await message.answer("❌ ZIP dosyası oluşturulamadı.")
-            return
-        
-        # Mail gönder
-        success = await send_zip_email(zip_path)
-        
-        # Geçici ZIP'i sil
-        zip_path.unlink(missing_ok=True)
+        with JobWorkspace.create("toplu") as workspace:
+            # ZIP oluştur
+            zip_path = await create_input_output_zip(workspace)
+            
+            if not zip_path:
+                await message.answer("❌ ZIP dosyası oluşturulamadı.")
+                return
+            
+            # Mail gönder (geçici ZIP workspace kapanınca silinir)
+            success = await send_zip_email(zip_path)
         
         if success:
             await message.answer(
@@ -59,11 +57,11 @@ async def cmd_toplu_mail(message: Message):
         logger.error(f"Toplu mail hatası: {e}")
         await message.answer("❌ İşlem sırasında hata oluştu.")
 
-async def create_input_output_zip() -> Path:
+async def create_input_output_zip(workspace: JobWorkspace) -> Path:
     """Input ve Output klasörlerindeki dosyaları ZIP yapar"""
     try:
         # ZIP dosyası için isim oluştur (input dosyasından)
-        input_files = list(config.INPUT_DIR.glob("*.xlsx"))
+        input_files = [path for path in iter_files(config.INPUT_DIR) if path.suffix == ".xlsx"]
         zip_name = "output_files"
         
         if input_files:
@@ -72,18 +70,16 @@ async def create_input_output_zip() -> Path:
             zip_name = first_input.stem[:6] if first_input.stem else "output_files"
         
         # Geçici ZIP dosyası
-        zip_path = Path(tempfile.gettempdir()) / f"{zip_name}_toplu.zip"
+        zip_path = workspace.scratch_path(f"{zip_name}_toplu.zip")
         
         with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Input dosyalarını ekle
-            for file_path in config.INPUT_DIR.glob("*"):
-                if file_path.is_file():
-                    zipf.write(file_path, f"input/{file_path.name}")
+            # Input dosyalarını ekle (iş dizinleriyle: input/<job_id>/<dosya>)
+            for file_path in iter_files(config.INPUT_DIR):
+                zipf.write(file_path, f"input/{file_path.relative_to(config.INPUT_DIR).as_posix()}")
             
             # Output dosyalarını ekle
-            for file_path in config.OUTPUT_DIR.glob("*"):
-                if file_path.is_file():
-                    zipf.write(file_path, f"output/{file_path.name}")
+            for file_path in iter_files(config.OUTPUT_DIR):
+                zipf.write(file_path, f"output/{file_path.relative_to(config.OUTPUT_DIR).as_posix()}")
         
         return zip_path
         
@@ -122,8 +118,8 @@ async def send_zip_email(zip_path: Path) -> bool:
 async def cmd_dosyalari_goster(message: Message):
     """Input ve Output'taki dosyaları listeler"""
     try:
-        input_files = list(config.INPUT_DIR.glob("*"))
-        output_files = list(config.OUTPUT_DIR.glob("*"))
+        input_files = list(iter_files(config.INPUT_DIR))
+        output_files = list(iter_files(config.OUTPUT_DIR))
         
         response = ["📁 **DOSYA DURUMU**"]
         
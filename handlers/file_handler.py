@@ -10,13 +10,13 @@
 import os
 import shutil
 import zipfile
-import tempfile
-from pathlib import Path
 from aiogram import Router, F
 from aiogram.types import Message, FSInputFile, CallbackQuery
 from aiogram.filters import Command
 from config import config
 from utils.logger import logger
+from utils.workspace import JobWorkspace, iter_files
+from utils.janitor import janitor, clear_policies, summarize
 
 router = Router()
 
@@ -51,25 +51,23 @@ async def cmd_clear(message: Message):
 async def download_output_files(message: Message):
     """Output dosyalarını zip olarak indir"""
     try:
-        if not config.OUTPUT_DIR.exists() or not any(config.OUTPUT_DIR.iterdir()):
+        output_files = list(iter_files(config.OUTPUT_DIR))
+        if not output_files:
             await message.answer("❌ Output klasörü boş veya mevcut değil.")
             return
         
-        # Zip dosyası oluştur
-        zip_path = Path(tempfile.gettempdir()) / f"output_files_{message.from_user.id}.zip"
-        
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for file_path in config.OUTPUT_DIR.glob('*'):
-                if file_path.is_file():
-                    zipf.write(file_path, file_path.name)
-        
-        await message.answer_document(
-            FSInputFile(zip_path),
-            caption="📁 Output dosyaları"
-        )
-        
-        # Geçici zip dosyasını sil
-        zip_path.unlink()
+        # Zip dosyası oluştur (iş dizinleri korunur: <job_id>/<dosya>)
+        with JobWorkspace.create("files") as workspace:
+            zip_path = workspace.scratch_path("output_files.zip")
+            
+            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                for file_path in output_files:
+                    zipf.write(file_path, file_path.relative_to(config.OUTPUT_DIR).as_posix())
+            
+            await message.answer_document(
+                FSInputFile(zip_path),
+                caption="📁 Output dosyaları"
+            )
         
     except Exception as e:
         logger.error(f"Output indirme hatası: {e}")
@@ -83,20 +81,18 @@ async def download_log_files(message: Message):
             return
         
         # Zip dosyası oluştur
-        zip_path = Path(tempfile.gettempdir()) / f"log_files_{message.from_user.id}.zip"
-        
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for file_path in config.LOGS_DIR.glob('*'):
-                if file_path.is_file():
-                    zipf.write(file_path, file_path.name)
-        
-        await message.answer_document(
-            FSInputFile(zip_path),
-            caption="📝 Log dosyaları"
-        )
-        
-        # Geçici zip dosyasını sil
-        zip_path.unlink()
+        with JobWorkspace.create("files") as workspace:
+            zip_path = workspace.scratch_path("log_files.zip")
+            
+            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                for file_path in config.LOGS_DIR.glob('*'):
+                    if file_path.is_file():
+                        zipf.write(file_path, file_path.name)
+            
+            await message.answer_document(
+                FSInputFile(zip_path),
+                caption="📝 Log dosyaları"
+            )
         
     except Exception as e:
         logger.error(f"Log indirme hatası: {e}")
@@ -105,39 +101,10 @@ async def download_log_files(message: Message):
 async def clear_all(message: Message):
     """Output, Input ve temp temizliği"""
     try:
-        cleared_files = 0
-        cleared_size = 0
-        
-        # Input dizini
-        if config.INPUT_DIR.exists():
-            for file_path in config.INPUT_DIR.glob('*'):
-                if file_path.is_file():
-                    file_size = file_path.stat().st_size
-                    file_path.unlink()
-                    cleared_files += 1
-                    cleared_size += file_size
-        
-        # Output dizini
-        if config.OUTPUT_DIR.exists():
-            for file_path in config.OUTPUT_DIR.glob('*'):
-                if file_path.is_file():
-                    file_size = file_path.stat().st_size
-                    file_path.unlink()
-                    cleared_files += 1
-                    cleared_size += file_size
-        
-        # Temp dizini (varsa)
-        temp_dir = Path(tempfile.gettempdir())
-        for pattern in ['*.xlsx', '*.xls', '*.tmp']:
-            for file_path in temp_dir.glob(pattern):
-                if file_path.is_file():
-                    try:
-                        file_size = file_path.stat().st_size
-                        file_path.unlink()
-                        cleared_files += 1
-                        cleared_size += file_size
-                    except:
-                        pass
+        # Input, Output ve ara dosyalar (iş alt dizinleri dahil, çalışan işler hariç).
+        # Sistem temp dizinine dokunulmaz: başka işlemlerin dosyaları orada olabilir.
+        results = await janitor.run(clear_policies())
+        cleared_files, cleared_size = summarize(results)
         
         cleared_size_mb = cleared_size / (1024 * 1024)
         
@@ -5,14 +5,16 @@
 
 """
 import os
-import tempfile
 import logging
 from aiogram import F, Router
 from aiogram.types import Message, BufferedInputFile
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from pathlib import Path
 from utils.json_processing import process_excel_to_json
+from utils.telegram_files import download_document
+from utils.workspace import JobWorkspace
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -38,15 +40,12 @@ async def handle_excel_file(message: Message, state: FSMContext):
         await state.clear()
         return
 
+    workspace = JobWorkspace.create("json")
     try:
         # Dosyayı indir
-        file_info = await message.bot.get_file(message.document.file_id)
-        downloaded_file = await message.bot.download_file(file_info.file_path)
-
-        # Geçici dosya oluştur
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-            tmp_file.write(downloaded_file.read())
-            temp_file_path = tmp_file.name
+        # Geçici dosya işin scratch dizininde (içerik bellekte tutulmadan doğrudan dosyaya gelir)
+        temp_file_path = str(workspace.scratch_path("groups.xlsx"))
+        await download_document(message.bot, message.document.file_id, Path(temp_file_path))
 
         # İşlemi başlat
         await message.answer("⏳ Excel dosyası işleniyor...")
@@ -62,24 +61,16 @@ async def handle_excel_file(message: Message, state: FSMContext):
             # JSON dosyasını gönder
             input_file = BufferedInputFile(json_data, filename="groups.json")
             await message.answer_document(input_file, caption="✅ Grup verileri başarıyla oluşturuldu!")
-            
-            # Geçici dosyayı sil
-            os.unlink(temp_file_path)
-            logger.info(f"Geçici Excel dosyası silindi: {temp_file_path}")
         else:
             await message.answer("❌ JSON dosyası oluşturulamadı.")
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
 
     except Exception as e:
         logger.error(f"JSON işleme hatası: {str(e)}", exc_info=True)
         await message.answer(f"❌ Hata oluştu: {str(e)}")
-        
-        # Hata durumunda geçici dosyayı temizle
-        if 'temp_file_path' in locals() and os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
     
     finally:
+        # Geçici Excel dosyası scratch ile birlikte silinir
+        workspace.close()
         await state.clear()
 
 @router.message(JsonProcessingState.waiting_for_excel)
@@ -3,10 +3,14 @@ from aiogram import Router
 from aiogram.types import Message
 from aiogram.filters import Command
 from datetime import datetime, timedelta
-import aiofiles
+import asyncio
+import html
 from config import config
 from utils.logger import logger
 from utils.file_utils import get_recent_processed_files, get_file_stats
+from utils.log_reader import tail_lines, search_logs
+
+MAX_LOG_LINES = 100
 
 router = Router()
 
@@ -55,23 +59,64 @@ async def cmd_files(message: Message):
         logger.error(f"Files komutu hatası: {e}")
         await message.answer("❌ Dosya listesi alınamadı.")
 
+def parse_log_filters(text: str) -> dict:
+    """
+    /logs argümanlarını ayrıştırır:
+    /logs n=30 seviye=ERROR saat=6 job=ab12cd ara=mail
+    """
+    filters = {}
+    for arg in text.strip().split()[1:]:
+        key, _, value = arg.partition("=")
+        key = key.lower()
+        if not value:
+            continue
+        if key == "n":
+            filters["limit"] = max(1, min(int(value), MAX_LOG_LINES))
+        elif key in ("seviye", "level"):
+            filters["level"] = value.upper()
+        elif key in ("saat", "hours"):
+            filters["since"] = datetime.now() - timedelta(hours=float(value))
+        elif key == "job":
+            filters["job_id"] = value
+        elif key in ("ara", "text"):
+            filters["text"] = value
+    return filters
+
 @router.message(Command("logs"))
 async def cmd_logs(message: Message):
+    """
+    /logs → son 20 satır
+    /logs seviye=ERROR saat=24 job=<id> ara=<metin> n=<adet> → filtreli arama
+    """
     try:
         log_path = config.LOGS_DIR / "bot.log"
         if not log_path.exists():
             await message.answer("📝 Log dosyası bulunamadı.")
             return
 
-        async with aiofiles.open(log_path, 'r', encoding='utf-8') as f:
-            lines = await f.readlines()
-            last_lines = lines[-20:] if len(lines) > 20 else lines
+        try:
+            filters = parse_log_filters(message.text or "")
+        except ValueError:
+            await message.answer("❌ Geçersiz filtre. Örnek: /logs seviye=ERROR saat=6 n=30")
+            return
+
+        limit = filters.pop("limit", 20)
+        if filters:
+            last_lines = await asyncio.to_thread(search_logs, "bot.log", limit=limit, **filters)
+            title = "Filtrelenmiş Loglar"
+        else:
+            last_lines = await asyncio.to_thread(tail_lines, log_path, limit)
+            title = "Son Loglar"
+
+        if not last_lines:
+            await message.answer("📝 Filtreye uyan log bulunamadı.")
+            return
 
-        log_content = "".join(last_lines)
+        log_content = "\n".join(last_lines)
         if len(log_content) > 4000:
             log_content = log_content[-4000:]
 
-        await message.answer(f"<b>Son Loglar:</b>\n<pre>{log_content}</pre>", parse_mode="HTML")
+        await message.answer(f"<b>{title}:</b>\n<pre>{html.escape(log_content)}</pre>", parse_mode="HTML")
     except Exception as e:
         logger.error(f"Logs komutu hatası: {e}")
         await message.answer("❌ Loglar alınamadı.")
@@ -31,7 +31,7 @@ handlers/reply_handler.py dosyasına TEK butonu ekle
 # TEK butonu handler'ı ekle
 
 """
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from aiogram import Router, F
 from aiogram.types import Message, BufferedInputFile
@@ -46,8 +46,14 @@ from utils.validator import validate_excel_file
 from utils.mailer import send_email_with_attachment
 from utils.reporter import generate_processing_report
 from utils.logger import logger
+from utils.job_store import job_store
+from utils.perf import job_perf, span
+from utils.metrics import QUEUE_DEPTH, record_job_metrics
+from utils.profiler import profile_manager
+from utils.telegram_files import download_document
+from utils.workspace import JobWorkspace
+from utils.scheduler import job_scheduler, describe_ticket
 
-import tempfile
 import asyncio
 from pathlib import Path
 
@@ -70,7 +76,8 @@ async def cmd_tek(message: Message, state: FSMContext):
 
 @router.message(TekProcessingStates.waiting_for_file, F.document)
 async def handle_tek_excel_upload(message: Message, state: FSMContext):
-    """Tek işlem için Excel dosyasını işler"""
+    """Tek işlem için Excel dosyasını alır ve zamanlayıcıya bırakır"""
+    workspace = None
     try:
         file_id = message.document.file_id
         file_name = message.document.file_name
@@ -80,25 +87,50 @@ async def handle_tek_excel_upload(message: Message, state: FSMContext):
             await state.clear()
             return
         
-        # Dosyayı indir
-        bot = message.bot
-        file = await bot.get_file(file_id)
-        file_path = config.INPUT_DIR / file_name
-        
-        await bot.download_file(file.file_path, file_path)
+        # Dosyayı indir (işe özel input dizinine)
+        workspace = JobWorkspace.create("tek")
+        file_path = workspace.input_path(file_name)
+        await download_document(message.bot, file_id, file_path)
         
         # Doğrulama
         validation_result = validate_excel_file(str(file_path))
         if not validation_result["valid"]:
             await message.answer(f"❌ {validation_result['message']}")
             await state.clear()
-            file_path.unlink()
+            workspace.discard()
             return
         
-        await message.answer("⏳ TEK işlem başlatıldı...")
+        # TEK işlemi zamanlayıcıda sırası gelince çalışır
+        job_workspace, workspace = workspace, None  # artık işe ait, iş bitince kapatılır
+        ticket = job_scheduler.submit(
+            message.from_user.id,
+            validation_result["row_count"],
+            lambda ticket: run_tek_job(message, file_path, job_workspace, ticket),
+            admin=message.from_user.id in config.ADMIN_CHAT_IDS,
+        )
+        if ticket.queued:
+            await message.answer(describe_ticket(ticket))
+        else:
+            await message.answer("⏳ TEK işlem başlatıldı...")
+        
+    except Exception as e:
+        logger.error(f"TEK işleme hatası: {e}")
+        await message.answer("❌ Dosya işlenirken bir hata oluştu.")
+        if workspace is not None:
+            workspace.discard()
+    finally:
+        if workspace is not None:
+            workspace.close()
+        await state.clear()
+
+async def run_tek_job(message: Message, file_path: Path, workspace: JobWorkspace, ticket):
+    """Sırası gelen TEK işini çalıştırır, raporu ve dosyaları kullanıcıya gönderir"""
+    try:
+        if ticket.queued:
+            await message.answer("⏳ Sıranız geldi, TEK işlem başlatıldı...")
         
         # TEK işlemini gerçekleştir
-        task_result = await process_tek_task(file_path, message.from_user.id)
+        task_result = await process_tek_task(file_path, message.from_user.id, workspace)
         
         if task_result["success"]:
             # Rapor oluştur
@@ -124,27 +156,49 @@ async def handle_tek_excel_upload(message: Message, state: FSMContext):
         logger.error(f"TEK işleme hatası: {e}")
         await message.answer("❌ Dosya işlenirken bir hata oluştu.")
     finally:
-        await state.clear()
+        workspace.close()
 
 @router.message(TekProcessingStates.waiting_for_file)
 async def handle_tek_wrong_file_type(message: Message):
     await message.answer("❌ Lütfen bir Excel dosyası gönderin.")
 
-async def process_tek_task(input_path: Path, user_id: int) -> Dict[str, Any]:
-    """TEK işlemi için özel görev"""
-    cleaning_result = None
+async def process_tek_task(input_path: Path, user_id: int, workspace: Optional[JobWorkspace] = None) -> Dict[str, Any]:
+    """TEK işlemi için özel görev - sonucu job_store'a kaydeder"""
+    owned = workspace is None
+    if owned:
+        workspace = JobWorkspace.create("tek")
+    job_id = workspace.job_id
+    job_store.defer(job_store.start_job, job_id, "tek", user_id, input_path)
+    QUEUE_DEPTH.inc(queue="jobs_running")
+    try:
+        async with profile_manager.session(f"tek_{job_id}"):
+            with job_perf(job_id, "tek"):
+                result = await _run_tek_task(workspace, input_path, user_id)
+    finally:
+        QUEUE_DEPTH.dec(queue="jobs_running")
+        if owned:
+            workspace.close()
+    result["job_id"] = job_id
+    job_store.defer(job_store.finish_job, job_id, result)
+    record_job_metrics("tek", result)
+    return result
+
+async def _run_tek_task(workspace: JobWorkspace, input_path: Path, user_id: int) -> Dict[str, Any]:
+    """TEK işlemi adımları: temizle, ayır, tek maile gönder (ara dosyalar workspace ile silinir)"""
+    job_id = workspace.job_id
     try:
-        logger.info(f"TEK işlemi başlatıldı: {input_path.name}, Kullanıcı: {user_id}")
+        logger.info(f"TEK işlemi başlatıldı [{job_id}]: {input_path.name}, Kullanıcı: {user_id}")
 
         # 1. Excel dosyasını temizle
-        cleaning_result = clean_excel_headers(str(input_path))
+        cleaning_result = clean_excel_headers(str(input_path), workspace)
         if not cleaning_result["success"]:
             return {"success": False, "error": cleaning_result.get("error", "Temizleme hatası")}
         
         # 2. Dosyayı gruplara ayır (normal işlem gibi)
         splitting_result = split_excel_by_groups(
             cleaning_result["temp_path"],
-            cleaning_result["headers"]
+            cleaning_result["headers"],
+            workspace
         )
         
         if not splitting_result["success"]:
@@ -156,7 +210,7 @@ async def process_tek_task(input_path: Path, user_id: int) -> Dict[str, Any]:
         
         if output_files and config.PERSONAL_EMAIL:
             # Tüm dosyaları tek mailde gönder
-            email_success = await send_multiple_files_email(output_files)
+            email_success = await send_multiple_files_email(output_files, workspace)
         
         return {
             "success": email_success,
@@ -170,15 +224,8 @@ async def process_tek_task(input_path: Path, user_id: int) -> Dict[str, Any]:
     except Exception as e:
         logger.error(f"TEK işlem hatası: {e}")
         return {"success": False, "error": str(e)}
-    finally:
-        # Geçici dosyaları temizle
-        try:
-            if cleaning_result and "temp_path" in cleaning_result:
-                Path(cleaning_result["temp_path"]).unlink(missing_ok=True)
-        except:
-            pass
-
-async def send_multiple_files_email(output_files: Dict[str, Any]) -> bool:
+
+async def send_multiple_files_email(output_files: Dict[str, Any], workspace: JobWorkspace) -> bool:
     """Birden fazla dosyayı tek mailde gönderir"""
     if not config.PERSONAL_EMAIL:
         logger.error("PERSONAL_EMAIL tanımlı değil")
@@ -187,13 +234,13 @@ async def send_multiple_files_email(output_files: Dict[str, Any]) -> bool:
     try:
         # Tüm dosyaları zip yap
         import zipfile
-        import tempfile
         
-        zip_path = Path(tempfile.gettempdir()) / "tek_islem_output.zip"
+        zip_path = workspace.scratch_path("tek_islem_output.zip")
         
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        with span("zip") as zip_span, zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
             for file_info in output_files.values():
                 zipf.write(file_info["path"], file_info["filename"])
+            zip_span.bytes = sum(info.file_size for info in zipf.infolist())
         
         # Mail gönder
         subject = "📊 TEK İŞLEM - Grup Raporları"
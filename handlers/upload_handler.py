@@ -1,3 +1,5 @@
+import asyncio
+
 from aiogram import Router, F
 from aiogram.types import Message, BufferedInputFile
 from aiogram.filters import Command
@@ -8,13 +10,20 @@ from config import config
 from utils.excel_cleaner import clean_excel_headers
 from utils.excel_splitter import split_excel_by_groups
 from utils.validator import validate_excel_file
-from utils.reporter import generate_processing_report
+from utils.reporter import generate_processing_report, generate_delivery_report
 from utils.file_namer import generate_output_filename
 from jobs.process_excel import process_excel_task
 from utils.logger import logger
+from utils.outbox import outbox, PENDING_STATES
+from utils.telegram_files import download_document
+from utils.workspace import JobWorkspace
+from utils.scheduler import job_scheduler, describe_ticket
 
 router = Router()
 
+# İş bittikten sonra mail sonucunu bekleyen bildirim task'ları
+_delivery_reports = set()
+
 class ProcessingStates(StatesGroup):
     waiting_for_file = State()
 
@@ -48,6 +57,7 @@ async def handle_cancel_command(message: Message, state: FSMContext):
 
 @router.message(ProcessingStates.waiting_for_file, F.document)
 async def handle_excel_upload(message: Message, state: FSMContext):
+    workspace = None
     try:
         file_id = message.document.file_id
         file_name = message.document.file_name
@@ -57,25 +67,46 @@ async def handle_excel_upload(message: Message, state: FSMContext):
             await state.clear()
             return
         
-        # Dosyayı indir
-        bot = message.bot
-        file = await bot.get_file(file_id)
-        file_path = config.INPUT_DIR / file_name
-        
-        await bot.download_file(file.file_path, file_path)
+        # Dosyayı indir (işe özel input dizinine)
+        workspace = JobWorkspace.create("process")
+        file_path = workspace.input_path(file_name)
+        await download_document(message.bot, file_id, file_path)
         
         # Doğrulama
         validation_result = validate_excel_file(file_path)
         if not validation_result["valid"]:
             await message.answer(f"❌ {validation_result['message']}")
             await state.clear()
-            file_path.unlink()  # Geçici dosyayı sil
+            workspace.discard()  # İndirilen dosyayı sil
             return
         
-        await message.answer("⏳ Dosya işleniyor, lütfen bekleyin...")
+        # Normal grup işlemi: zamanlayıcıya bırakılır, sıra ve tahmini bekleme bildirilir
+        job_workspace, workspace = workspace, None  # artık işe ait, iş bitince kapatılır
+        ticket = job_scheduler.submit(
+            message.from_user.id,
+            validation_result["row_count"],
+            lambda ticket: run_process_job(message, file_path, job_workspace, ticket),
+            admin=message.from_user.id in config.ADMIN_CHAT_IDS,
+        )
+        await message.answer(describe_ticket(ticket))
+        
+    except Exception as e:
+        logger.error(f"Dosya işleme hatası: {e}")
+        await message.answer("❌ Dosya işlenirken bir hata oluştu.")
+        if workspace is not None:
+            workspace.discard()
+    finally:
+        if workspace is not None:
+            workspace.close()
+        await state.clear()
+
+async def run_process_job(message: Message, file_path, workspace: JobWorkspace, ticket):
+    """Sırası gelen işi çalıştırır ve raporu kullanıcıya gönderir"""
+    try:
+        if ticket.queued:
+            await message.answer("⏳ Sıranız geldi, dosya işleniyor...")
         
-        # Normal grup işlemi
-        task_result = await process_excel_task(file_path, message.from_user.id)
+        task_result = await process_excel_task(file_path, message.from_user.id, workspace)
         
         if task_result["success"]:
             # Rapor oluştur
@@ -83,6 +114,7 @@ async def handle_excel_upload(message: Message, state: FSMContext):
             
             # Kullanıcıya rapor gönder
             await message.answer(report)
+            schedule_delivery_report(message, task_result.get("delivery_ids", []))
             
         else:
             await message.answer(f"❌ İşlem sırasında hata oluştu: {task_result['error']}")
@@ -91,7 +123,25 @@ async def handle_excel_upload(message: Message, state: FSMContext):
         logger.error(f"Dosya işleme hatası: {e}")
         await message.answer("❌ Dosya işlenirken bir hata oluştu.")
     finally:
-        await state.clear()
+        workspace.close()
+
+def schedule_delivery_report(message: Message, ids: list):
+    """Rapordan sonra sonuçlanacak teslimatlar varsa sonucu arka planda bildirir (worker'ı tutmaz)"""
+    if not ids:
+        return
+    task = asyncio.create_task(send_delivery_report(message, ids), name="delivery-report")
+    _delivery_reports.add(task)
+    task.add_done_callback(_delivery_reports.discard)
+
+async def send_delivery_report(message: Message, ids: list):
+    try:
+        rows = await outbox.get(ids)
+        if not any(row["state"] in PENDING_STATES for row in rows.values()):
+            return
+        states = await outbox.wait(ids, config.OUTBOX_WAIT_SECONDS)
+        await message.answer(generate_delivery_report(list(states.values())))
+    except Exception as e:
+        logger.error(f"Mail teslimat sonucu bildirilemedi: {e}")
 
 @router.message(ProcessingStates.waiting_for_file)
 async def handle_wrong_file_type(message: Message):
@@ -2,31 +2,65 @@
 """
 ZIP içinde klasör ayrımı olmadan, tüm input ve output Excel dosyalarının aynı klasörde (düz olarak) bir arada
 
+Aşamalar üst üste biner: ayırma thread'de çalışır, her grup dosyası yazılır
+yazılmaz teslimatları outbox'a yazılır ve dosya toplu ZIP'e eklenir
+(DeliveryPipeline). Kalan gruplar yazılırken ilk grupların mailleri gider.
+İş teslimatlar yazılınca biter; gönderim sonuçları kullanıcıya ayrıca
+bildirilir (delivery_ids, handlers/upload_handler.py).
 """
 import asyncio
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import zipfile
-import tempfile
 
 from utils.excel_cleaner import clean_excel_headers
 from utils.excel_splitter import split_excel_by_groups
-from utils.mailer import send_email_with_attachment
+from utils.outbox import outbox, Delivery, BULK_GROUP, PENDING_STATES
 from utils.group_manager import group_manager
 from utils.logger import logger
+from utils.job_store import job_store
+from utils.perf import job_perf, span
+from utils.metrics import QUEUE_DEPTH, record_job_metrics
+from utils.profiler import profile_manager
+from utils.workspace import JobWorkspace
 from config import config
 
 from datetime import datetime, timedelta
 
 
-async def process_excel_task(input_path: Path, user_id: int) -> Dict[str, Any]:
+async def process_excel_task(input_path: Path, user_id: int, workspace: Optional[JobWorkspace] = None) -> Dict[str, Any]:
+    """
+    Excel işleme görevini yürütür ve sonucunu job_store'a kaydeder.
+    workspace verilmezse iş için yenisi açılır ve iş bitince kapatılır.
+    """
+    owned = workspace is None
+    if owned:
+        workspace = JobWorkspace.create("process")
+    job_id = workspace.job_id
+    job_store.defer(job_store.start_job, job_id, "process", user_id, input_path)
+    QUEUE_DEPTH.inc(queue="jobs_running")
+    try:
+        async with profile_manager.session(f"process_{job_id}"):
+            with job_perf(job_id, "process"):
+                result = await _run_excel_task(workspace, input_path, user_id)
+    finally:
+        QUEUE_DEPTH.dec(queue="jobs_running")
+        if owned:
+            workspace.close()
+    result["job_id"] = job_id
+    job_store.defer(job_store.finish_job, job_id, result)
+    record_job_metrics("process", result)
+    return result
+
+
+async def _run_excel_task(workspace: JobWorkspace, input_path: Path, user_id: int) -> Dict[str, Any]:
     """Excel işleme görevini yürütür - TOPLU MAIL OTOMATİK EKLENDİ"""
-    cleaning_result = None
+    job_id = workspace.job_id
     try:
-        logger.info(f"Excel işleme başlatıldı: {input_path.name}, Kullanıcı: {user_id}")
+        logger.info(f"Excel işleme başlatıldı [{job_id}]: {input_path.name}, Kullanıcı: {user_id}")
 
         # 1. Excel dosyasını temizle ve düzenle
-        cleaning_result = clean_excel_headers(str(input_path))
+        cleaning_result = await asyncio.to_thread(clean_excel_headers, str(input_path), workspace)
         if not cleaning_result["success"]:
             error_msg = f"Excel temizleme hatası: {cleaning_result.get('error', 'Bilinmeyen hata')}"
             logger.error(error_msg)
@@ -34,91 +68,65 @@ async def process_excel_task(input_path: Path, user_id: int) -> Dict[str, Any]:
         
         logger.info(f"Excel temizlendi: {cleaning_result['row_count']} satır")
 
-        # 2. Dosyayı gruplara ayır
-        splitting_result = split_excel_by_groups(
-            cleaning_result["temp_path"],
-            cleaning_result["headers"]
-        )
+        # 2-3. Dosyayı gruplara ayır; her grup dosyası hazır olunca teslimatı
+        # outbox'a yazılır (GRUP MAILLERİ) ve toplu ZIP'e eklenir (TOPLU MAIL).
+        # Gönderim arka planda yapılır; SMTP kapalıysa teslimatlar kaybolmaz, tekrar denenir
+        pipeline = await DeliveryPipeline.start(job_id, input_path)
+        try:
+            splitting_result = await asyncio.to_thread(
+                split_excel_by_groups,
+                cleaning_result["temp_path"],
+                cleaning_result["headers"],
+                workspace,
+                pipeline.group_ready,
+            )
+        except BaseException:
+            await pipeline.abort()
+            raise
         
         if not splitting_result["success"]:
+            await pipeline.abort()
             error_msg = f"Excel ayırma hatası: {splitting_result.get('error', 'Bilinmeyen hata')}"
             logger.error(error_msg)
             return {"success": False, "error": error_msg}
         
         logger.info(f"Excel gruplara ayrıldı: {splitting_result['total_rows']} satır, {len(splitting_result['output_files'])} grup")
 
-        # 3. E-postaları gönder (async olarak) - GRUP MAILLERİ
-        email_tasks = []
         output_files = splitting_result["output_files"]
+        ids = await pipeline.finish()
+
+        # Gönderim beklenmez (worker tutulmaz): o ana kadar sonuçlananlar rapora
+        # girer, kalanların sonucu sonradan bildirilir ve job_store'a yazılır
+        if ids:
+            logger.info(f"{len(ids)} mail teslimatı outbox'a yazıldı [{job_id}]")
+        states = await outbox.status(ids)
+
         email_results = []
-        
-        for group_id, file_info in output_files.items():
-            group_info = group_manager.get_group_info(group_id)
-            recipients = group_info.get("email_recipients", [])
-            
-            if recipients and file_info["row_count"] > 0:
-                subject = f"{group_info.get('group_name', group_id)} Raporu - {file_info['filename']}"
-                body = (
-                    f"Merhaba,\n\n"
-                    f"{group_info.get('group_name', group_id)} grubu için {file_info['row_count']} satırlık rapor ekte gönderilmiştir.\n\n"
-                    f"İyi çalışmalar,\nData_listesi_Hıdır"
-                )
-                
-                # Her alıcı için ayrı mail gönderimi
-                for recipient in recipients:
-                    if recipient.strip():  # Boş email adreslerini atla
-                        task = send_email_with_attachment(
-                            [recipient.strip()], subject, body, file_info["path"]
-                        )
-                        email_tasks.append((task, group_id, recipient, file_info["path"].name))
-        
-        # Tüm mail görevlerini paralel çalıştır
-        if email_tasks:
-            logger.info(f"{len(email_tasks)} mail görevi başlatılıyor...")
-            
-            tasks = [task[0] for task in email_tasks]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Sonuçları işle
-            for i, result in enumerate(results):
-                task_info = email_tasks[i]
-                group_id, recipient, filename = task_info[1], task_info[2], task_info[3]
-                
-                if isinstance(result, Exception):
-                    logger.error(f"Mail gönderim hatası - Grup: {group_id}, Alıcı: {recipient}, Dosya: {filename}, Hata: {result}")
-                    email_results.append({
-                        "success": False,
-                        "group_id": group_id,
-                        "recipient": recipient,
-                        "error": str(result)
-                    })
-                else:
-                    logger.info(f"Mail gönderildi - Grup: {group_id}, Alıcı: {recipient}, Dosya: {filename}")
-                    email_results.append({
-                        "success": True,
-                        "group_id": group_id,
-                        "recipient": recipient
-                    })
-
-        # 4. OTOMATİK TOPLU MAIL GÖNDERİMİ - YENİ EKLENDİ
-        toplu_mail_success = False
-        if config.PERSONAL_EMAIL:
-            toplu_mail_success = await send_automatic_bulk_email(input_path, output_files)
-            if toplu_mail_success:
-                logger.info(f"✅ Otomatik toplu mail gönderildi: {config.PERSONAL_EMAIL}")
-            else:
-                logger.error(f"❌ Otomatik toplu mail gönderilemedi: {config.PERSONAL_EMAIL}")
+        toplu_mail_state = None
+        for row in states.values():
+            if row["group_id"] == BULK_GROUP:
+                toplu_mail_state = row["state"]
+                continue
+            result = {
+                "success": row["state"] == "sent",
+                "queued": row["state"] in PENDING_STATES,
+                "group_id": row["group_id"],
+                "recipient": row["recipient"],
+            }
+            if row["state"] != "sent":
+                result["error"] = row["last_error"] or "Gönderim bekliyor"
+            email_results.append(result)
 
-        # 5. Geçici dosyaları temizle
-        try:
-            if cleaning_result and "temp_path" in cleaning_result:
-                temp_path = Path(cleaning_result["temp_path"])
-                if temp_path.exists():
-                    temp_path.unlink()
-                    logger.info(f"Geçici dosya silindi: {temp_path.name}")
-        except Exception as e:
-            logger.warning(f"Geçici dosya silinemedi: {e}")
-        
+        # 4. OTOMATİK TOPLU MAIL
+        toplu_mail_success = toplu_mail_state == "sent"
+        if toplu_mail_state == "sent":
+            logger.info(f"✅ Otomatik toplu mail gönderildi: {config.PERSONAL_EMAIL}")
+        elif toplu_mail_state in PENDING_STATES:
+            logger.info(f"⏳ Otomatik toplu mail sırada: {config.PERSONAL_EMAIL}")
+        elif toplu_mail_state is not None:
+            logger.error(f"❌ Otomatik toplu mail gönderilemedi: {config.PERSONAL_EMAIL}")
+
+        # 5. Geçici dosyalar (temizlenmiş kopya) workspace kapanınca silinir
         return {
             "success": True,
             "output_files": output_files,
@@ -127,30 +135,45 @@ async def process_excel_task(input_path: Path, user_id: int) -> Dict[str, Any]:
             "email_results": email_results,
             "bulk_email_sent": toplu_mail_success,  # YENİ EKLENDİ
             "bulk_email_recipient": config.PERSONAL_EMAIL if toplu_mail_success else None,  # YENİ EKLENDİ
+            "bulk_email_queued": toplu_mail_state in PENDING_STATES,
+            "delivery_ids": ids,
             "user_id": user_id
         }
         
     except Exception as e:
         logger.error(f"İşlem görevi hatası: {e}", exc_info=True)
+        return {"success": False, "error": str(e)}
+
+
+def build_group_deliveries(output_files: Dict) -> List[Delivery]:
+    """Her grup alıcısı için ayrı teslimat (boş adresler ve boş dosyalar atlanır)"""
+    deliveries = []
+    for group_id, file_info in output_files.items():
+        group_info = group_manager.get_group_info(group_id)
+        recipients = group_info.get("email_recipients", [])
         
-        # Hata durumunda geçici dosyaları temizle
-        try:
-            if cleaning_result and "temp_path" in cleaning_result:
-                temp_path = Path(cleaning_result["temp_path"])
-                if temp_path.exists():
-                    temp_path.unlink()
-        except:
-            pass
+        if recipients and file_info["row_count"] > 0:
+            subject = f"{group_info.get('group_name', group_id)} Raporu - {file_info['filename']}"
+            body = (
+                f"Merhaba,\n\n"
+                f"{group_info.get('group_name', group_id)} grubu için {file_info['row_count']} satırlık rapor ekte gönderilmiştir.\n\n"
+                f"İyi çalışmalar,\nData_listesi_Hıdır"
+            )
             
-        return {"success": False, "error": str(e)}
+            for recipient in recipients:
+                if recipient.strip():  # Boş email adreslerini atla
+                    deliveries.append(Delivery(group_id, recipient.strip(), subject, body, file_info["path"]))
+    return deliveries
 
-async def send_automatic_bulk_email(input_path: Path, output_files: Dict) -> bool:
-    """Input ve Output dosyalarını ZIP yapıp PERSONAL_EMAIL'e gönderir"""
-    if not config.PERSONAL_EMAIL:
-        logger.error("PERSONAL_EMAIL tanımlı değil")
-        return False
-    
-    try:
+
+class BulkArchive:
+    """
+    Toplu ZIP (input + tüm output dosyaları, klasörsüz). Input açılışta,
+    grup dosyaları yazıldıkça eklenir; ayırma bittiğinde arşiv de hazırdır.
+    Tüm metotlar dosya yazar (deflate): loop'tan asyncio.to_thread ile çağrılır.
+    """
+
+    def __init__(self, input_path: Path, job_id: str):
         # UTC+3 saatini al
         now_utc3 = datetime.utcnow() + timedelta(hours=3)
         time_str = now_utc3.strftime("%H%M")  # Saat ve dakika
@@ -158,44 +181,124 @@ async def send_automatic_bulk_email(input_path: Path, output_files: Dict) -> boo
         # ZIP dosyası için isim oluştur
         zip_name = f"{time_str}_{input_path.stem[:9]}" if input_path.stem else f"{time_str}_output_files"
         
+        # ZIP outbox dizininde durur: tekrar denemeler iş bittikten sonra da eki bulur,
+        # son teslimattan sonra outbox siler
+        zip_dir = config.OUTBOX_DIR / job_id
+        zip_dir.mkdir(parents=True, exist_ok=True)
+        self.path = zip_dir / f"{zip_name}_rap.zip"
+        self.zipf = zipfile.ZipFile(self.path, 'w', zipfile.ZIP_DEFLATED)
         
-        # Geçici ZIP dosyası
-        zip_path = Path(tempfile.gettempdir()) / f"{zip_name}_rap.zip"
-        
+        # Input dosyasını klasör olmadan ekle
+        if input_path.exists():
+            self.add(input_path, input_path.name)
 
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Input dosyasını klasör olmadan ekle
-            if input_path.exists():
-                zipf.write(input_path, input_path.name)
-            
-            # Output dosyalarını klasör olmadan ekle
-            for file_info in output_files.values():
-                file_path = file_info["path"]
-                if file_path.exists():
-                    zipf.write(file_path, file_info['filename'])
+    def add(self, file_path: Path, filename: str):
+        """Output dosyasını klasör olmadan ekler"""
+        with span("zip", nbytes=file_path.stat().st_size):
+            self.zipf.write(file_path, filename)
 
-        
-        # Mail gönder
-        subject = "📊 Data raporu - Ektedir. Saat-dosya adı, gelen(input) ve gönderilen(output)"
-        body = (
-            "Merhaba,\n\n"
-            "Excel işleme sonucu oluşan tüm input(gelen) ve output(gönderilen) dosyaları ektedir.\n\n"
-            "Bu mail otomatik olarak gönderilmiştir.\n\n"
-            "İyi çalışmalar,\nData_listesi_Hıdır"
-        )
-        
-        success = await send_email_with_attachment(
-            [config.PERSONAL_EMAIL],
-            subject,
-            body,
-            zip_path
-        )
-        
-        # Geçici ZIP'i sil
-        zip_path.unlink(missing_ok=True)
-        
-        return success
-        
-    except Exception as e:
-        logger.error(f"Otomatik toplu mail hatası: {e}")
-        return False
\ No newline at end of file
+    def close(self) -> Path:
+        self.zipf.close()
+        return self.path
+
+    def discard(self):
+        self.zipf.close()
+        self.path.unlink(missing_ok=True)
+        try:
+            self.path.parent.rmdir()
+        except OSError:
+            pass
+
+
+class DeliveryPipeline:
+    """
+    Ayırma thread'inden gelen hazır grup dosyalarını loop'ta sırayla işler:
+    grup teslimatlarını outbox'a yazar ve dosyayı toplu ZIP'e ekler.
+
+        pipeline = await DeliveryPipeline.start(job_id, input_path)
+        await asyncio.to_thread(split_excel_by_groups, ..., pipeline.group_ready)
+        ids = await pipeline.finish()   # + toplu mail teslimatı
+
+    Ayırma sonradan başarısız olursa (abort) outbox'a yazılmış ve henüz
+    gönderilmemiş teslimatlar iptal edilir, toplu ZIP silinir: kullanıcı
+    dosyayı yeniden yüklediğinde (yeni job_id) alıcılara ikinci kopya gitmez.
+    """
+
+    def __init__(self, job_id: str, archive: Optional[BulkArchive] = None):
+        self.job_id = job_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.ids: List[int] = []
+        self.archive = archive
+        self.task = asyncio.create_task(self._consume())
+
+    @classmethod
+    async def start(cls, job_id: str, input_path: Path) -> "DeliveryPipeline":
+        """Toplu ZIP'i (input eklenerek) thread'de açar ve pipeline'ı başlatır"""
+        archive = None
+        if config.PERSONAL_EMAIL:
+            try:
+                archive = await asyncio.to_thread(BulkArchive, input_path, job_id)
+            except Exception as e:
+                logger.error(f"Otomatik toplu mail hatası: {e}")
+        return cls(job_id, archive)
+
+    def group_ready(self, group_id: str, file_info: Dict):
+        """ExcelSplitter on_group_ready (ayırma thread'inden çağrılır)"""
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, (group_id, file_info))
+
+    async def _consume(self):
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                return
+            group_id, file_info = item
+            deliveries = build_group_deliveries({group_id: file_info})
+            if deliveries:
+                self.ids.extend(await outbox.enqueue(self.job_id, deliveries))
+            if self.archive is not None:
+                try:
+                    await asyncio.to_thread(self.archive.add, file_info["path"], file_info["filename"])
+                except Exception as e:
+                    logger.error(f"Otomatik toplu mail hatası: {e}")
+                    await asyncio.to_thread(self.archive.discard)
+                    self.archive = None
+
+    async def finish(self) -> List[int]:
+        """Kalan grupları işler, toplu ZIP'i kapatıp teslimatını ekler; tüm kimlikleri döner"""
+        self.queue.put_nowait(None)
+        await self.task
+        if self.archive is not None:
+            try:
+                zip_path = await asyncio.to_thread(self.archive.close)
+                self.ids.extend(await outbox.enqueue(self.job_id, [build_bulk_delivery(zip_path)]))
+            except Exception as e:
+                logger.error(f"Otomatik toplu mail hatası: {e}")
+                await asyncio.to_thread(self.archive.discard)
+            self.archive = None
+        return self.ids
+
+    async def abort(self):
+        self.queue.put_nowait(None)
+        await self.task
+        cancelled = await outbox.cancel(self.ids)
+        if self.ids:
+            logger.warning(
+                f"Ayırma başarısız [{self.job_id}]: {cancelled} teslimat iptal edildi, "
+                f"{len(self.ids) - cancelled} teslimat zaten gönderilmişti"
+            )
+        if self.archive is not None:
+            await asyncio.to_thread(self.archive.discard)
+            self.archive = None
+
+
+def build_bulk_delivery(zip_path: Path) -> Delivery:
+    """Toplu ZIP için PERSONAL_EMAIL teslimatı"""
+    subject = "📊 Data raporu - Ektedir. Saat-dosya adı, gelen(input) ve gönderilen(output)"
+    body = (
+        "Merhaba,\n\n"
+        "Excel işleme sonucu oluşan tüm input(gelen) ve output(gönderilen) dosyaları ektedir.\n\n"
+        "Bu mail otomatik olarak gönderilmiştir.\n\n"
+        "İyi çalışmalar,\nData_listesi_Hıdır"
+    )
+    return Delivery(BULK_GROUP, config.PERSONAL_EMAIL, subject, body, zip_path)
@@ -1,41 +1,125 @@
 #KOVA   main.py
 #
+import time
+
+_STARTED = time.perf_counter()  # açılış süresi ölçümünün başlangıcı
+
 import asyncio
+import importlib
 import os
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer, SimpleFilesPathWrapper
+from pathlib import Path
 from aiohttp import web
 
 from config import config
-from handlers.reply_handler import router as reply_router
-from handlers.upload_handler import router as upload_router
-from handlers.status_handler import router as status_router
-from handlers.admin_handler import router as admin_router
-from handlers.dar_handler import router as dar_router
-from handlers.id_handler import router as id_router
-from handlers.json_handler import router as json_router
-from handlers.file_handler import router as file_router
-from handlers.tek_handler import router as tek_router
-from handlers.cancel_handler import router as cancel_router
-from handlers.email_handler import router as email_router
+from utils.logger import logger, setup_logger, shutdown_logger
+from utils.metrics import registry
+from utils.loop_watchdog import loop_watchdog
+from utils.update_queue import update_queue, FULL
+from utils.fsm_storage import create_storage
+from utils.workspace import clear_stale_scratch
+from utils.janitor import janitor
+from utils.outbox import outbox
+from utils.download_links import download_links
+from utils.json_codec import loads as json_loads
 
+# Logger kurulumu
+setup_logger()
 
+# Router modülleri (include sırası önemli: cancel en başta, tek_handler diğerlerinden sonra)
+# Hepsi polling/webhook başlamadan main() içinde import edilir (router'lar kayıtlı olmalı);
+# süreleri açılış logunda görünür. openpyxl / aiosmtplib / psutil modül seviyesinde
+# import edilmez, kullanan fonksiyonlar içinde yüklenir.
+ROUTER_MODULES = [
+    "handlers.cancel_handler",
+    "handlers.reply_handler",
+    "handlers.upload_handler",
+    "handlers.status_handler",
+    "handlers.admin_handler",
+    "handlers.dar_handler",
+    "handlers.id_handler",
+    "handlers.json_handler",
+    "handlers.file_handler",
+    "handlers.tek_handler",
+    "handlers.email_handler",  # kişiye mail
+]
+
+
+class StartupTimer:
+    """Açılış aşamalarının sürelerini toplar, bot hazır olunca bir kez loglar"""
+
+    def __init__(self, started: float):
+        self.started = started
+        self._last = started
+        self.phases = []
+        self.details = {}
+        self.logged = False
+
+    def mark(self, phase: str, details=None):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        if details:
+            self.details[phase] = details
+        self._last = now
+
+    def log_ready(self, mode: str):
+        if self.logged:
+            return
+        self.logged = True
+        self.mark("ready")
+        parts = [f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in self.phases]
+        logger.info(
+            "🚀 Bot hazır ({}) - {:.0f} ms: {}",
+            mode, (time.perf_counter() - self.started) * 1000, ", ".join(parts)
+        )
+        for phase, details in self.details.items():
+            slowest = sorted(details, key=lambda item: item[1], reverse=True)[:5]
+            logger.info(
+                "   {} en yavaş: {}", phase,
+                ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in slowest)
+            )
 
 
-from utils.logger import setup_logger
+startup_timer = StartupTimer(_STARTED)
+startup_timer.mark("imports")
 
-# Logger kurulumu
-setup_logger()
+
+def load_routers(dp: Dispatcher):
+    """ROUTER_MODULES'u sırayla import edip dispatcher'a ekler, modül sürelerini döndürür"""
+    timings = []
+    for module_path in ROUTER_MODULES:
+        started = time.perf_counter()
+        module = importlib.import_module(module_path)
+        dp.include_router(module.router)
+        timings.append((module_path.rsplit(".", 1)[-1], time.perf_counter() - started))
+    return timings
 
 # Health check ve webhook için farklı portlar
 HEALTH_CHECK_PORT = 8080  # Health check için varsayılan port
 WEBHOOK_PORT = config.PORT  # Webhook için config'ten gelen port
 
 
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def http_response(status: str, body: str, content_type: str = "text/plain") -> bytes:
+    """Basit HTTP/1.1 yanıtı (Content-Length byte olarak hesaplanır)"""
+    payload = body.encode("utf-8")
+    header = (
+        f"HTTP/1.1 {status}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    return header.encode() + payload
+
+
 async def handle_health_check(reader, writer):
-    """Asenkron health check handler"""
+    """Asenkron health check handler (/health ve /metrics)"""
     try:
         # İsteği oku
         data = await reader.read(1024)
@@ -45,33 +129,19 @@ async def handle_health_check(reader, writer):
         # Basit HTTP isteği parsing
         request_line = data.decode().split('\r\n')[0]
         method, path, _ = request_line.split()
+        path = path.split('?')[0]
         
         if path == '/health':
-            response = (
-                "HTTP/1.1 200 OK\r\n"
-                "Content-Type: text/plain\r\n"
-                "Content-Length: 13\r\n\r\n"
-                "Bot is running"
-            )
-            writer.write(response.encode())
-            await writer.drain()
+            writer.write(http_response("200 OK", "Bot is running"))
+        elif path == '/metrics':
+            writer.write(http_response("200 OK", registry.render(), METRICS_CONTENT_TYPE))
         else:
-            response = (
-                "HTTP/1.1 404 Not Found\r\n"
-                "Content-Type: text/plain\r\n\r\n"
-                "Not Found"
-            )
-            writer.write(response.encode())
-            await writer.drain()
+            writer.write(http_response("404 Not Found", "Not Found"))
+        await writer.drain()
     except Exception as e:
         print(f"Health check hatası: {e}")
         try:
-            response = (
-                "HTTP/1.1 500 Internal Server Error\r\n"
-                "Content-Type: text/plain\r\n\r\n"
-                "Error"
-            )
-            writer.write(response.encode())
+            writer.write(http_response("500 Internal Server Error", "Error"))
             await writer.drain()
         except Exception:
             pass
@@ -91,14 +161,37 @@ async def start_health_check_server(port: int):
     return server
 
 
+def create_bot_session():
+    """Local Bot API ayarlıysa ona bağlanan session döndürür, yoksa None (bulut API)"""
+    if not config.TELEGRAM_API_URL:
+        return None
+
+    wrap_kwargs = {}
+    if config.TELEGRAM_API_LOCAL and config.TELEGRAM_API_SERVER_DIR and config.TELEGRAM_API_LOCAL_DIR:
+        # Sunucu ve bot farklı konteynerlerde: aynı volume farklı yollara bağlı
+        wrap_kwargs["wrap_local_file"] = SimpleFilesPathWrapper(
+            Path(config.TELEGRAM_API_SERVER_DIR),
+            Path(config.TELEGRAM_API_LOCAL_DIR),
+        )
+
+    api = TelegramAPIServer.from_base(
+        config.TELEGRAM_API_URL,
+        is_local=config.TELEGRAM_API_LOCAL,
+        **wrap_kwargs,
+    )
+    mode = "local" if config.TELEGRAM_API_LOCAL else "remote"
+    print(f"🛰️ Bot API sunucusu: {config.TELEGRAM_API_URL} ({mode})")
+    return AiohttpSession(api=api)
+
+
 # -------------------------------
 # Webhook mode için aiohttp server
 # -------------------------------
 async def webhook_handler(request: web.Request):
-    """Telegram'dan gelen update'leri aiogram'a aktarır"""
-    dp: Dispatcher = request.app["dp"]
-    bot: Bot = request.app["bot"]
-    
+    """
+    Telegram'dan gelen update'i kuyruğa bırakır ve hemen yanıt verir.
+    İşleme utils/update_queue.py worker'larında yapılır.
+    """
     # Secret token kontrolü (eğer ayarlanmışsa)
     if config.WEBHOOK_SECRET:
         token = request.headers.get('X-Telegram-Bot-Api-Secret-Token')
@@ -106,19 +199,21 @@ async def webhook_handler(request: web.Request):
             return web.Response(status=403, text="Forbidden")
     
     try:
-        update = await request.json()
-        await dp.feed_webhook_update(bot, update)
-        return web.Response(text="ok")
+        update = json_loads(await request.read())
     except Exception as e:
         print(f"Webhook hata: {e}")
-        return web.Response(status=500, text="error")
+        return web.Response(status=400, text="bad request")
+    
+    if update_queue.offer(update) == FULL:
+        # Telegram 2xx dışı yanıtta update'i daha sonra tekrar gönderir
+        return web.Response(status=503, text="busy")
+    return web.Response(text="ok")
 
 
 async def start_webhook(bot: Bot, dp: Dispatcher):
     """Webhook mode başlatıcı"""
     app = web.Application()
-    app["dp"] = dp
-    app["bot"] = bot
+    update_queue.start(bot, dp)
 
     # Webhook endpoint'i
     app.router.add_post("/webhook", webhook_handler)
@@ -128,6 +223,17 @@ async def start_webhook(bot: Bot, dp: Dispatcher):
         return web.Response(text="Bot is running")
     
     app.router.add_get("/health", health_check)
+    
+    async def metrics(request):
+        return web.Response(
+            body=registry.render().encode("utf-8"),
+            headers={"Content-Type": METRICS_CONTENT_TYPE},
+        )
+    
+    app.router.add_get("/metrics", metrics)
+    
+    # İmzalı indirme linkleri (MAIL_DELIVERY_MODE link / auto)
+    download_links.register(app)
 
     runner = web.AppRunner(app)
     await runner.setup()
@@ -141,6 +247,7 @@ async def start_webhook(bot: Bot, dp: Dispatcher):
         secret_token=config.WEBHOOK_SECRET or None,
         drop_pending_updates=True,
     )
+    startup_timer.log_ready("webhook")
     
     return runner  # Graceful shutdown için runner'ı döndür
 
@@ -149,6 +256,11 @@ async def start_polling(bot: Bot, dp: Dispatcher):
     """Polling mode başlatıcı"""
     print("🤖 Polling modu başlatılıyor...")
     await bot.delete_webhook(drop_pending_updates=True)
+    
+    async def on_startup():
+        startup_timer.log_ready("polling")
+    
+    dp.startup.register(on_startup)
     await dp.start_polling(bot)
 
 
@@ -160,28 +272,20 @@ async def main():
         print("❌ HATA: Bot token bulunamadı!")
         return
 
-    storage = MemoryStorage()
+    config.log_environment()
+    clear_stale_scratch()  # önceki çalışmadan yarım kalan işlerin ara dosyaları
+    storage = await create_storage()
 
     bot = Bot(
         token=config.TELEGRAM_TOKEN,
+        session=create_bot_session(),
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
     dp = Dispatcher(storage=storage)
+    startup_timer.mark("bot")
 
     # Router'ları yükle
-    dp.include_router(cancel_router)  # cancel_handler
-    dp.include_router(reply_router)
-    dp.include_router(upload_router)
-    dp.include_router(status_router)
-    dp.include_router(admin_router)
-    dp.include_router(dar_router)
-    dp.include_router(id_router)
-    dp.include_router(json_router)
-    dp.include_router(file_router)
-    dp.include_router(tek_router)  # Diğer router'lardan sonra
-    dp.include_router(email_router) #kişiye mail
-
-
+    startup_timer.mark("routers", load_routers(dp))
 
     health_server = None
     webhook_runner = None
@@ -190,6 +294,10 @@ async def main():
         # Health check sunucusunu başlat (her iki mod için de)
         health_server = await start_health_check_server(HEALTH_CHECK_PORT)
         health_task = asyncio.create_task(health_server.serve_forever())
+        loop_watchdog.start(watch=config.LOOP_WATCHDOG)  # lag metriği watchdog kapalıyken de ölçülür
+        janitor.start()
+        outbox.start()  # önceki çalışmadan bekleyen teslimatlar
+        startup_timer.mark("health")
 
         if config.USE_WEBHOOK:
             # Webhook modu
@@ -212,8 +320,15 @@ async def main():
         # Graceful shutdown
         print("🔴 Bot durduruluyor...")
         
+        loop_watchdog.stop()
+        await janitor.stop()
+        await outbox.stop()
+        outbox.close()
+        
         if webhook_runner:
             await webhook_runner.cleanup()
+        await update_queue.stop()
+        await storage.close()  # webhook modunda dp.shutdown çalışmaz; bekleyen FSM yazmaları
         
         if health_server:
             health_server.close()
@@ -221,6 +336,7 @@ async def main():
         
         await bot.session.close()
         print("✅ Bot başarıyla durduruldu")
+        shutdown_logger()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,23 @@
+# tests/conftest.py
+"""
+Davranış testleri (python -m pytest). Testler gerçek data/ dizinlerine ve
+veritabanlarına dokunmaz: her test kendi geçici dizinini kullanır.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import config  # noqa: E402
+
+
+@pytest.fixture
+def data_dirs(tmp_path, monkeypatch):
+    """Çıktı / outbox dizinlerini geçici dizine yönlendirir"""
+    for name in ("OUTPUT_DIR", "OUTBOX_DIR", "SCRATCH_DIR"):
+        directory = tmp_path / name.lower()
+        directory.mkdir()
+        monkeypatch.setattr(config, name, directory)
+    return tmp_path
@@ -0,0 +1,101 @@
+# tests/test_attachment_plan.py
+"""Ek planı: parçaların her biri sınıra sığar ve birleşince kaynağı verir"""
+import os
+
+import pytest
+from openpyxl import load_workbook
+
+from benchmarks.workbook_generator import generate_workbook
+from utils.attachment_plan import (
+    _split_rows, _split_volumes, discard_parts, hold_parts, parts_dir, plan_attachment, release_parts,
+)
+
+
+@pytest.fixture(scope="module")
+def workbook(tmp_path_factory):
+    return generate_workbook(tmp_path_factory.mktemp("plan") / "liste.xlsx", rows=800, columns=8, seed=7)
+
+
+def read_rows(path):
+    wb = load_workbook(path, read_only=True)
+    try:
+        return list(wb.active.iter_rows(values_only=True))
+    finally:
+        wb.close()
+
+
+def test_split_volumes_parts_fit_and_rejoin(tmp_path):
+    source = tmp_path / "toplu.zip"
+    data = os.urandom(100_000)
+    source.write_bytes(data)
+    directory = tmp_path / "parcalar"
+    directory.mkdir()
+
+    parts = _split_volumes(source, directory, 30_000)
+    assert [part.name for part in parts] == [f"toplu.zip.{index:03d}" for index in range(1, 5)]
+    assert all(part.stat().st_size <= 30_000 for part in parts)
+    assert b"".join(part.read_bytes() for part in parts) == data
+
+
+def test_split_rows_parts_fit_and_keep_header(workbook, tmp_path):
+    limit = workbook.stat().st_size // 3
+    directory = tmp_path / "parcalar"
+    directory.mkdir()
+
+    parts = _split_rows(workbook, directory, limit)
+    assert parts and len(parts) >= 3
+    assert all(part.stat().st_size <= limit for part in parts)
+
+    source = read_rows(workbook)
+    header, rows = source[0], []
+    for part in parts:
+        part_rows = read_rows(part)
+        assert part_rows[0] == header
+        rows.extend(part_rows[1:])
+    assert rows == source[1:]
+
+
+def test_split_rows_gives_up_when_single_rows_do_not_fit(tmp_path):
+    small = generate_workbook(tmp_path / "kisa.xlsx", rows=40, columns=8, seed=7)
+    directory = tmp_path / "parcalar"
+    directory.mkdir()
+    assert _split_rows(small, directory, 1024) is None  # boş bir xlsx bile ~5 KB'tır
+    assert list(directory.iterdir()) == []  # sığmayan parçalar silinir
+
+
+def test_plan_small_attachment_as_is(workbook):
+    plan = plan_attachment(workbook, limit=workbook.stat().st_size)
+    assert plan.mode == "as_is" and plan.parts == [workbook]
+    assert not parts_dir(workbook).exists()
+
+
+def test_plan_rows_is_cached_and_released(workbook):
+    limit = workbook.stat().st_size // 2
+    hold_parts(workbook)
+    try:
+        plan = plan_attachment(workbook, limit=limit)
+        assert plan.mode == "rows" and plan.split
+        assert all(part.stat().st_size <= limit for part in plan.parts)
+        mtimes = [part.stat().st_mtime_ns for part in plan.parts]
+
+        again = plan_attachment(workbook, limit=limit)
+        assert again.parts == plan.parts  # tekrar denemede aynı parçalar kullanılır
+        assert [part.stat().st_mtime_ns for part in again.parts] == mtimes
+
+        discard_parts(workbook)  # başka gönderim tutarken silinmez
+        assert all(part.exists() for part in plan.parts)
+    finally:
+        release_parts(workbook)
+    assert not parts_dir(workbook).exists()
+
+
+def test_plan_other_files_split_into_volumes(tmp_path):
+    source = tmp_path / "rapor.csv"
+    source.write_bytes(os.urandom(50_000))  # sıkıştırılamaz: zip sığmaz
+    try:
+        plan = plan_attachment(source, limit=20_000)
+        assert plan.mode == "volumes"
+        assert all(part.stat().st_size <= 20_000 for part in plan.parts)
+        assert plan.parts[0].name == "rapor.csv.zip.001"
+    finally:
+        discard_parts(source)
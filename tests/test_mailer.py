@@ -0,0 +1,47 @@
+# tests/test_mailer.py
+"""SMTP hata sınıflandırması: sadece uç nokta hataları devre kesiciye yazılır"""
+import asyncio
+import ssl
+
+import aiosmtplib
+import pytest
+
+from utils.mailer import classify_error
+
+
+@pytest.mark.parametrize("error", [
+    aiosmtplib.SMTPConnectError("bağlantı reddedildi"),
+    aiosmtplib.SMTPConnectTimeoutError("zaman aşımı"),
+    aiosmtplib.SMTPServerDisconnected("koptu"),
+    aiosmtplib.SMTPAuthenticationError(535, "5.7.8 Authentication failed"),
+    aiosmtplib.SMTPResponseException(421, "4.7.0 Try again later, closing connection"),
+    aiosmtplib.SMTPResponseException(530, "5.7.0 Must issue a STARTTLS command first"),
+    ssl.SSLError("sertifika"),
+    asyncio.TimeoutError(),
+    ConnectionResetError(),
+])
+def test_endpoint_errors(error):
+    assert classify_error(error) == "endpoint"
+
+
+@pytest.mark.parametrize("error", [
+    aiosmtplib.SMTPDataError(552, "5.3.4 Message size exceeds fixed limit"),
+    aiosmtplib.SMTPSenderRefused(553, "5.7.1 Sender not allowed", "bot@example.com"),
+    aiosmtplib.SMTPRecipientsRefused([
+        aiosmtplib.SMTPRecipientRefused(550, "5.1.1 No such user", "yok@example.com"),
+    ]),
+])
+def test_permanent_rejections(error):
+    assert classify_error(error) == "permanent"
+
+
+@pytest.mark.parametrize("error", [
+    aiosmtplib.SMTPDataError(451, "4.7.1 Rate limit exceeded"),
+    aiosmtplib.SMTPRecipientsRefused([
+        aiosmtplib.SMTPRecipientRefused(450, "4.2.1 Mailbox busy", "a@example.com"),
+        aiosmtplib.SMTPRecipientRefused(550, "5.1.1 No such user", "b@example.com"),
+    ]),
+    ValueError("beklenmeyen"),
+])
+def test_transient_errors(error):
+    assert classify_error(error) == "transient"
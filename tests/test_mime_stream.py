@@ -0,0 +1,116 @@
+# tests/test_mime_stream.py
+"""
+send_streaming yerel SMTP sunucusuna karşı (aiosmtplib'in protocol.write /
+_drain_helper iç API'lerine dayandığı için sürüm yükseltmelerinde bozulursa
+burada görülür)
+"""
+import asyncio
+import email
+import os
+from email.header import decode_header, make_header
+
+import aiosmtplib
+import pytest
+
+from benchmarks.smtp_sink import SMTPSink
+from utils.mailer import deliver_message
+from utils.mime_stream import StreamingMessage, send_streaming
+from utils.smtp_pool import SMTPAccount
+
+
+class CapturingSink(SMTPSink):
+    """DATA gövdelerini saklayan sink; replies verilirse sırayla o yanıtları döner"""
+
+    def __init__(self, replies=(), **options):
+        super().__init__(**options)
+        self.messages = []
+        self.replies = list(replies)
+
+    async def _read_data(self, reader):
+        lines = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("DATA sırasında bağlantı koptu")
+            if line in (b".\r\n", b".\n"):
+                self.messages.append(b"".join(lines))
+                return sum(len(item) for item in lines)
+            lines.append(line[1:] if line.startswith(b"..") else line)  # dot-stuffing geri alınır
+
+    async def on_message(self, size, recipients):
+        if self.replies:
+            return self.replies.pop(0)
+        return await super().on_message(size, recipients)
+
+
+@pytest.fixture
+def attachment(tmp_path):
+    path = tmp_path / "rapor.xlsx"
+    path.write_bytes(os.urandom(300_000))  # birden çok CHUNK_BYTES parçası
+    return path
+
+
+def account(port):
+    return SMTPAccount("test", "127.0.0.1", "bot@example.com", "parola", [port], "none")
+
+
+def parse(raw):
+    message = email.message_from_bytes(raw)
+    text, attached = None, None
+    for part in message.walk():
+        if part.get_content_type() == "text/plain":
+            text = part.get_payload(decode=True).decode("utf-8")
+        elif part.get_filename():
+            attached = (part.get_filename(), part.get_payload(decode=True))
+    return message, text, attached
+
+
+def test_streamed_message_round_trips(attachment):
+    body = "Merhaba,\n.nokta ile başlayan satır\n\nİyi çalışmalar"
+
+    async def scenario():
+        async with CapturingSink() as sink:
+            message = StreamingMessage(["alici@example.com"], "Rapor ğüşı", body, attachment,
+                                       sender="bot@example.com")
+            await deliver_message(message, sink.port, account=account(sink.port))
+            return sink, message
+
+    sink, message = asyncio.run(scenario())
+    assert sink.stats["messages"] == 1 and sink.stats["recipients"] == 1
+    raw = sink.messages[0]
+    assert len(raw) == message.size("8bit")  # SIZE için önceden hesaplanan boyut
+
+    parsed, text, attached = parse(raw)
+    assert parsed["To"] == "alici@example.com"
+    assert str(make_header(decode_header(parsed["Subject"]))) == "Rapor ğüşı"
+    assert text.replace("\r\n", "\n") == body
+    assert attached == ("rapor.xlsx", attachment.read_bytes())
+
+
+def test_message_without_attachment(tmp_path):
+    async def scenario():
+        async with CapturingSink() as sink:
+            message = StreamingMessage(["alici@example.com"], "Link", "İndirme linki", None, sender="bot@example.com")
+            await deliver_message(message, sink.port, account=account(sink.port))
+            return sink
+
+    sink = asyncio.run(scenario())
+    _, text, attached = parse(sink.messages[0])
+    assert text == "İndirme linki" and attached is None
+
+
+def test_rejected_data_resets_envelope_and_connection_stays_usable(attachment):
+    async def scenario():
+        async with CapturingSink(replies=["552 5.3.4 Message size exceeds fixed limit"]) as sink:
+            message = StreamingMessage(["alici@example.com"], "Rapor", "Gövde", attachment, sender="bot@example.com")
+            async with aiosmtplib.SMTP(hostname="127.0.0.1", port=sink.port, start_tls=False) as server:
+                with pytest.raises(aiosmtplib.SMTPDataError) as rejected:
+                    await send_streaming(server, message)
+                await send_streaming(server, message)  # RSET sonrası aynı oturumda ikinci mesaj
+            return sink, rejected.value
+
+    sink, error = asyncio.run(scenario())
+    assert error.code == 552
+    assert sink.stats["connections"] == 1
+    assert sink.stats["messages"] == 1
+    assert parse(sink.messages[1])[2] == ("rapor.xlsx", attachment.read_bytes())
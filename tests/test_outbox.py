@@ -0,0 +1,237 @@
+# tests/test_outbox.py
+"""Outbox: claim / tekrar deneme / geri çekilme, tekil teslimat, iptal"""
+import asyncio
+import time
+
+import pytest
+
+import utils.outbox as outbox_module
+from utils.mailer import PermanentSMTPError
+from utils.outbox import Delivery, Outbox
+
+
+class FakeSender:
+    """send_attachment_parts yerine geçer; sırayla verilen sonuçları döner"""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = []
+        self.release = None  # verilirse gönderim bu event'i bekler
+
+    async def __call__(self, to_emails, subject, body, plan, start=0, max_retries=0):
+        self.calls.append(to_emails[0])
+        if self.release is not None:
+            await self.release.wait()
+        result = self.results.pop(0) if self.results else True
+        if isinstance(result, Exception):
+            raise result
+        return len(plan.parts) if result else start
+
+
+@pytest.fixture
+def box(tmp_path, data_dirs, monkeypatch):
+    monkeypatch.setattr(outbox_module.smtp_pool, "retry_after", lambda: 0.0)
+    monkeypatch.setattr(outbox_module.download_links, "should_link", lambda path: False)
+    box = Outbox(tmp_path / "outbox.db", max_attempts=3, retry_base=0.05, retry_max=0.2, concurrency=2)
+    yield box
+    box.close()
+
+
+@pytest.fixture
+def attachment(tmp_path):
+    path = tmp_path / "rapor.xlsx"
+    path.write_bytes(b"x" * 100)
+    return path
+
+
+def use_sender(monkeypatch, results):
+    sender = FakeSender(results)
+    monkeypatch.setattr(outbox_module, "send_attachment_parts", sender)
+    return sender
+
+
+def delivery(attachment, recipient="a@example.com", group="g1"):
+    return Delivery(group, recipient, "konu", "gövde", attachment)
+
+
+async def wait_for_state(box, delivery_id, states, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        row = (await box.get([delivery_id]))[delivery_id]
+        if row["state"] in states:
+            return row
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"{delivery_id} {states} durumuna geçmedi: {row['state']}")
+
+
+def test_claim_marks_due_rows_sending_in_order(box, attachment):
+    async def scenario():
+        ids = await box._run(box._insert, "job", [
+            delivery(attachment, "a@example.com"),
+            delivery(attachment, "b@example.com"),
+            delivery(attachment, "c@example.com"),
+        ])
+        claimed = await box._run(box._claim, 2)
+        rows = await box.get(ids)
+        return ids, claimed, rows
+
+    ids, claimed, rows = asyncio.run(scenario())
+    assert [row["id"] for row in claimed] == ids[:2]
+    assert [rows[i]["state"] for i in ids] == ["sending", "sending", "pending"]
+
+
+def test_failed_attempt_is_retried_with_backoff(box, attachment, monkeypatch):
+    sender = use_sender(monkeypatch, [False, True])
+    box.retry_base, box.retry_max = 0.5, 1.0  # tekrar denemeden önce pending satırı görülebilsin
+
+    async def scenario():
+        [delivery_id] = await box.enqueue("job", [delivery(attachment)])
+        retry = (await box.get([delivery_id]))[delivery_id]
+        while retry["attempts"] == 0:
+            await asyncio.sleep(0.01)
+            retry = (await box.get([delivery_id]))[delivery_id]
+        sent = await wait_for_state(box, delivery_id, ("sent",))
+        await box.stop()
+        return retry, sent
+
+    retry, sent = asyncio.run(scenario())
+    assert retry["state"] == "pending" and retry["attempts"] == 1
+    assert retry["last_error"].startswith("SMTP gönderimi başarısız")
+    # retry_base × 2^0 × [0.8, 1.2]
+    assert 0.4 <= retry["next_attempt_at"] - retry["updated_at"] <= 0.6 + 0.01
+    assert sent["attempts"] == 2 and sent["sent_at"] is not None
+    assert len(sender.calls) == 2
+
+
+def test_backoff_doubles_up_to_retry_max(box):
+    for attempts, base in [(1, 0.05), (2, 0.1), (3, 0.2), (6, 0.2)]:
+        delay = box._backoff(attempts)
+        assert base * 0.8 <= delay <= base * 1.2
+
+
+def test_delivery_fails_after_max_attempts(box, attachment, monkeypatch):
+    sender = use_sender(monkeypatch, [False, False, False])
+
+    async def scenario():
+        [delivery_id] = await box.enqueue("job", [delivery(attachment)])
+        row = await wait_for_state(box, delivery_id, ("failed",))
+        await box.stop()
+        return row
+
+    row = asyncio.run(scenario())
+    assert row["attempts"] == 3
+    assert len(sender.calls) == 3
+
+
+def test_permanent_rejection_is_not_retried(box, attachment, monkeypatch):
+    sender = use_sender(monkeypatch, [PermanentSMTPError("(552, 'Message too large')")])
+
+    async def scenario():
+        [delivery_id] = await box.enqueue("job", [delivery(attachment)])
+        row = await wait_for_state(box, delivery_id, ("failed",))
+        await box.stop()
+        return row
+
+    row = asyncio.run(scenario())
+    assert row["attempts"] == 1
+    assert "552" in row["last_error"]
+    assert len(sender.calls) == 1
+
+
+def test_enqueue_dedupes_job_group_recipient(box, attachment, monkeypatch):
+    use_sender(monkeypatch, [True])
+
+    async def scenario():
+        first = await box.enqueue("job", [delivery(attachment)])
+        again = await box.enqueue("job", [delivery(attachment)])
+        other_job = await box.enqueue("job2", [delivery(attachment)])
+        await wait_for_state(box, first[0], ("sent",))
+        await wait_for_state(box, other_job[0], ("sent",))
+        resent = await box.enqueue("job", [delivery(attachment)])
+        row = (await box.get(resent))[resent[0]]
+        await box.stop()
+        return first, again, other_job, resent, row
+
+    first, again, other_job, resent, row = asyncio.run(scenario())
+    assert first == again == resent
+    assert other_job != first
+    assert row["state"] == "sent" and row["attempts"] == 1  # gönderilmiş teslimat tekrar açılmaz
+
+
+def test_enqueue_reopens_failed_delivery(box, attachment, monkeypatch):
+    use_sender(monkeypatch, [False, False, False, True])
+
+    async def scenario():
+        [delivery_id] = await box.enqueue("job", [delivery(attachment)])
+        await wait_for_state(box, delivery_id, ("failed",))
+        again = await box.enqueue("job", [delivery(attachment)])
+        row = await wait_for_state(box, delivery_id, ("sent",))
+        await box.stop()
+        return delivery_id, again, row
+
+    delivery_id, again, row = asyncio.run(scenario())
+    assert again == [delivery_id]
+    assert row["attempts"] == 1  # yeniden açılınca deneme sayısı sıfırlanır
+
+
+def test_cancel_stops_pending_and_sending_deliveries(box, attachment, monkeypatch):
+    sender = use_sender(monkeypatch, [True, True, True])
+
+    async def scenario():
+        sender.release = asyncio.Event()
+        ids = await box.enqueue("job", [
+            delivery(attachment, "a@example.com"),
+            delivery(attachment, "b@example.com"),
+            delivery(attachment, "c@example.com"),
+        ])
+        # concurrency=2: ikisi gönderimde, biri sırada
+        while len(sender.calls) < 2:
+            await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(box.wait(ids, timeout=5))
+        await asyncio.sleep(0.05)
+        cancelled = await box.cancel(ids)
+        states = await asyncio.wait_for(waiter, 2)
+        sender.release.set()
+        await asyncio.sleep(0.1)
+        rows = await box.get(ids)
+        summary = await box.summary()
+        await box.stop()
+        return cancelled, states, rows, summary
+
+    cancelled, states, rows, summary = asyncio.run(scenario())
+    assert cancelled == 3
+    assert {row["state"] for row in states.values()} == {"cancelled"}
+    assert {row["state"] for row in rows.values()} == {"cancelled"}  # iptal edilen gönderim geri gelmez
+    assert summary == {"cancelled": 3}
+    assert not box.is_protected(attachment)
+
+
+def test_cancel_keeps_sent_deliveries(box, attachment, monkeypatch):
+    use_sender(monkeypatch, [True])
+
+    async def scenario():
+        ids = await box.enqueue("job", [delivery(attachment)])
+        await wait_for_state(box, ids[0], ("sent",))
+        cancelled = await box.cancel(ids)
+        row = (await box.get(ids))[ids[0]]
+        await box.stop()
+        return cancelled, row
+
+    cancelled, row = asyncio.run(scenario())
+    assert cancelled == 0
+    assert row["state"] == "sent"
+
+
+def test_stop_returns_sending_rows_to_pending(box, attachment, monkeypatch):
+    sender = use_sender(monkeypatch, [True])
+
+    async def scenario():
+        sender.release = asyncio.Event()
+        ids = await box.enqueue("job", [delivery(attachment)])
+        while not sender.calls:
+            await asyncio.sleep(0.01)
+        await box.stop()
+        return (await box.get(ids))[ids[0]]
+
+    row = asyncio.run(scenario())
+    assert row["state"] == "pending" and row["attempts"] == 0
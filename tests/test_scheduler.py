@@ -0,0 +1,112 @@
+# tests/test_scheduler.py
+"""İş zamanlayıcısı: öncelik şeritleri ve kullanıcılar arası adil sıra"""
+import asyncio
+
+from utils.scheduler import JobScheduler
+
+
+class Jobs:
+    """Başlama sırasını kaydeden, release() edilene kadar bekleyen işler"""
+
+    def __init__(self):
+        self.started = []
+        self.gates = {}
+
+    def factory(self, name):
+        async def run(ticket):
+            self.started.append(name)
+            gate = self.gates[name] = asyncio.Event()
+            await gate.wait()
+            return name
+        return run
+
+    async def release(self, name):
+        while name not in self.gates:
+            await asyncio.sleep(0)
+        self.gates[name].set()
+        await asyncio.sleep(0)
+
+
+def scheduler(workers=1, per_user=1):
+    return JobScheduler(workers=workers, per_user=per_user, small_rows=1000, sec_per_row=0.001)
+
+
+def test_lanes_run_admin_then_small_then_normal():
+    async def scenario():
+        jobs, sched = Jobs(), scheduler()
+        busy = sched.submit(1, 50_000, jobs.factory("busy"))
+        normal = sched.submit(2, 50_000, jobs.factory("normal"))
+        small = sched.submit(3, 10, jobs.factory("small"))
+        admin = sched.submit(4, 50_000, jobs.factory("admin"), admin=True)
+        order = [ticket.lane for ticket in sched.queue_order()]
+        positions = [sched.position(ticket) for ticket in (admin, small, normal)]
+        for name in ("busy", "admin", "small", "normal"):
+            await jobs.release(name)
+        await asyncio.gather(busy.future, normal.future, small.future, admin.future)
+        return jobs.started, order, positions, busy.queued, normal.queued
+
+    started, order, positions, busy_queued, normal_queued = asyncio.run(scenario())
+    assert order == ["admin", "small", "normal"]
+    assert positions == [1, 2, 3]
+    assert started == ["busy", "admin", "small", "normal"]
+    assert not busy_queued and normal_queued
+
+
+def test_fair_queue_interleaves_users_by_rows():
+    async def scenario():
+        jobs, sched = Jobs(), scheduler()
+        first = sched.submit(1, 5000, jobs.factory("a1"))
+        tickets = {
+            name: sched.submit(user, 5000, jobs.factory(name))
+            for user, name in ((1, "a2"), (1, "a3"), (2, "b1"), (2, "b2"))
+        }
+        names = {ticket.seq: name for name, ticket in tickets.items()}
+        predicted = [names[ticket.seq] for ticket in sched.queue_order()]
+        for name in ("a1", "b1", "a2", "b2", "a3"):
+            await jobs.release(name)
+        await asyncio.gather(first.future, *(ticket.future for ticket in tickets.values()))
+        return jobs.started, predicted
+
+    started, predicted = asyncio.run(scenario())
+    # a1 çalışırken kullanıcı 1'in sanal zamanı ilerledi: sıra kullanıcı 2'ye geçer
+    assert predicted == ["b1", "a2", "b2", "a3"]
+    assert started == ["a1"] + predicted
+
+
+def test_per_user_limit_lets_other_users_use_free_workers():
+    async def scenario():
+        jobs, sched = Jobs(), scheduler(workers=2, per_user=1)
+        a1 = sched.submit(1, 5000, jobs.factory("a1"))
+        a2 = sched.submit(1, 5000, jobs.factory("a2"))
+        b1 = sched.submit(2, 5000, jobs.factory("b1"))
+        await asyncio.sleep(0)
+        running = list(jobs.started)
+        snapshot = sched.snapshot()
+        for name in ("a1", "b1", "a2"):
+            await jobs.release(name)
+        await asyncio.gather(a1.future, a2.future, b1.future)
+        return running, snapshot
+
+    running, snapshot = asyncio.run(scenario())
+    assert running == ["a1", "b1"]  # a2 kullanıcı limitinde bekler
+    assert snapshot["running"] == 2 and snapshot["waiting"] == 1
+
+
+def test_failed_job_frees_worker():
+    async def scenario():
+        sched = scheduler()
+
+        async def boom(ticket):
+            raise RuntimeError("hata")
+
+        async def ok(ticket):
+            return "ok"
+
+        failed = sched.submit(1, 10, boom)
+        after = sched.submit(2, 10, ok)
+        result = await after.future
+        return failed, result
+
+    failed, result = asyncio.run(scenario())
+    assert result == "ok"
+    assert isinstance(failed.future.exception(), RuntimeError)
@@ -0,0 +1,101 @@
+# tests/test_smtp_health.py
+"""Devre kesici: closed → open → half_open geçişleri"""
+import pytest
+
+import utils.smtp_health as smtp_health_module
+from utils.smtp_health import SMTPHealth
+
+HOST = "smtp.example.com"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(smtp_health_module, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def health(clock):
+    return SMTPHealth(threshold=3, cooldown=10, max_cooldown=40)
+
+
+def state(health, port):
+    return health._get(HOST, port).state
+
+
+def fail(health, port, times=1):
+    for _ in range(times):
+        health.record_failure(HOST, port, "bağlantı reddedildi")
+
+
+def test_opens_after_threshold_consecutive_failures(health):
+    fail(health, 465, 2)
+    assert state(health, 465) == "closed"
+    health.record_success(HOST, 465, 0.1)  # başarı ardışık sayacı sıfırlar
+    fail(health, 465, 2)
+    assert state(health, 465) == "closed"
+    fail(health, 465)
+    assert state(health, 465) == "open"
+    assert health.plan(HOST, [465, 587]) == [587]
+    assert not health.allow(HOST, 465)
+
+
+def test_half_open_after_cooldown_allows_single_probe(health, clock):
+    fail(health, 465, 3)
+    clock.now += 9
+    assert health.plan(HOST, [465]) == []
+    clock.now += 1
+    assert health.plan(HOST, [465]) == [465]
+    assert state(health, 465) == "half_open"
+    assert health.allow(HOST, 465)       # probe
+    assert not health.allow(HOST, 465)   # probe sürerken ikinci deneme geçmez
+    assert health.plan(HOST, [465]) == []
+
+
+def test_successful_probe_closes(health, clock):
+    fail(health, 465, 3)
+    clock.now += 10
+    assert health.allow(HOST, 465)
+    health.record_success(HOST, 465, 0.2)
+    assert state(health, 465) == "closed"
+    assert health._get(HOST, 465).cooldown == 0
+
+
+def test_failed_probe_reopens_with_doubled_cooldown(health, clock):
+    fail(health, 465, 3)
+    for cooldown in (20, 40, 40):  # max_cooldown ile sınırlı
+        clock.now += health._get(HOST, 465).cooldown
+        assert health.allow(HOST, 465)
+        fail(health, 465)
+        assert state(health, 465) == "open"
+        assert health._get(HOST, 465).cooldown == cooldown
+
+
+def test_rejection_does_not_count_as_failure(health, clock):
+    fail(health, 465, 2)
+    health.record_rejection(HOST, 465)  # ör. 552 mesaj büyük: sunucu çalışıyor
+    fail(health, 465, 2)
+    assert state(health, 465) == "closed"
+
+    fail(health, 465)
+    clock.now += 10
+    assert health.allow(HOST, 465)
+    health.record_rejection(HOST, 465)  # probe yanıt aldı
+    assert state(health, 465) == "closed"
+
+
+def test_retry_after_reports_time_to_half_open(health, clock):
+    fail(health, 465, 3)
+    fail(health, 587, 3)
+    clock.now += 4
+    assert health.retry_after(HOST, [465, 587]) == pytest.approx(6)
+    assert health.retry_after(HOST, [25]) == 0
@@ -0,0 +1,129 @@
+# tests/test_smtp_pool.py
+"""SMTP hesap havuzu: günlük ve dakikalık kota, gün dönümü"""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import utils.smtp_pool as smtp_pool_module
+from config import config
+from utils.job_store import JobStore
+from utils.smtp_pool import SMTPPool
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class Today:
+    """date.today() yerine (gün dönümü testi)"""
+    value = date.today()
+
+
+class FakeDate(date):
+    @classmethod
+    def today(cls):
+        return Today.value
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = JobStore(tmp_path / "jobs.db")
+    monkeypatch.setattr(smtp_pool_module, "job_store", store)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(smtp_pool_module, "time", clock)
+    monkeypatch.setattr(smtp_pool_module, "date", FakeDate)
+    Today.value = date.today()
+    return clock
+
+
+@pytest.fixture
+def single_account(monkeypatch):
+    monkeypatch.setattr(config, "SMTP_ACCOUNTS", "")
+    monkeypatch.setattr(config, "SMTP_SERVER", "pool-test.example.com")
+    monkeypatch.setattr(config, "SMTP_USERNAME", "bot@example.com")
+    monkeypatch.setattr(config, "SMTP_PORTS", [2525])
+
+
+def send(pool, count):
+    """count kez hesap seçip başarılı gönderim olarak bırakır; seçilemezse durur"""
+    sent = 0
+    for _ in range(count):
+        account = pool.acquire()
+        if account is None:
+            break
+        pool.release(account, True)
+        sent += 1
+    return sent
+
+
+def test_daily_limit_rolls_over_at_midnight(store, clock, single_account, monkeypatch):
+    monkeypatch.setattr(config, "SMTP_DAILY_LIMIT", 3)
+    monkeypatch.setattr(config, "SMTP_PER_MINUTE", 0)
+    pool = SMTPPool()
+    assert send(pool, 5) == 3
+    assert pool.acquire() is None
+    assert pool.retry_after() >= 1  # gece yarısına kadar
+
+    Today.value += timedelta(days=1)
+    assert pool.retry_after() == 0
+    assert send(pool, 5) == 3
+
+
+def test_daily_usage_survives_restart(store, clock, single_account, monkeypatch):
+    monkeypatch.setattr(config, "SMTP_DAILY_LIMIT", 3)
+    monkeypatch.setattr(config, "SMTP_PER_MINUTE", 0)
+    assert send(SMTPPool(), 2) == 2
+    store.close()  # defer edilen kullanım yazmalarını bekler
+
+    pool = SMTPPool()
+    assert pool.remaining(pool.accounts()[0]) == 1
+    assert send(pool, 5) == 1
+
+
+def test_reserved_units_count_against_quota(store, clock, single_account, monkeypatch):
+    monkeypatch.setattr(config, "SMTP_DAILY_LIMIT", 2)
+    monkeypatch.setattr(config, "SMTP_PER_MINUTE", 0)
+    pool = SMTPPool()
+    first, second = pool.acquire(), pool.acquire()
+    assert first is not None and second is not None
+    assert pool.acquire() is None  # iki gönderim sürüyor
+    pool.release(first, False)      # başarısız gönderim kotayı harcamaz
+    assert pool.acquire() is not None
+
+
+def test_per_minute_window_rolls_over(store, clock, single_account, monkeypatch):
+    monkeypatch.setattr(config, "SMTP_DAILY_LIMIT", 0)
+    monkeypatch.setattr(config, "SMTP_PER_MINUTE", 2)
+    pool = SMTPPool()
+    assert send(pool, 5) == 2
+    clock.now += 30
+    assert pool.acquire() is None
+    assert pool.retry_after() == pytest.approx(30)
+    clock.now += 30
+    assert send(pool, 5) == 2
+
+
+def test_exhausted_account_falls_back_to_next(store, clock, monkeypatch):
+    monkeypatch.setattr(config, "SMTP_ACCOUNTS", """[
+        {"name": "a", "server": "a.example.com", "username": "a@example.com", "daily_limit": 1, "ports": [2525]},
+        {"name": "b", "server": "b.example.com", "username": "b@example.com", "ports": [2525]}
+    ]""")
+    monkeypatch.setattr(smtp_pool_module, "random", random.Random(0))
+    pool = SMTPPool()
+    names = []
+    for _ in range(20):
+        account = pool.acquire()
+        names.append(account.name)
+        pool.release(account, True)
+    assert names.count("a") == 1 and names.count("b") == 19
@@ -0,0 +1,287 @@
+# utils/attachment_plan.py
+"""
+Ek boyutu yönetimi (sağlayıcı sınırını aşan ekler göndermeden önce küçültülür)
+
+Gmail / Yandex ~25 MB'ın üstündeki mesajları reddeder; reddedilen 30 MB'lık
+ek her denemede ve her portta yeniden yüklenir. Gönderimden önce ekin
+base64'lü boyutu (×4/3 + satır sonları) hesaplanır ve MAIL_MAX_MB'a göre
+yöntem seçilir:
+
+    as_is    sığıyorsa olduğu gibi
+    zip      ZIP_DEFLATED ile sıkıştırılmışı sığıyorsa
+    rows     .xlsx: satırlar parçalara bölünür, her parçada başlık satırı
+             (parca1_3.xlsx, ...) - her parça tek başına açılabilir
+    volumes  diğerleri (ör. toplu ZIP): numaralı arşiv parçaları
+             (.zip.001, .zip.002 ...; 7-Zip ile veya copy /b ile birleşir)
+
+    hold_parts(path)
+    plan = plan_attachment(path)       # plan.parts: gönderilecek dosyalar
+    ...
+    release_parts(path)                # son kullanan çıkınca parçalar silinir
+
+Aynı kaynak için eşzamanlı çağrılar kaynak başına kilitle sıralanır: parça
+dizinini bir thread yazar, diğerleri hazır planı kullanır; başka gönderimin
+tuttuğu parçalar silinmez.
+
+Parçalar ekin yanında <ad>_parcalar/ dizinine yazılır ve plan.json ile
+saklanır; outbox'ın tekrar denemeleri aynı parçaları yeniden kullanır.
+MAIL_MAX_MB = 0 sınırı kapatır.
+"""
+import math
+import shutil
+import threading
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import config
+from utils import json_codec
+from utils.logger import logger
+from utils.metrics import MAIL_ATTACHMENT_PLANS
+from utils.mime_stream import LINE_BYTES, encoded_size
+
+HEADER_ALLOWANCE = 64 * 1024  # başlıklar + metin gövdesi için pay
+MANIFEST = "plan.json"
+MAX_ROW_SPLITS = 4  # parça sınırı aşarsa parça sayısı ikiye katlanarak tekrar denenir
+
+# Kaynak dosya başına kilit: aynı grup dosyasının alıcıları aynı anda
+# planlanır; parça dizinini tek thread yazar, diğerleri hazır planı okur
+_locks: Dict[str, list] = {}  # yol -> [Lock, kullanan sayısı]
+_holders: Dict[str, int] = {}  # yol -> parçaları kullanan gönderim sayısı
+_locks_guard = threading.Lock()
+
+
+@dataclass
+class AttachmentPlan:
+    mode: str  # as_is | zip | rows | volumes
+    source: Path
+    parts: List[Path] = field(default_factory=list)
+
+    @property
+    def split(self) -> bool:
+        return len(self.parts) > 1
+
+    def note(self, index: int) -> str:
+        """index. parçanın mail gövdesine eklenecek açıklama (1'den başlar)"""
+        count = len(self.parts)
+        if self.mode == "zip":
+            return "\n\nNot: Ek, boyut sınırı nedeniyle ZIP olarak sıkıştırılmıştır."
+        if self.mode == "rows":
+            return (
+                f"\n\nNot: {self.source.name} boyut sınırı nedeniyle {count} dosyaya bölünmüştür "
+                f"(her dosyada başlık satırı vardır). Bu mail {index}/{count}. parçadır."
+            )
+        if self.mode == "volumes":
+            first = self.parts[0].name
+            return (
+                f"\n\nNot: {self.source.name} boyut sınırı nedeniyle {count} parçalı arşiv olarak "
+                f"gönderilmiştir (bu mail {index}/{count}). Tüm parçaları aynı klasöre kaydedip "
+                f"{first} dosyasını 7-Zip ile açın veya parçaları sırayla birleştirin."
+            )
+        return ""
+
+
+def encoded_limit() -> Optional[int]:
+    """MAIL_MAX_MB'a sığan en büyük ham ek boyutu (byte); sınır yoksa None"""
+    if config.MAIL_MAX_MB <= 0:
+        return None
+    budget = int(config.MAIL_MAX_MB * 1024 * 1024) - HEADER_ALLOWANCE
+    return max(LINE_BYTES, budget // 78 * LINE_BYTES)
+
+
+def fits(size: int, limit: Optional[int]) -> bool:
+    return limit is None or size <= limit
+
+
+def parts_dir(path: Path) -> Path:
+    return path.parent / f"{path.stem}_parcalar"
+
+
+def _key(path: Path) -> str:
+    return str(Path(path).resolve())
+
+
+@contextmanager
+def _path_lock(path: Path):
+    key = _key(path)
+    with _locks_guard:
+        entry = _locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                _locks.pop(key, None)
+
+
+def hold_parts(path: Path):
+    """Gönderim süresince parçaları korur (release_parts ile bırakılır)"""
+    key = _key(path)
+    with _locks_guard:
+        _holders[key] = _holders.get(key, 0) + 1
+
+
+def release_parts(path: Path):
+    """hold_parts'ı bırakır; başka tutan yoksa parça dizinini siler"""
+    key = _key(path)
+    with _locks_guard:
+        count = _holders.get(key, 0) - 1
+        if count > 0:
+            _holders[key] = count
+            return
+        _holders.pop(key, None)
+    discard_parts(path)
+
+
+def discard_parts(path: Path):
+    """Ekin parça dizinini siler (yoksa veya başka gönderim tutuyorsa bir şey yapmaz)"""
+    with _path_lock(path):
+        with _locks_guard:
+            if _holders.get(_key(path)):
+                return
+        shutil.rmtree(parts_dir(Path(path)), ignore_errors=True)
+
+
+def _cached(path: Path, limit: int) -> Optional[AttachmentPlan]:
+    """Aynı kaynak ve sınır için önceki denemenin parçaları"""
+    try:
+        manifest = json_codec.load_file(parts_dir(path) / MANIFEST)
+        stat = path.stat()
+        if (manifest["size"], manifest["mtime"], manifest["limit"]) != (stat.st_size, stat.st_mtime, limit):
+            return None
+        parts = [parts_dir(path) / name for name in manifest["parts"]]
+    except (OSError, KeyError, TypeError, ValueError):
+        return None
+    if not all(part.exists() for part in parts):
+        return None
+    return AttachmentPlan(manifest["mode"], path, parts)
+
+
+def _save(plan: AttachmentPlan, limit: int):
+    stat = plan.source.stat()
+    json_codec.dump_file({
+        "mode": plan.mode,
+        "parts": [part.name for part in plan.parts],
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "limit": limit,
+    }, parts_dir(plan.source) / MANIFEST)
+
+
+def plan_attachment(path: Path, limit: Optional[int] = None) -> AttachmentPlan:
+    """Eki sınıra göre planlar; gerekirse sıkıştırılmış / bölünmüş dosyaları yazar"""
+    path = Path(path)
+    limit = limit or encoded_limit()
+    size = path.stat().st_size
+    if fits(size, limit):
+        return AttachmentPlan("as_is", path, [path])
+    with _path_lock(path):
+        return _cached(path, limit) or _build(path, size, limit)
+
+
+def _build(path: Path, size: int, limit: int) -> AttachmentPlan:
+    """Parçaları yazar (kaynağın kilidi tutulurken çağrılır)"""
+    directory = parts_dir(path)
+    shutil.rmtree(directory, ignore_errors=True)
+    directory.mkdir(parents=True, exist_ok=True)
+    logger.info(
+        f"📦 Ek boyut sınırını aşıyor: {path.name} "
+        f"({encoded_size(size) / 1048576:.1f} MB kodlanmış, sınır {config.MAIL_MAX_MB:g} MB)"
+    )
+
+    plan = None
+    archive = path
+    if path.suffix.lower() != ".zip":
+        archive = directory / f"{path.name}.zip"
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zipf:
+            zipf.write(path, path.name)
+        if fits(archive.stat().st_size, limit):
+            plan = AttachmentPlan("zip", path, [archive])
+
+    if plan is None and path.suffix.lower() == ".xlsx":
+        parts = _split_rows(path, directory, limit)
+        if parts:
+            archive.unlink(missing_ok=True)
+            plan = AttachmentPlan("rows", path, parts)
+
+    if plan is None:
+        parts = _split_volumes(archive, directory, limit)
+        if archive != path:
+            archive.unlink()
+        plan = AttachmentPlan("volumes", path, parts)
+
+    _save(plan, limit)
+    MAIL_ATTACHMENT_PLANS.inc(mode=plan.mode)
+    logger.info(f"📦 {path.name}: {plan.mode}, {len(plan.parts)} parça")
+    return plan
+
+
+def _split_rows(path: Path, directory: Path, limit: int) -> Optional[List[Path]]:
+    """Satırları başlık tekrarlanarak parçalara böler; her parça sınıra sığmazsa None"""
+    from openpyxl import Workbook, load_workbook  # ağır import: sadece büyük eklerde
+
+    wb = load_workbook(filename=path, read_only=True)
+    try:
+        ws = wb.active
+        title = ws.title
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        total = sum(1 for _ in rows)
+    finally:
+        wb.close()
+    if header is None or total < 2:
+        return None
+
+    count = math.ceil(path.stat().st_size / (limit * 0.9))
+    for _ in range(MAX_ROW_SPLITS):
+        count = min(count, total)
+        per_part = math.ceil(total / count)
+        count = math.ceil(total / per_part)
+        parts = [directory / f"{path.stem}_parca{index}_{count}{path.suffix}" for index in range(1, count + 1)]
+
+        wb = load_workbook(filename=path, read_only=True)
+        try:
+            rows = wb.active.iter_rows(min_row=2, values_only=True)
+            for part in parts:
+                out = Workbook(write_only=True)
+                sheet = out.create_sheet(title)
+                sheet.append(header)
+                for _, row in zip(range(per_part), rows):
+                    sheet.append(row)
+                out.save(part)
+        finally:
+            wb.close()
+
+        if all(fits(part.stat().st_size, limit) for part in parts):
+            return parts
+        for part in parts:
+            part.unlink(missing_ok=True)
+        if count == total:
+            break
+        count *= 2
+    return None
+
+
+def _split_volumes(archive: Path, directory: Path, limit: int) -> List[Path]:
+    """Dosyayı limit byte'lık numaralı parçalara böler (.001, .002 ...)"""
+    count = math.ceil(archive.stat().st_size / limit)
+    name = archive.name
+    parts = []
+    with open(archive, "rb") as source:
+        for index in range(1, count + 1):
+            part = directory / f"{name}.{index:03d}"
+            with open(part, "wb") as target:
+                remaining = limit
+                while remaining:
+                    data = source.read(min(remaining, 1024 * 1024))
+                    if not data:
+                        break
+                    target.write(data)
+                    remaining -= len(data)
+            parts.append(part)
+    return parts
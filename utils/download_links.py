@@ -0,0 +1,148 @@
+# utils/download_links.py
+"""
+İmzalı, süreli indirme linkleri (büyük çıktılar ek yerine link olarak gönderilir)
+
+Aynı çok MB'lık dosyayı her alıcı için SMTP'den geçirmek yerine mail sadece
+bir link içerir; dosyayı webhook sunucusu (main.start_webhook) data/output
+altından sunar:
+
+    GET /dl/<job_id>/<dosya>?exp=<unix zamanı>&sig=<HMAC-SHA256>
+
+- İmza göreli yol + son kullanma zamanı üzerinden; DOWNLOAD_SECRET boşsa
+  TELEGRAM_TOKEN'dan türetilir. Hatalı imza 403, süresi geçmiş link 410,
+  silinmiş dosya 404 döner.
+- Dosya web.FileResponse ile parça parça (sendfile) gönderilir; Range
+  istekleri (yarım kalan indirmeye devam) desteklenir.
+- MAIL_DELIVERY_MODE: attach (varsayılan, her zaman ek) | link (her zaman
+  link) | auto (MAIL_LINK_MIN_MB ve üstü link). Link sadece webhook modunda
+  ve dışarıdan erişilebilir bir adres (DOWNLOAD_BASE_URL veya WEBHOOK_URL)
+  varsa kullanılır; yoksa ek gönderilir.
+- Linki verilmiş çıktılar süresi dolana kadar janitor'dan korunur.
+- Metrikler: kova_downloads_total{result}.
+"""
+import base64
+import hashlib
+import hmac
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+from aiohttp import web
+
+from config import config
+from utils.janitor import janitor
+from utils.logger import logger
+from utils.metrics import DOWNLOADS
+
+ROUTE = "/dl"
+
+
+class DownloadLinks:
+    @property
+    def secret(self) -> bytes:
+        if config.DOWNLOAD_SECRET:
+            return config.DOWNLOAD_SECRET.encode("utf-8")
+        return hmac.new(config.TELEGRAM_TOKEN.encode("utf-8"), b"download-links", hashlib.sha256).digest()
+
+    @property
+    def base_url(self) -> str:
+        return (config.DOWNLOAD_BASE_URL or config.WEBHOOK_URL).rstrip("/")
+
+    @property
+    def lifetime(self) -> float:
+        return config.DOWNLOAD_LINK_HOURS * 3600
+
+    def enabled(self) -> bool:
+        """Link sunulabilir mi (webhook sunucusu açık ve dış adres biliniyor)"""
+        return config.MAIL_DELIVERY_MODE in ("link", "auto") and config.USE_WEBHOOK and bool(self.base_url)
+
+    @staticmethod
+    def relative(path: Path) -> Optional[str]:
+        """data/output'a göre yol; dışındaysa None"""
+        try:
+            return Path(path).resolve().relative_to(config.OUTPUT_DIR.resolve()).as_posix()
+        except ValueError:
+            return None
+
+    def should_link(self, path: Path) -> bool:
+        """Bu ek mail yerine link olarak mı gönderilmeli"""
+        if not self.enabled() or self.relative(path) is None:
+            return False
+        if config.MAIL_DELIVERY_MODE == "link":
+            return True
+        return Path(path).stat().st_size >= config.MAIL_LINK_MIN_MB * 1024 * 1024
+
+    # ---- imza ----
+    def _signature(self, relative: str, expires: int) -> str:
+        digest = hmac.new(self.secret, f"{relative}\n{expires}".encode("utf-8"), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+    def sign(self, path: Path) -> Tuple[str, int]:
+        """(url, son kullanma zamanı)"""
+        relative = self.relative(path)
+        if relative is None:
+            raise ValueError(f"Çıktı dizini dışında: {path}")
+        expires = int(time.time() + self.lifetime)
+        url = f"{self.base_url}{ROUTE}/{quote(relative)}?exp={expires}&sig={self._signature(relative, expires)}"
+        return url, expires
+
+    def verify(self, relative: str, expires: str, signature: str) -> bool:
+        try:
+            expected = self._signature(relative, int(expires))
+        except ValueError:
+            return False
+        return hmac.compare_digest(expected, signature)
+
+    def note(self, path: Path, url: str, expires: int) -> str:
+        """Mail gövdesine eklenecek link açıklaması"""
+        size_mb = Path(path).stat().st_size / (1024 * 1024)
+        until = datetime.fromtimestamp(expires).strftime("%d.%m.%Y %H:%M")
+        return (
+            f"\n\nDosya ({Path(path).name}, {size_mb:.1f} MB) aşağıdaki linkten indirilebilir:\n"
+            f"{url}\n\nLink {until} tarihine kadar geçerlidir."
+        )
+
+    # ---- sunucu ----
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        """GET/HEAD /dl/{path}: imza ve süre kontrolünden sonra dosyayı akış halinde sunar"""
+        relative = request.match_info["path"]
+        expires = request.query.get("exp", "")
+        if not self.verify(relative, expires, request.query.get("sig", "")):
+            DOWNLOADS.inc(result="forbidden")
+            return web.Response(status=403, text="Forbidden")
+        if int(expires) < time.time():
+            DOWNLOADS.inc(result="expired")
+            return web.Response(status=410, text="Link süresi doldu")
+
+        root = config.OUTPUT_DIR.resolve()
+        path = (root / relative).resolve()
+        if root not in path.parents or not path.is_file():
+            DOWNLOADS.inc(result="missing")
+            return web.Response(status=404, text="Dosya bulunamadı")
+
+        DOWNLOADS.inc(result="range" if "Range" in request.headers else "ok")
+        logger.info(f"⬇️ İndirme: {relative} ({request.remote})")
+        return web.FileResponse(
+            path,
+            chunk_size=256 * 1024,
+            headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(path.name)}"},
+        )
+
+    def register(self, app: web.Application):
+        app.router.add_get(ROUTE + "/{path:.+}", self.handle)  # HEAD da eklenir
+
+    # ---- janitor ----
+    def is_protected(self, path: Path) -> bool:
+        """Janitor koruması: linki hâlâ geçerli olabilecek çıktı"""
+        if not self.enabled() or self.relative(path) is None:
+            return False
+        try:
+            return time.time() - Path(path).stat().st_mtime < self.lifetime
+        except OSError:
+            return False
+
+
+download_links = DownloadLinks()
+janitor.register_guard(download_links.is_protected)
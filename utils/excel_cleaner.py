@@ -3,17 +3,20 @@
 #Sütun genişliği otomatik olarak içeriğe göre ayarlanır, minimum 10, maksimum 25 birim
 
 
-from openpyxl import load_workbook
-from openpyxl.utils import get_column_letter
 from typing import Dict, List, Tuple, Any
 from utils.logger import logger
+from utils.perf import timed
 import tempfile
 import os
 
-def clean_excel_headers(input_path: str) -> Dict[str, Any]:
+@timed("clean", rows_key="row_count", path_arg=0)
+def clean_excel_headers(input_path: str, workspace=None) -> Dict[str, Any]:
     """
     Excel dosyasının başlıklarını temizler ve düzenler
+    workspace: verilirse ara dosya işin scratch dizinine yazılır (utils/workspace.py)
     """
+    from openpyxl import load_workbook  # ağır import: bot açılışını yavaşlatmasın
+    
     try:
         wb = load_workbook(filename=input_path)
         ws = wb.active
@@ -99,9 +102,11 @@ def clean_excel_headers(input_path: str) -> Dict[str, Any]:
         
                 
         # Geçici dosyaya kaydet
-        # Geçici dosyaya kaydet
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx")
-        temp_path = temp_file.name
+        if workspace is not None:
+            temp_path = str(workspace.scratch_path("cleaned.xlsx"))
+        else:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as temp_file:
+                temp_path = temp_file.name
         new_wb.save(temp_path)
         
         return {
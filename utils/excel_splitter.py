@@ -3,58 +3,153 @@
 Excel dosyasını gruplara ayıran ana fonksiyon
 
 """
-from openpyxl import load_workbook, Workbook
-from openpyxl.utils import get_column_letter
-from typing import Dict, List, Tuple, Any
-import tempfile
+from typing import Callable, Dict, List, Tuple, Any, Optional
 import os
+import pickle
+import shutil
+import tempfile
 
 from utils.group_manager import group_manager
 from utils.file_namer import generate_output_filename
-from utils.logger import logger
+from utils.logger import logger, ProgressLogger
+from utils.perf import timed
 from config import config
 
+# Satır bellek tahmini (CPython nesne boyutlarına yakın, bilerek cömert)
+ROW_OVERHEAD_BYTES = 56 + 8     # tuple başlığı + grup listesindeki referans
+VALUE_OVERHEAD_BYTES = 56       # hücre değeri nesnesi + tuple içi referans
+MAX_COLUMN_WIDTH = 25
+MIN_COLUMN_WIDTH = 10
+
+
+class GroupBuffer:
+    """
+    Bir grubun satırları: önce bellekte tutulur, bütçe aşılınca geçici
+    dosyaya pickle çerçeveleri halinde eklenir (spill).
+    """
+    __slots__ = ("rows", "row_count", "spill_path", "spilled_rows", "widths")
+
+    def __init__(self, headers: List[str]):
+        self.rows: List[tuple] = []
+        self.row_count = 0
+        self.spill_path = None
+        self.spilled_rows = 0
+        # Sütun genişliği için en uzun değer (başlık dahil), satır eklenirken güncellenir
+        self.widths = [len(str(h)) if h else 0 for h in headers]
+
+    def add(self, row: tuple, lengths: List[int]):
+        self.rows.append(row)
+        self.row_count += 1
+        widths = self.widths
+        if len(lengths) > len(widths):
+            widths.extend([0] * (len(lengths) - len(widths)))
+        for index, length in enumerate(lengths):
+            if length > widths[index]:
+                widths[index] = length
+
+    def spill(self, directory: str, group_id: str):
+        """Bellekteki satırları grubun geçici dosyasına ekler"""
+        if not self.rows:
+            return
+        if self.spill_path is None:
+            fd, self.spill_path = tempfile.mkstemp(prefix=f"{group_id}_", suffix=".rows", dir=directory)
+            os.close(fd)
+        with open(self.spill_path, "ab") as f:
+            pickle.dump(self.rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.spilled_rows += len(self.rows)
+        self.rows = []
+
+    def iter_rows(self):
+        """Önce dosyaya yazılan, sonra bellekteki satırlar (orijinal sırayla)"""
+        if self.spill_path is not None:
+            with open(self.spill_path, "rb") as f:
+                while True:
+                    try:
+                        batch = pickle.load(f)
+                    except EOFError:
+                        break
+                    yield from batch
+        yield from self.rows
+
+    def column_widths(self) -> List[int]:
+        return [min(MAX_COLUMN_WIDTH, max(length + 2, MIN_COLUMN_WIDTH)) for length in self.widths]
+
+    def discard(self):
+        self.rows = []
+        if self.spill_path is not None:
+            try:
+                os.unlink(self.spill_path)
+            except OSError:
+                pass
+            self.spill_path = None
+
+
 class ExcelSplitter:
-    def __init__(self):
-        self.workbooks = {}  # group_id -> Workbook
-        self.sheets = {}     # group_id -> Worksheet
-        self.row_counts = {} # group_id -> satır sayısı
+    """
+    Satırları gruplara ayırır. Tüm grupların workbook'u aynı anda bellekte
+    tutulmaz: satırlar grup tamponlarında birikir, tahmini boyut iş başına
+    bütçeyi (SPLIT_MEMORY_BUDGET_MB / JOB_WORKERS; aynı anda JOB_WORKERS iş
+    ayırabilir) aşınca tamponlar diske taşınır. Çıktılar en sonda,
+    her seferinde tek grup için write_only workbook ile yazılır; böylece tepe
+    bellek girdi boyutuyla değil bütçeyle sınırlı kalır.
+    
+    on_group_ready(group_id, file_info) verilirse her grup dosyası yazılır
+    yazılmaz çağrılır (ayırma thread'de çalışıyorsa o thread'den); çağıran
+    kalan gruplar yazılırken teslimata başlayabilir.
+    """
+
+    def __init__(self, memory_budget_mb: Optional[float] = None, workspace=None,
+                 on_group_ready: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        if memory_budget_mb is None:
+            memory_budget_mb = config.SPLIT_MEMORY_BUDGET_MB / max(1, config.JOB_WORKERS)
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.buffers: Dict[str, GroupBuffer] = {}  # group_id -> GroupBuffer
         self.headers = []    # başlık satırı
         self.city_mapping_stats = {}  # Şehir eşleştirme istatistikleri
-    
-    def initialize_workbook(self, group_id: str):
-        """Yeni bir workbook ve worksheet oluşturur"""
-        if group_id not in self.workbooks:
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Veriler"
-            
-            # Başlık satırını yaz
-            for col_idx, header in enumerate(self.headers, 1):
-                ws.cell(row=1, column=col_idx, value=header)
-            
-            # Sütun genişliklerini ayarla (25 birim)
-            self.adjust_column_widths(ws)
-            
-            self.workbooks[group_id] = wb
-            self.sheets[group_id] = ws
-            self.row_counts[group_id] = 1  # Başlık satırı
+        self.buffered_bytes = 0
+        self.spill_count = 0
+        self.spill_dir = None
+        self.workspace = workspace  # verilirse çıktı ve spill dosyaları işin dizinlerine yazılır
+        self.on_group_ready = on_group_ready
+
+    def get_buffer(self, group_id: str) -> GroupBuffer:
+        buffer = self.buffers.get(group_id)
+        if buffer is None:
+            buffer = self.buffers[group_id] = GroupBuffer(self.headers)
             self.city_mapping_stats[group_id] = 0
-    
-    def adjust_column_widths(self, worksheet, width: int = 25):
-        """
-        Tüm sütunların genişliğini ayarlar
-        Args:
-            worksheet: Çalışma sayfası nesnesi
-            width: Sütun genişliği (varsayılan: 25)
-        """
-        for column_cells in worksheet.columns:
-            length = max(len(str(cell.value)) if cell.value else 0 for cell in column_cells)
-            column_letter = get_column_letter(column_cells[0].column)
-            worksheet.column_dimensions[column_letter].width = min(width, max(length + 2, 10))
-    
+        return buffer
+
+    def spill_all(self):
+        """Tüm grup tamponlarını diske taşır"""
+        if self.spill_dir is None:
+            scratch = None
+            if self.workspace is not None:
+                scratch = self.workspace.scratch_dir
+                scratch.mkdir(parents=True, exist_ok=True)
+            self.spill_dir = tempfile.mkdtemp(prefix="kova-split-", dir=scratch)
+        for group_id, buffer in self.buffers.items():
+            buffer.spill(self.spill_dir, group_id)
+        self.buffered_bytes = 0
+        self.spill_count += 1
+
+    def write_group(self, buffer: GroupBuffer, filepath) -> None:
+        """Tek grubun çıktısını write_only workbook ile yazar"""
+        from openpyxl import Workbook
+        from openpyxl.utils import get_column_letter
+        
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Veriler")
+        for col_idx, width in enumerate(buffer.column_widths(), 1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
+        ws.append(self.headers)
+        for row in buffer.iter_rows():
+            ws.append(row)
+        wb.save(filepath)
+
     def process_excel_file(self, input_path: str, headers: List[str]) -> Dict[str, Any]:
-        """Excel dosyasını gruplara ayırır (optimize edilmiş)"""
+        """Excel dosyasını gruplara ayırır (bellek bütçeli)"""
+        from openpyxl import load_workbook  # ağır import: bot açılışını yavaşlatmasın
+        
         wb = None  # Workbook'u burada tanımla
         try:
             self.headers = headers
@@ -70,8 +165,9 @@ class ExcelSplitter:
             # Tüm satırları iterate et
             processed_rows = 0
             unmatched_cities = set()
+            progress = ProgressLogger("split")
             
-            for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+            for row in ws.iter_rows(min_row=2, values_only=True):
                 if not any(row):  # Boş satırları atla
                     continue
                 
@@ -84,56 +180,64 @@ class ExcelSplitter:
                 if "Grup_0" in group_ids and len(group_ids) == 1:
                     unmatched_cities.add(str(city))
                 
-                # Her grup için satırı ekle
+                # Değer uzunlukları bir kez hesaplanır: hem sütun genişliği hem bellek tahmini
+                lengths = [len(str(value)) if value else 0 for value in row]
+                row_bytes = ROW_OVERHEAD_BYTES + len(row) * VALUE_OVERHEAD_BYTES + sum(lengths)
+                
+                # Her grup için satırı ekle (tuple gruplar arasında paylaşılır)
                 for group_id in group_ids:
-                    self.initialize_workbook(group_id)
-                    
-                    ws_dest = self.sheets[group_id]
-                    current_row = self.row_counts[group_id] + 1
-                    
-                    for col_idx, value in enumerate(row, 1):
-                        ws_dest.cell(row=current_row, column=col_idx, value=value)
-                    
-                    self.row_counts[group_id] = current_row
+                    self.get_buffer(group_id).add(row, lengths)
                     self.city_mapping_stats[group_id] += 1
+                self.buffered_bytes += row_bytes + 8 * (len(group_ids) - 1)
+                
+                if self.buffered_bytes > self.memory_budget:
+                    self.spill_all()
                 
                 processed_rows += 1
                 
-                # İlerleme logu (her 1000 satırda bir)
+                # İlerleme logu (her 1000 satırda kontrol, en fazla 5 sn'de bir yazılır)
                 if processed_rows % 1000 == 0:
-                    logger.info(f"{processed_rows}/{total_rows} satır işlendi")
+                    progress.progress("{}/{} satır işlendi", processed_rows, total_rows)
             
             logger.info(f"İşlem tamamlandı: {processed_rows} satır")
+            if self.spill_count:
+                logger.info(
+                    f"Bellek bütçesi ({self.memory_budget // (1024 * 1024)} MB) {self.spill_count} kez aşıldı, "
+                    f"grup satırları diske taşındı"
+                )
             
             # Eşleşmeyen şehirleri logla
             if unmatched_cities:
                 logger.warning(f"Eşleşmeyen şehirler: {list(unmatched_cities)[:10]}{'...' if len(unmatched_cities) > 10 else ''}")
             
-            # Dosyaları kaydetmeden önce sütun genişliklerini güncelle
-            for group_id, wb in self.workbooks.items():
-                if self.row_counts[group_id] > 1:  # Sadece başlık değilse
-                    self.adjust_column_widths(self.sheets[group_id])
-            
-            # Dosyaları kaydet
+            # Dosyaları kaydet: her seferinde tek grup, yazılan grubun tamponu hemen bırakılır
             output_files = {}
-            for group_id, wb in self.workbooks.items():
-                if self.row_counts[group_id] > 1:  # Sadece başlık değilse
+            for group_id, buffer in self.buffers.items():
+                if buffer.row_count > 0:
                     group_info = group_manager.get_group_info(group_id)
                     filename = generate_output_filename(group_info)
-                    filepath = config.OUTPUT_DIR / filename
-                    
-                    # Dizin yoksa oluştur
-                    filepath.parent.mkdir(parents=True, exist_ok=True)
+                    if self.workspace is not None:
+                        filepath = self.workspace.output_path(filename)
+                        filename = filepath.name
+                    else:
+                        filepath = config.OUTPUT_DIR / filename
+                        filepath.parent.mkdir(parents=True, exist_ok=True)
                     
-                    wb.save(filepath)
+                    self.write_group(buffer, filepath)
                     output_files[group_id] = {
                         "path": filepath,
-                        "row_count": self.row_counts[group_id] - 1,  # Başlık hariç
+                        "row_count": buffer.row_count,
                         "filename": filename,
                         "matched_cities": self.city_mapping_stats.get(group_id, 0)
                     }
+                    if self.on_group_ready is not None:
+                        try:
+                            self.on_group_ready(group_id, output_files[group_id])
+                        except Exception as e:
+                            logger.error(f"Grup hazır bildirimi hatası ({group_id}): {e}")
+                buffer.discard()
             
-            matched_rows = sum(count - 1 for count in self.row_counts.values() if count > 1)
+            matched_rows = sum(info["row_count"] for info in output_files.values())
             
             return {
                 "success": True,
@@ -141,7 +245,7 @@ class ExcelSplitter:
                 "total_rows": processed_rows,
                 "matched_rows": matched_rows,
                 "unmatched_cities": list(unmatched_cities),
-                "stats": self.city_mapping_stats
+                "stats": dict(self.city_mapping_stats)
             }
             
         except Exception as e:
@@ -155,22 +259,22 @@ class ExcelSplitter:
                 except:
                     pass
             
-            # Belleği temizle
-            self.close_all_workbooks()
+            # Belleği ve geçici dosyaları temizle
+            self.release_buffers()
     
-    def close_all_workbooks(self):
-        """Tüm workbook'ları kapatır"""
-        for wb in self.workbooks.values():
-            try:
-                wb.close()
-            except:
-                pass
-        self.workbooks.clear()
-        self.sheets.clear()
-        self.row_counts.clear()
-        self.city_mapping_stats.clear()
+    def release_buffers(self):
+        """Tüm grup tamponlarını ve spill dosyalarını temizler"""
+        for buffer in self.buffers.values():
+            buffer.discard()
+        self.buffers.clear()
+        self.buffered_bytes = 0
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
 
-def split_excel_by_groups(input_path: str, headers: List[str]) -> Dict[str, Any]:
+@timed("split", rows_key="total_rows", path_arg=0)
+def split_excel_by_groups(input_path: str, headers: List[str], workspace=None,
+                          on_group_ready: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
     """Excel dosyasını gruplara ayıran ana fonksiyon"""
-    splitter = ExcelSplitter()
+    splitter = ExcelSplitter(workspace=workspace, on_group_ready=on_group_ready)
     return splitter.process_excel_file(input_path, headers)
\ No newline at end of file
@@ -6,83 +6,69 @@ sistem yönetimi yapmak için kapsamlı bir dizi komut sağlar.
  Tüm komutlar kullanıcı dostu çıktılar üretir ve 
 hata durumlarında uygun geri bildirim sağlar.
 
+İstatistikler ve dizin boyutları klasörler taranarak değil, iş
+tamamlandığında ve janitor turlarında güncellenen job_store (SQLite)
+toplamlarından okunur; sorgular thread'de çalışır.
 """
 # utils/file_utils.py
 
-import os
+import asyncio
+import time
 from datetime import datetime
-from pathlib import Path
-import psutil
-from config import config
+from utils.job_store import job_store
 
 async def get_recent_processed_files(limit: int = 10):
     """
-    Output klasöründen son işlenen dosyaları döndürür.
+    Son işlenen (üretilen) dosyaları job_store'dan döndürür.
     """
-    files = []
-    output_dir = config.OUTPUT_DIR
-
-    if not output_dir.exists():
-        return []
-
-    for file_path in sorted(output_dir.glob("*.xlsx"), key=lambda x: x.stat().st_mtime, reverse=True):
-        stat = file_path.stat()
-        files.append({
-            "name": file_path.name,
-            "size": f"{stat.st_size / 1024:.1f} KB",
-            "modified": datetime.fromtimestamp(stat.st_mtime)
-        })
-        if len(files) >= limit:
-            break
-
-    return files
+    rows = await asyncio.to_thread(job_store.recent_files, limit)
+    return [
+        {
+            "name": row["filename"],
+            "size": f"{row['size_bytes'] / 1024:.1f} KB",
+            "modified": datetime.fromtimestamp(row["created_at"])
+        }
+        for row in rows
+    ]
 
 async def get_file_stats(detailed=False):
     """
     İşlenen dosya sayısı ve sistem kaynak kullanımı gibi bilgileri verir.
     """
-    total_processed = len(list(config.OUTPUT_DIR.glob("*.xlsx")))
-    total_rows = 0
-    successful_processed = total_processed
-    failed_processed = 0
-    emails_sent = total_processed
+    totals = await asyncio.to_thread(job_store.get_totals)
 
     last_processed = "Yok"
-    files = sorted(config.OUTPUT_DIR.glob("*.xlsx"), key=lambda x: x.stat().st_mtime, reverse=True)
-    if files:
-        last_processed = datetime.fromtimestamp(files[0].stat().st_mtime).strftime("%d.%m.%Y %H:%M")
+    last_finished = await asyncio.to_thread(job_store.last_finished_at)
+    if last_finished:
+        last_processed = datetime.fromtimestamp(last_finished).strftime("%d.%m.%Y %H:%M")
 
+    import psutil  # sadece istatistik panelinde gerekli
     process = psutil.Process()
     memory_usage = f"{process.memory_info().rss / 1024 / 1024:.1f} MB"
 
     stats = {
-        "total_processed": total_processed,
-        "total_rows": total_rows,
-        "successful_processed": successful_processed,
-        "failed_processed": failed_processed,
-        "emails_sent": emails_sent,
+        "total_processed": totals.get("total_processed", 0),
+        "total_rows": totals.get("total_rows", 0),
+        "successful_processed": totals.get("successful_processed", 0),
+        "failed_processed": totals.get("failed_processed", 0),
+        "emails_sent": totals.get("emails_sent", 0),
+        "emails_failed": totals.get("emails_failed", 0),
         "last_processed": last_processed,
         "memory_usage": memory_usage
     }
 
     if detailed:
+        now = time.time()
         stats.update({
-            "last_24h_processed": total_processed,
-            "last_7d_processed": total_processed,
-            "input_dir_size": get_directory_size(config.INPUT_DIR),
-            "output_dir_size": get_directory_size(config.OUTPUT_DIR),
-            "logs_dir_size": get_directory_size(config.LOGS_DIR),
+            "last_24h_processed": await asyncio.to_thread(job_store.count_jobs_since, now - 24 * 3600),
+            "last_7d_processed": await asyncio.to_thread(job_store.count_jobs_since, now - 7 * 24 * 3600),
+            "input_dir_size": format_size(totals.get("input_dir_bytes", 0)),
+            "output_dir_size": format_size(totals.get("output_dir_bytes", 0)),
+            "logs_dir_size": format_size(totals.get("logs_dir_bytes", 0)),
         })
 
     return stats
 
-def get_directory_size(path: Path) -> str:
-    """
-    Verilen dizindeki tüm dosyaların toplam boyutunu MB cinsinden döner.
-    """
-    total_size = 0  # total_size_ yerine total_size
-    for file_path in path.rglob('*'):
-        if file_path.is_file():
-            total_size += file_path.stat().st_size
-    
-    return f"{total_size / (1024 * 1024):.2f} MB"  # total_size_ yerine total_size
+def format_size(total_size: int) -> str:
+    """Byte'ı MB metnine çevirir"""
+    return f"{total_size / (1024 * 1024):.2f} MB"
@@ -0,0 +1,188 @@
+# utils/fsm_storage.py
+"""
+Kalıcı FSM deposu (yeniden başlatmada kullanıcı akışları kaybolmaz)
+
+FSM_STORAGE ile seçilir:
+    sqlite  (varsayılan) data/fsm.db, WAL modunda; ağ servisi gerekmez
+    redis   REDIS_URL'e ping atılır; ulaşılamazsa sqlite'a düşülür
+    memory  aiogram MemoryStorage (eski davranış)
+
+SQLiteStorage okumaları bellekteki kopyadan yapar; yazmalar "dirty" olarak
+işaretlenir ve FSM_FLUSH_INTERVAL saniyede bir tek transaction'da diske
+yazılır (write-behind). close() bekleyen yazmaları bitirir; ani kapanışta en
+fazla son flush aralığındaki değişiklikler kaybolur.
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from config import config
+from utils import json_codec
+from utils.logger import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    key        TEXT PRIMARY KEY,
+    state      TEXT,
+    data       TEXT NOT NULL DEFAULT '{}',
+    updated_at REAL NOT NULL
+);
+"""
+
+Record = Tuple[Optional[str], Dict[str, Any]]
+
+
+class SQLiteStorage(BaseStorage):
+    def __init__(self, db_path: Path, flush_interval: float = 1.0):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._records: Dict[str, Record] = {}
+        self._dirty: Dict[str, Record] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._load()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _load(self):
+        """Kayıtlı durumları belleğe alır"""
+        with self._lock:
+            rows = self._connect().execute("SELECT key, state, data FROM fsm").fetchall()
+        for key, state, data in rows:
+            try:
+                self._records[key] = (state, json_codec.loads(data))
+            except json_codec.JSONDecodeError:
+                logger.warning(f"⚠️ Bozuk FSM kaydı atlandı: {key}")
+        if rows:
+            logger.info(f"💾 {len(self._records)} FSM kaydı geri yüklendi ({self.db_path.name})")
+
+    def _write(self, batch: Dict[str, Record]):
+        now = time.time()
+        upserts = [
+            (key, state, json_codec.dumps(data), now)
+            for key, (state, data) in batch.items() if state is not None or data
+        ]
+        deletes = [(key,) for key, (state, data) in batch.items() if state is None and not data]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO fsm(key, state, data, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET state = excluded.state, "
+                    "data = excluded.data, updated_at = excluded.updated_at",
+                    upserts
+                )
+                conn.executemany("DELETE FROM fsm WHERE key = ?", deletes)
+
+    async def flush(self):
+        """Bekleyen değişiklikleri diske yazar"""
+        if not self._dirty:
+            return
+        batch, self._dirty = self._dirty, {}
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception as e:
+            # Yazılamayanlar sonraki flush'a kalır (daha yeni değişiklik varsa o geçerli)
+            self._dirty = {**batch, **self._dirty}
+            logger.error(f"FSM kayıtları yazılamadı: {e}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _mark(self, key: str, record: Record):
+        state, data = record
+        if state is None and not data:
+            self._records.pop(key, None)  # temizlenen kullanıcı bellekte tutulmaz
+        else:
+            self._records[key] = record
+        self._dirty[key] = record
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop(), name="fsm-flush")
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key)
+        _, data = self._records.get(storage_key, (None, {}))
+        self._mark(storage_key, (state.state if isinstance(state, State) else state, data))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return self._records.get(self.key_builder.build(key), (None, {}))[0]
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        storage_key = self.key_builder.build(key)
+        state, _ = self._records.get(storage_key, (None, {}))
+        self._mark(storage_key, (state, data.copy()))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return self._records.get(self.key_builder.build(key), (None, {}))[1].copy()
+
+    async def close(self) -> None:
+        """Flush döngüsünü durdurur ve kalanları yazar (birden çok kez çağrılabilir)"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+async def _redis_storage() -> Optional[BaseStorage]:
+    """REDIS_URL'e ulaşılabiliyorsa RedisStorage döner"""
+    try:
+        from aiogram.fsm.storage.redis import RedisStorage
+    except ImportError:
+        logger.warning("⚠️ redis paketi kurulu değil")
+        return None
+
+    storage = RedisStorage.from_url(
+        config.REDIS_URL,
+        key_builder=DefaultKeyBuilder(prefix="kova_fsm", with_bot_id=True, with_destiny=True),
+    )
+    try:
+        await asyncio.wait_for(storage.redis.ping(), timeout=3)
+    except Exception as e:
+        logger.warning(f"⚠️ Redis'e ulaşılamadı ({e})")
+        await storage.close()
+        return None
+    return storage
+
+
+async def create_storage() -> BaseStorage:
+    """config.FSM_STORAGE'a göre FSM deposunu oluşturur"""
+    backend = config.FSM_STORAGE
+    if backend == "memory":
+        logger.info("💾 FSM deposu: memory (yeniden başlatmada durumlar kaybolur)")
+        return MemoryStorage()
+
+    if backend == "redis":
+        storage = await _redis_storage()
+        if storage is not None:
+            logger.info("💾 FSM deposu: redis")
+            return storage
+        logger.warning("⚠️ FSM deposu için sqlite'a geçiliyor")
+    elif backend != "sqlite":
+        logger.warning(f"⚠️ Bilinmeyen FSM_STORAGE '{backend}', sqlite kullanılıyor")
+
+    logger.info(f"💾 FSM deposu: sqlite ({config.FSM_DB})")
+    return SQLiteStorage(config.FSM_DB, flush_interval=config.FSM_FLUSH_INTERVAL)
@@ -1,19 +1,40 @@
 #Grup Yöneticisi (utils/group_manager.py)
 
-import json
 from typing import Dict, List, Set
 from pathlib import Path
 from config import config
 from utils.logger import logger
+from utils.json_codec import load_file, dump_file
 import unicodedata
 import re
 
 class GroupManager:
     def __init__(self):
-        self.groups = self.load_groups()
-        self.city_to_group = self.build_city_mapping()
+        # groups.json ilk kullanımda okunur (import sırasında değil)
+        self._groups = None
+        self._city_to_group = None
         self.group_cache = {}  # Grup bilgileri için cache
     
+    @property
+    def groups(self) -> Dict:
+        if self._groups is None:
+            self._groups = self.load_groups()
+        return self._groups
+    
+    @groups.setter
+    def groups(self, value: Dict):
+        self._groups = value
+    
+    @property
+    def city_to_group(self) -> Dict[str, List[str]]:
+        if self._city_to_group is None:
+            self._city_to_group = self.build_city_mapping()
+        return self._city_to_group
+    
+    @city_to_group.setter
+    def city_to_group(self, value: Dict[str, List[str]]):
+        self._city_to_group = value
+    
     def load_groups(self) -> Dict:
         """Grupları JSON dosyasından yükler"""
         groups_file = config.GROUPS_DIR / "groups.json"
@@ -24,8 +45,7 @@ class GroupManager:
             groups_file = config.GROUPS_DIR / "groups.json"
         
         try:
-            with open(groups_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return load_file(groups_file)
         except Exception as e:
             logger.error(f"Gruplar yüklenirken hata: {e}")
             return {"groups": []}
@@ -49,8 +69,7 @@ class GroupManager:
             ]
         }
         
-        with open(config.GROUPS_DIR / "groups.json", 'w', encoding='utf-8') as f:
-            json.dump(sample_groups, f, ensure_ascii=False, indent=2)
+        dump_file(sample_groups, config.GROUPS_DIR / "groups.json")
     
     def normalize_city_name(self, city_name: str) -> str:
         """
@@ -0,0 +1,247 @@
+# utils/janitor.py
+"""
+Arka plan dosya temizliği (retention / garbage collection)
+
+Her dizin için bir politika: yaş sınırı ve toplam boyut kotası.
+    input    INPUT_RETENTION_HOURS,  INPUT_QUOTA_MB
+    output   OUTPUT_RETENTION_DAYS,  OUTPUT_QUOTA_MB
+    scratch  SCRATCH_RETENTION_HOURS (yarım kalmış işlerin ara dosyaları)
+    logs     LOG_RETENTION_DAYS (döndürülmüş <ad>.<zaman>.log yedekleri; bot.log, errors.log hariç)
+    groups   LOG_RETENTION_DAYS (groups_backup_*.json)
+    outbox   OUTPUT_RETENTION_DAYS (teslim edilememiş toplu ZIP artıkları)
+
+- Önce yaş sınırını aşanlar, ardından kota aşılıyorsa en eskiden başlayarak
+  dosyalar silinir. Tarama ve silme thread'de yapılır (event loop bloklanmaz).
+- Açık çalışma alanlarının dizinleri (utils/workspace.py) ve koruma
+  fonksiyonlarının (register_guard) işaretlediği yollar atlanır; son
+  MIN_AGE_SECONDS içinde değişen dosyalara da dokunulmaz.
+- Sistem temp dizini taranmaz: iş dosyaları data/scratch altındadır.
+
+Janitor her JANITOR_INTERVAL_MINUTES dakikada bir çalışır; /clear ve admin
+"Temizlik Yap" aynı mekanizmayı anında çalıştırır. Her turdan sonra (ve
+açılışta) input / output / logs dizinlerinin boyutu thread'de ölçülüp
+job_store'a yazılır; /status dizin taramaz.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import config
+from utils.job_store import job_store
+from utils.logger import logger
+from utils.metrics import JANITOR_DELETED_BYTES, JANITOR_DELETED_FILES
+from utils.workspace import active_ids, active_workspaces
+
+MIN_AGE_SECONDS = 60  # yeni yazılmış dosyaya (workspace dışı yazıcılar) dokunma
+MB = 1024 * 1024
+
+
+@dataclass
+class RetentionPolicy:
+    name: str
+    root: Path
+    max_age: Optional[float] = None  # saniye, None = yaş sınırı yok
+    max_bytes: Optional[int] = None  # None = kota yok
+    pattern: str = "*"
+    recursive: bool = True
+
+
+@dataclass
+class SweepResult:
+    files: int = 0
+    bytes: int = 0
+    kept_files: int = 0
+    kept_bytes: int = 0
+
+
+def default_policies() -> List[RetentionPolicy]:
+    def quota(mb: float) -> Optional[int]:
+        return int(mb * MB) if mb > 0 else None
+
+    return [
+        RetentionPolicy("input", config.INPUT_DIR, config.INPUT_RETENTION_HOURS * 3600, quota(config.INPUT_QUOTA_MB)),
+        RetentionPolicy("output", config.OUTPUT_DIR, config.OUTPUT_RETENTION_DAYS * 86400, quota(config.OUTPUT_QUOTA_MB)),
+        RetentionPolicy("scratch", config.SCRATCH_DIR, config.SCRATCH_RETENTION_HOURS * 3600),
+        RetentionPolicy("logs", config.LOGS_DIR, config.LOG_RETENTION_DAYS * 86400, pattern="*.*.log", recursive=False),
+        RetentionPolicy("groups", config.GROUPS_DIR, config.LOG_RETENTION_DAYS * 86400,
+                        pattern="groups_backup_*.json", recursive=False),
+        RetentionPolicy("outbox", config.OUTBOX_DIR, config.OUTPUT_RETENTION_DAYS * 86400),
+    ]
+
+
+def clear_policies() -> List[RetentionPolicy]:
+    """/clear: input, output ve ara dosyaların hepsi (çalışan işler hariç)"""
+    return [
+        RetentionPolicy("input", config.INPUT_DIR, max_age=0),
+        RetentionPolicy("output", config.OUTPUT_DIR, max_age=0),
+        RetentionPolicy("scratch", config.SCRATCH_DIR, max_age=0),
+    ]
+
+
+def _scan(policy: RetentionPolicy, protected: Tuple[str, ...]) -> List[Tuple[float, int, str]]:
+    """(mtime, size, path) listesi; korunan dizinler atlanır"""
+    files = []
+    stack = [str(policy.root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if policy.recursive and not (entry.path + os.sep).startswith(protected):
+                                stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False) and fnmatch(entry.name, policy.pattern):
+                            if entry.path.startswith(protected):
+                                continue
+                            stat = entry.stat(follow_symlinks=False)
+                            files.append((stat.st_mtime, stat.st_size, entry.path))
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return files
+
+
+def directory_bytes(path: Path) -> int:
+    """Dizindeki tüm dosyaların toplam boyutu (os.scandir, dosya başına tek stat)"""
+    return sum(size for _, size, _ in _scan(RetentionPolicy("usage", path), ()))
+
+
+def measure_usage() -> Dict[str, int]:
+    """job_store'daki dizin boyutu toplamları (thread'de çalışır)"""
+    return {
+        "input_dir_bytes": directory_bytes(config.INPUT_DIR),
+        "output_dir_bytes": directory_bytes(config.OUTPUT_DIR),
+        "logs_dir_bytes": directory_bytes(config.LOGS_DIR),
+    }
+
+
+def _prune_dirs(root: Path, protected: Tuple[str, ...]):
+    """Boş kalan alt dizinleri kaldırır (kök ve tarama sırasında açılan iş dizinleri kalır)"""
+    for dirpath, _, _ in sorted(os.walk(root), key=lambda item: len(item[0]), reverse=True):
+        if dirpath == str(root) or (dirpath + os.sep).startswith(protected):
+            continue
+        if os.path.basename(dirpath) in active_ids():
+            continue
+        try:
+            os.rmdir(dirpath)
+        except OSError:
+            pass
+
+
+def sweep(policy: RetentionPolicy, protected: Tuple[str, ...], guards: List[Callable[[Path], bool]],
+          now: Optional[float] = None) -> SweepResult:
+    """Tek politikayı uygular (thread'de çalışır)"""
+    now = time.time() if now is None else now
+    result = SweepResult()
+    if not policy.root.exists():
+        return result
+
+    files = sorted(_scan(policy, protected))  # en eski önce
+    total = sum(size for _, size, _ in files)
+    for mtime, size, path in files:
+        age = now - mtime
+        expired = policy.max_age is not None and age > policy.max_age
+        over_quota = policy.max_bytes is not None and total > policy.max_bytes
+        if not (expired or over_quota):
+            continue
+        if age < MIN_AGE_SECONDS and policy.max_age != 0:  # /clear (max_age=0) beklemez
+            continue
+        if any(guard(Path(path)) for guard in guards):
+            continue
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        total -= size
+        result.files += 1
+        result.bytes += size
+
+    result.kept_bytes = total
+    result.kept_files = len(files) - result.files
+    if policy.recursive:
+        _prune_dirs(policy.root, protected)
+    return result
+
+
+class Janitor:
+    def __init__(self, interval_minutes: float):
+        self.interval = interval_minutes * 60
+        self._guards: List[Callable[[Path], bool]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.last_run: Optional[float] = None
+        self.last_result: Dict[str, SweepResult] = {}
+
+    def register_guard(self, guard: Callable[[Path], bool]):
+        """Silinmemesi gereken yolları işaretleyen fonksiyon ekler (thread'den çağrılır)"""
+        self._guards.append(guard)
+
+    async def run(self, policies: Optional[List[RetentionPolicy]] = None) -> Dict[str, SweepResult]:
+        """Politikaları thread'de uygular; eşzamanlı iki temizlik çalışmaz"""
+        policies = default_policies() if policies is None else policies
+        async with self._lock:
+            # Açık işlerin dizinleri loop'ta alınır; thread çalışırken açılan iş MIN_AGE ile korunur
+            protected = tuple(
+                str(directory) + os.sep
+                for workspace in active_workspaces()
+                for directory in (workspace.input_dir, workspace.output_dir, workspace.scratch_dir)
+            )
+            results = {}
+            for policy in policies:
+                results[policy.name] = await asyncio.to_thread(sweep, policy, protected, list(self._guards))
+                if results[policy.name].files:
+                    JANITOR_DELETED_FILES.inc(results[policy.name].files, policy=policy.name)
+                    JANITOR_DELETED_BYTES.inc(results[policy.name].bytes, policy=policy.name)
+            await self.measure_usage()
+
+        self.last_run = time.time()
+        self.last_result = results
+        deleted = sum(r.files for r in results.values())
+        if deleted:
+            freed = sum(r.bytes for r in results.values()) / MB
+            logger.info(f"🧹 Janitor: {deleted} dosya silindi, {freed:.2f} MB boşaldı")
+        return results
+
+    async def measure_usage(self):
+        """Dizin boyutlarını thread'de ölçüp job_store'a yazar"""
+        usage = await asyncio.to_thread(measure_usage)
+        await asyncio.to_thread(job_store.set_totals, usage)
+
+    async def _loop(self):
+        try:
+            await self.measure_usage()
+        except Exception as e:
+            logger.error(f"Janitor hatası: {e}")
+        await asyncio.sleep(min(60, self.interval))  # açılışı yavaşlatma
+        while True:
+            try:
+                await self.run()
+            except Exception as e:
+                logger.error(f"Janitor hatası: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.interval <= 0 or (self._task and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._loop(), name="janitor")
+        logger.info(f"🧹 Janitor başlatıldı ({self.interval / 60:.0f} dk aralıkla)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+def summarize(results: Dict[str, SweepResult]) -> Tuple[int, int]:
+    """(silinen dosya, boşalan byte)"""
+    return sum(r.files for r in results.values()), sum(r.bytes for r in results.values())
+
+
+janitor = Janitor(config.JANITOR_INTERVAL_MINUTES)
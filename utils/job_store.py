@@ -0,0 +1,309 @@
+# utils/job_store.py
+"""
+İş metrikleri deposu (SQLite)
+
+Her işlem tamamlandığında satır, grup, mail sonucu ve byte bilgileri yazılır.
+/status, /files ve admin paneli output klasörünü taramak yerine buradan okur:
+- toplamlar `totals` tablosunda artımlı tutulur (O(1) okuma)
+- zaman pencereli sorgular finished_at / created_at indeksleriyle çalışır
+- dizin boyutları (*_dir_bytes) janitor'un her turunda ölçülür, aradaki
+  işlerin input / output byte'ları artımlı eklenir (/status dizin taramaz)
+- event loop'tan yapılan yazmalar defer() ile tek bir yazıcı thread'ine
+  bırakılır (sıra korunur, dosya stat'ları da orada yapılır)
+"""
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from config import config
+from utils.logger import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id        TEXT PRIMARY KEY,
+    job_type      TEXT NOT NULL,
+    user_id       INTEGER,
+    input_name    TEXT,
+    input_bytes   INTEGER NOT NULL DEFAULT 0,
+    started_at    REAL NOT NULL,
+    finished_at   REAL,
+    success       INTEGER NOT NULL DEFAULT 0,
+    total_rows    INTEGER NOT NULL DEFAULT 0,
+    matched_rows  INTEGER NOT NULL DEFAULT 0,
+    group_count   INTEGER NOT NULL DEFAULT 0,
+    output_bytes  INTEGER NOT NULL DEFAULT 0,
+    emails_sent   INTEGER NOT NULL DEFAULT 0,
+    emails_failed INTEGER NOT NULL DEFAULT 0,
+    error         TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished_at ON jobs(finished_at);
+
+CREATE TABLE IF NOT EXISTS job_files (
+    job_id     TEXT NOT NULL,
+    group_id   TEXT,
+    filename   TEXT NOT NULL,
+    path       TEXT NOT NULL,
+    row_count  INTEGER NOT NULL DEFAULT 0,
+    size_bytes INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_job_files_created_at ON job_files(created_at);
+CREATE INDEX IF NOT EXISTS idx_job_files_job_id ON job_files(job_id);
+
+CREATE TABLE IF NOT EXISTS job_stages (
+    job_id     TEXT NOT NULL,
+    job_type   TEXT NOT NULL,
+    stage      TEXT NOT NULL,
+    wall_ms    REAL NOT NULL,
+    cpu_ms     REAL NOT NULL,
+    rows       INTEGER NOT NULL DEFAULT 0,
+    bytes      INTEGER NOT NULL DEFAULT 0,
+    rss_mb     REAL NOT NULL DEFAULT 0,  -- aşama boyunca örneklenen tepe RSS (MB)
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_job_stages_created_at ON job_stages(created_at);
+
+CREATE TABLE IF NOT EXISTS totals (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS smtp_usage (
+    day     TEXT NOT NULL,
+    account TEXT NOT NULL,
+    sent    INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, account)
+);
+"""
+
+TOTAL_KEYS = (
+    "total_processed",
+    "successful_processed",
+    "failed_processed",
+    "total_rows",
+    "emails_sent",
+    "emails_failed",
+    "output_bytes",
+    "input_dir_bytes",
+    "output_dir_bytes",
+    "logs_dir_bytes",
+)
+
+
+def new_job_id() -> str:
+    """Kısa, benzersiz iş kimliği üretir"""
+    return uuid.uuid4().hex[:12]
+
+
+class JobStore:
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writer: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Bağlantıyı ilk kullanımda açar"""
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            conn.executemany(
+                "INSERT OR IGNORE INTO totals(key, value) VALUES (?, 0)",
+                [(key,) for key in TOTAL_KEYS]
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def defer(self, method, *args):
+        """Yazmayı yazıcı thread'ine bırakır (çağıran beklemez, yazmalar sırayla yapılır)"""
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store")
+        self._writer.submit(method, *args)
+
+    def _add_totals(self, increments: Dict[str, int]):
+        self.conn.executemany(
+            "UPDATE totals SET value = value + ? WHERE key = ?",
+            [(value, key) for key, value in increments.items() if value]
+        )
+
+    def start_job(self, job_id: str, job_type: str, user_id: int, input_path: Path):
+        """İş başlangıcını kaydeder"""
+        try:
+            input_bytes = input_path.stat().st_size if input_path.exists() else 0
+            with self._lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO jobs(job_id, job_type, user_id, input_name, input_bytes, started_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, job_type, user_id, input_path.name, input_bytes, time.time())
+                )
+                self._add_totals({"input_dir_bytes": input_bytes})
+        except Exception as e:
+            logger.warning(f"İş kaydı başlatılamadı ({job_id}): {e}")
+
+    def finish_job(self, job_id: str, result: Dict[str, Any]):
+        """İş sonucunu (satır, grup, mail, byte) kaydeder ve toplamları günceller"""
+        try:
+            now = time.time()
+            success = bool(result.get("success", False))
+            output_files = result.get("output_files", {}) or {}
+            email_results = result.get("email_results", []) or []
+            emails_sent = sum(1 for res in email_results if res.get("success", False))
+            # Outbox'ta tekrar denenecekler başarısız sayılmaz
+            emails_failed = sum(1 for res in email_results if not res.get("success", False) and not res.get("queued", False))
+
+            file_rows = []
+            output_bytes = 0
+            for group_id, file_info in output_files.items():
+                path = Path(file_info["path"])
+                size = path.stat().st_size if path.exists() else 0
+                output_bytes += size
+                file_rows.append((
+                    job_id, group_id, file_info.get("filename", path.name), str(path),
+                    file_info.get("row_count", 0), size, now
+                ))
+
+            total_rows = result.get("total_rows", 0) if success else 0
+
+            with self._lock, self.conn:
+                self.conn.execute(
+                    "UPDATE jobs SET finished_at = ?, success = ?, total_rows = ?, matched_rows = ?, "
+                    "group_count = ?, output_bytes = ?, emails_sent = ?, emails_failed = ?, error = ? "
+                    "WHERE job_id = ?",
+                    (now, int(success), total_rows, result.get("matched_rows", 0),
+                     len(output_files), output_bytes, emails_sent, emails_failed,
+                     result.get("error"), job_id)
+                )
+                self.conn.executemany(
+                    "INSERT INTO job_files(job_id, group_id, filename, path, row_count, size_bytes, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    file_rows
+                )
+                self._add_totals({
+                    "total_processed": 1,
+                    "successful_processed": int(success),
+                    "failed_processed": int(not success),
+                    "total_rows": total_rows,
+                    "emails_sent": emails_sent,
+                    "emails_failed": emails_failed,
+                    "output_bytes": output_bytes,
+                    "output_dir_bytes": output_bytes,
+                })
+        except Exception as e:
+            logger.warning(f"İş kaydı tamamlanamadı ({job_id}): {e}")
+
+    def record_late_email(self, job_id: str, success: bool):
+        """İş raporlandıktan sonra sonuçlanan (outbox'ta tekrar denenen) maili sayar"""
+        column = "emails_sent" if success else "emails_failed"
+        try:
+            with self._lock, self.conn:
+                self.conn.execute(f"UPDATE jobs SET {column} = {column} + 1 WHERE job_id = ?", (job_id,))
+                self._add_totals({column: 1})
+        except Exception as e:
+            logger.warning(f"Mail sonucu kaydedilemedi ({job_id}): {e}")
+
+    def save_stages(self, job_id: str, job_type: str, stages: List[Dict[str, Any]]):
+        """Bir işin aşama ölçümlerini (utils/perf.py) kaydeder"""
+        try:
+            now = time.time()
+            with self._lock, self.conn:
+                self.conn.executemany(
+                    "INSERT INTO job_stages(job_id, job_type, stage, wall_ms, cpu_ms, rows, bytes, rss_mb, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (job_id, job_type, s["stage"], s["wall_ms"], s["cpu_ms"],
+                         s["rows"], s["bytes"], s["rss_mb"], now)
+                        for s in stages
+                    ]
+                )
+        except Exception as e:
+            logger.warning(f"Aşama ölçümleri kaydedilemedi ({job_id}): {e}")
+
+    def recent_stages(self, job_limit: int = 20) -> List[Dict[str, Any]]:
+        """Son `job_limit` işin aşama ölçümleri"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT * FROM job_stages WHERE job_id IN ("
+                "  SELECT job_id FROM job_stages GROUP BY job_id ORDER BY MAX(created_at) DESC LIMIT ?"
+                ") ORDER BY created_at", (job_limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_totals(self) -> Dict[str, int]:
+        """Artımlı tutulan toplamları döndürür"""
+        with self._lock:
+            rows = self.conn.execute("SELECT key, value FROM totals").fetchall()
+        return {row["key"]: row["value"] for row in rows}
+
+    def set_totals(self, values: Dict[str, int]):
+        """Ölçülen değerleri (ör. janitor'un dizin boyutları) toplamlara yazar"""
+        try:
+            with self._lock, self.conn:
+                self.conn.executemany(
+                    "UPDATE totals SET value = ? WHERE key = ?", [(value, key) for key, value in values.items()]
+                )
+        except Exception as e:
+            logger.warning(f"Toplamlar güncellenemedi: {e}")
+
+    def count_jobs_since(self, since: float) -> int:
+        """Verilen zamandan sonra biten iş sayısı (indeksli)"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE finished_at >= ?", (since,)
+            ).fetchone()
+        return row[0]
+
+    def last_finished_at(self) -> Optional[float]:
+        """Son biten işin zamanı"""
+        with self._lock:
+            row = self.conn.execute("SELECT MAX(finished_at) FROM jobs").fetchone()
+        return row[0]
+
+    def add_smtp_usage(self, day: str, account: str):
+        """SMTP hesabının günlük gönderim sayacını artırır (utils/smtp_pool.py)"""
+        try:
+            with self._lock, self.conn:
+                self.conn.execute(
+                    "INSERT INTO smtp_usage(day, account, sent) VALUES (?, ?, 1) "
+                    "ON CONFLICT(day, account) DO UPDATE SET sent = sent + 1",
+                    (day, account)
+                )
+        except Exception as e:
+            logger.warning(f"SMTP kullanımı kaydedilemedi ({account}): {e}")
+
+    def smtp_usage(self, day: str) -> Dict[str, int]:
+        """Günün hesap bazlı (sunucu:kullanıcı) gönderim sayıları"""
+        with self._lock:
+            rows = self.conn.execute("SELECT account, sent FROM smtp_usage WHERE day = ?", (day,)).fetchall()
+        return {row["account"]: row["sent"] for row in rows}
+
+    def recent_files(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Son üretilen çıktı dosyaları"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT filename, path, size_bytes, row_count, created_at FROM job_files "
+                "ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Global job store instance
+job_store = JobStore(config.JOBS_DB)
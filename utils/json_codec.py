@@ -0,0 +1,56 @@
+# utils/json_codec.py
+"""
+JSON kodlayıcı (orjson kuruluysa onu, değilse stdlib json'u kullanır)
+
+    from utils.json_codec import loads, dumps, load_file, dump_file
+
+- loads(): str veya bytes kabul eder (webhook gövdesi doğrudan bytes olarak verilir)
+- dumps(): her iki backend'de de str döner; ensure_ascii=False ile aynı çıktı (UTF-8)
+- pretty=True: 2 boşluk girinti (groups.json dosyaları)
+- Hatalı girdide JSONDecodeError (ValueError alt sınıfı) fırlatır
+
+orjson opsiyoneldir (requirements.txt'te yorum satırı; pip install orjson ile
+kurulur); BACKEND hangisinin kullanıldığını gösterir.
+"""
+import json
+from pathlib import Path
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - opsiyonel bağımlılık
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+# orjson.JSONDecodeError, json.JSONDecodeError'ın alt sınıfıdır
+JSONDecodeError = json.JSONDecodeError
+
+
+if orjson is not None:
+    def loads(data: Union[str, bytes, bytearray]) -> Any:
+        return orjson.loads(data)
+
+    def dumps(obj: Any, pretty: bool = False) -> str:
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        return orjson.dumps(obj, option=option).decode("utf-8")
+else:
+    def loads(data: Union[str, bytes, bytearray]) -> Any:
+        return json.loads(data)
+
+    def dumps(obj: Any, pretty: bool = False) -> str:
+        if pretty:
+            return json.dumps(obj, ensure_ascii=False, indent=2)
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def load_file(path: Union[str, Path]) -> Any:
+    """JSON dosyasını okur (bytes olarak, decode backend'e bırakılır)"""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def dump_file(obj: Any, path: Union[str, Path], pretty: bool = True) -> None:
+    """JSON dosyası yazar (UTF-8)"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(dumps(obj, pretty=pretty))
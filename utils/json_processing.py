@@ -1,13 +1,13 @@
 # utils/json_processing.py
 # openpyxl ile
 import os
-import json
 import logging
 import aiofiles
 import asyncio
-from openpyxl import load_workbook
 from typing import Dict, List, Any
 
+from utils.json_codec import dumps
+
 logger = logging.getLogger(__name__)
 
 async def process_excel_to_json(excel_file_path: str) -> str:
@@ -23,6 +23,7 @@ async def process_excel_to_json(excel_file_path: str) -> str:
     try:
         # Excel dosyasını senkron olarak yükle (openpyxl async desteklemiyor)
         def load_excel_sync():
+            from openpyxl import load_workbook  # ağır import: ilk kullanımda yüklenir
             return load_workbook(excel_file_path, read_only=True)
         
         # Thread pool'da Excel yükleme
@@ -47,7 +48,7 @@ async def process_excel_to_json(excel_file_path: str) -> str:
         
         # JSON'ı asenkron olarak yaz
         async with aiofiles.open(json_file_path, 'w', encoding='utf-8') as f:
-            json_data = json.dumps({"groups": groups_data}, ensure_ascii=False, indent=2)
+            json_data = dumps({"groups": groups_data}, pretty=True)
             await f.write(json_data)
         
         logger.info(f"JSON dosyası başarıyla oluşturuldu: {json_file_path}")
@@ -0,0 +1,153 @@
+# utils/log_reader.py
+"""
+Log okuyucu - dosyanın tamamını belleğe almadan çalışır
+
+tail_lines   → dosya sonundan geriye doğru blok blok okuyup son N satırı verir
+search_logs  → bot.log ve döndürülmüş (rotated) kopyalarında seviye, zaman
+               aralığı, job id ve metne göre arar; en fazla `limit` sonuç döner
+count_lines  → satır sayısını sabit bellekle sayar
+
+Satır formatı utils/logger.py ile aynıdır:
+"YYYY-MM-DD HH:mm:ss | LEVEL | mesaj"
+"""
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+BLOCK_SIZE = 64 * 1024
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+LEVEL_ORDER = {
+    "TRACE": 5,
+    "DEBUG": 10,
+    "INFO": 20,
+    "SUCCESS": 25,
+    "WARNING": 30,
+    "ERROR": 40,
+    "CRITICAL": 50,
+}
+
+
+def _reverse_lines(path: Path, block_size: int = BLOCK_SIZE) -> Iterator[str]:
+    """Dosyanın satırlarını sondan başa doğru üretir (tek blok bellek)"""
+    with open(path, "rb") as f:
+        f.seek(0, 2)
+        position = f.tell()
+        remainder = b""
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size) + remainder
+            lines = block.split(b"\n")
+            # İlk parça bir önceki bloğun devamı olabilir
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line.decode("utf-8", errors="replace").rstrip("\r")
+        if remainder:
+            yield remainder.decode("utf-8", errors="replace").rstrip("\r")
+
+
+def tail_lines(path: Path, n: int = 20) -> List[str]:
+    """Dosyanın son n satırını döndürür"""
+    if not path.exists():
+        return []
+
+    lines = []
+    for line in _reverse_lines(path):
+        lines.append(line)
+        if len(lines) >= n:
+            break
+    lines.reverse()
+    return lines
+
+
+def count_lines(path: Path) -> int:
+    """Satır sayısını bloklar halinde sayar"""
+    if not path.exists():
+        return 0
+
+    count = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            count += block.count(b"\n")
+    return count
+
+
+def log_files(base_name: str = "bot.log", logs_dir: Optional[Path] = None) -> List[Path]:
+    """Aktif log ve döndürülmüş kopyaları (yeniden eskiye) döndürür"""
+    if logs_dir is None:
+        from config import config
+        logs_dir = config.LOGS_DIR
+
+    stem, suffix = Path(base_name).stem, Path(base_name).suffix
+    rotated = sorted(
+        logs_dir.glob(f"{stem}.*{suffix}"),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True
+    )
+    current = logs_dir / base_name
+    return ([current] if current.exists() else []) + rotated
+
+
+def parse_line(line: str):
+    """Satırı (zaman, seviye, mesaj) olarak ayırır; format dışıysa None"""
+    parts = line.split(" | ", 2)
+    if len(parts) != 3:
+        return None
+    try:
+        timestamp = datetime.strptime(parts[0], TIME_FORMAT)
+    except ValueError:
+        return None
+    return timestamp, parts[1].strip(), parts[2]
+
+
+def search_logs(
+    base_name: str = "bot.log",
+    level: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    job_id: Optional[str] = None,
+    text: Optional[str] = None,
+    limit: int = 50,
+    logs_dir: Optional[Path] = None,
+) -> List[str]:
+    """
+    Logları yeniden eskiye tarar, filtrelere uyan en yeni `limit` satırı döndürür.
+    level minimum seviyedir (ERROR → ERROR ve CRITICAL).
+    """
+    min_level = LEVEL_ORDER.get(level.upper(), 0) if level else 0
+    text = text.lower() if text else None
+    matches = []
+
+    for path in log_files(base_name, logs_dir):
+        for line in _reverse_lines(path):
+            parsed = parse_line(line)
+            if parsed is None:
+                continue
+            timestamp, line_level, message = parsed
+
+            if since and timestamp < since:
+                # Satırlar kronolojik; daha eskisine bakmaya gerek yok
+                matches.reverse()
+                return matches
+            if until and timestamp > until:
+                continue
+            if min_level and LEVEL_ORDER.get(line_level, 0) < min_level:
+                continue
+            if job_id and job_id not in message:
+                continue
+            if text and text not in message.lower():
+                continue
+
+            matches.append(line)
+            if len(matches) >= limit:
+                matches.reverse()
+                return matches
+
+    matches.reverse()
+    return matches
@@ -0,0 +1,104 @@
+# utils/log_sink.py
+"""
+Arka plan yazıcılı, toplu (batch) flush yapan log dosyası sink'i
+
+Loguru'nun kendi dosya sink'i her mesajı çağıran thread'de yazar (buffering=1),
+enqueue=True ise her kaydı multiprocessing kuyruğuna pickle eder.
+Bu sink ise:
+- write() → mesajı sadece queue.SimpleQueue'ya koyar (pickle yok, I/O yok)
+- yazıcı thread kuyruğu boşaltır, tek write + tek flush ile diske yazar
+- boyut bazlı rotation ve gün bazlı retention uygular
+  (dosya adları loguru ile aynı: bot.2024-01-31_12-00-00_000000.log)
+"""
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+_STOP = object()
+
+
+class BatchingFileSink:
+    def __init__(
+        self,
+        path: Path,
+        rotation_bytes: int = 10 * 1024 * 1024,
+        retention_days: int = 10,
+        flush_interval: float = 0.5,
+        batch_size: int = 512,
+    ):
+        self.path = Path(path)
+        self.rotation_bytes = rotation_bytes
+        self.retention_days = retention_days
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._queue = queue.SimpleQueue()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1024 * 1024)
+        self._thread = threading.Thread(target=self._run, name=f"log-writer-{self.path.stem}", daemon=True)
+        self._thread.start()
+
+    def write(self, message):
+        """Loguru tarafından çağrılır - sadece kuyruğa ekler"""
+        self._queue.put(str(message))
+
+    def stop(self):
+        """Kuyrukta kalanları yazar ve dosyayı kapatır (logger.remove çağırır)"""
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._file.close()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        try:
+            self._file.write("".join(batch))
+            self._file.flush()
+            if self._file.tell() >= self.rotation_bytes:
+                self._rotate()
+        except Exception as e:
+            # Log yazılamıyorsa uygulamayı durdurma
+            print(f"Log yazma hatası ({self.path.name}): {e}")
+
+    def _rotate(self):
+        self._file.close()
+        try:
+            stamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S_%f")
+            self.path.rename(self.path.with_name(f"{self.path.stem}.{stamp}{self.path.suffix}"))
+        finally:
+            # Yeniden adlandırma başarısız olsa da sink kapalı kalmaz (aynı dosyaya devam edilir)
+            self._file = open(self.path, "a", encoding="utf-8", buffering=1024 * 1024)
+        self._apply_retention()
+
+    def _apply_retention(self):
+        limit = time.time() - self.retention_days * 24 * 3600
+        for rotated in self.path.parent.glob(f"{self.path.stem}.*{self.path.suffix}"):
+            try:
+                if rotated.stat().st_mtime < limit:
+                    rotated.unlink()
+            except OSError:
+                continue
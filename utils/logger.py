@@ -1,45 +1,108 @@
 #Logger Kurulumu (utils/logger.py)
+import inspect
 import logging
+import time
 from loguru import logger
 from pathlib import Path
 from config import config
+from utils.log_sink import BatchingFileSink
+
+LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}"
+
+# stdlib seviye adı -> loguru seviye adı/numarası (her kayıtta logger.level() çağrılmasın)
+_level_cache = {}
 
 class InterceptHandler(logging.Handler):
     def emit(self, record):
         # Get corresponding Loguru level if it exists
-        try:
-            level = logger.level(record.levelname).name
-        except ValueError:
-            level = record.levelno
+        level = _level_cache.get(record.levelname)
+        if level is None:
+            try:
+                level = logger.level(record.levelname).name
+            except ValueError:
+                level = record.levelno
+            _level_cache[record.levelname] = level
         
-        # Find caller from where originated the logged message
-        frame, depth = logging.currentframe(), 2
-        while frame.f_code.co_filename == logging.__file__:
+        # logging modülünün frame'leri atlanır: konum, stdlib logger'ı çağıran koddur
+        frame, depth = inspect.currentframe(), 0
+        while frame is not None and (depth == 0 or frame.f_code.co_filename == logging.__file__):
             frame = frame.f_back
             depth += 1
-        
-        logger.opt(depth=depth, exception=record.exc_info).log(
-            level, record.getMessage()
-        )
+
+        logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
+
+
+class ProgressLogger:
+    """
+    Sıcak döngüler için yapılandırılmış (bind edilmiş) logger.
+    progress() en fazla `interval` saniyede bir satır yazar; mesaj loguru'nun
+    {} argümanlarıyla yalnızca yazılacaksa biçimlenir.
+    """
+    __slots__ = ("_logger", "_interval", "_next_at")
+
+    def __init__(self, stage: str, interval: float = 5.0, **fields):
+        self._logger = logger.bind(stage=stage, **fields)
+        self._interval = interval
+        self._next_at = 0.0
+
+    def progress(self, message: str, *args):
+        now = time.monotonic()
+        if now < self._next_at:
+            return
+        self._next_at = now + self._interval
+        self._logger.info(message, *args)
+
+    def debug(self, message: str, *args):
+        self._logger.debug(message, *args)
+
 
 def setup_logger():
-    logging.basicConfig(handlers=[InterceptHandler()], level=logging.INFO)
+    # force: config.py import sırasında root logger'a eklenen varsayılan handler'ı değiştir
+    logging.basicConfig(handlers=[InterceptHandler()], level=logging.INFO, force=True)
     
     # Loguru yapılandırması
-    logger.add(
-        config.LOGS_DIR / "bot.log",
-        rotation="10 MB",
-        retention="10 days",
-        level="INFO",
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}"
-    )
-    
-    logger.add(
-        config.LOGS_DIR / "errors.log",
-        rotation="10 MB",
-        retention="30 days",
-        level="ERROR",
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}"
-    )
+    if config.LOG_ASYNC:
+        # Arka plan yazıcı: dosya I/O işleme thread'inden çıkarılır
+        logger.add(
+            BatchingFileSink(
+                config.LOGS_DIR / "bot.log",
+                retention_days=10,
+                flush_interval=config.LOG_FLUSH_INTERVAL,
+                batch_size=config.LOG_BATCH_SIZE,
+            ),
+            level="INFO",
+            format=LOG_FORMAT
+        )
+        logger.add(
+            BatchingFileSink(
+                config.LOGS_DIR / "errors.log",
+                retention_days=30,
+                flush_interval=config.LOG_FLUSH_INTERVAL,
+                batch_size=config.LOG_BATCH_SIZE,
+            ),
+            level="ERROR",
+            format=LOG_FORMAT
+        )
+    else:
+        logger.add(
+            config.LOGS_DIR / "bot.log",
+            rotation="10 MB",
+            retention="10 days",
+            level="INFO",
+            format=LOG_FORMAT
+        )
+        
+        logger.add(
+            config.LOGS_DIR / "errors.log",
+            rotation="10 MB",
+            retention="30 days",
+            level="ERROR",
+            format=LOG_FORMAT
+        )
     
     logger.info("Logger başlatıldı")
+
+
+def shutdown_logger():
+    """Kuyruktaki logları diske yazıp sink'leri kapatır"""
+    logger.remove()
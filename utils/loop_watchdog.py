@@ -0,0 +1,142 @@
+# utils/loop_watchdog.py
+"""
+Event loop bekçisi (watchdog)
+
+- Loop içinde çalışan heartbeat görevi her `interval` saniyede zaman damgası
+  bırakır ve gecikmeyi (lag) metriğe yazar. Heartbeat her zaman çalışır
+  (kova_event_loop_lag_seconds); LOOP_WATCHDOG=False yalnızca izleyiciyi kapatır.
+- Ayrı bir daemon thread heartbeat'i izler; `threshold` saniyeden uzun süre
+  gelmezse loop thread'inin o anki stack'ini sys._current_frames() ile alır,
+  engelleyen handler'ı ve projedeki en içteki fonksiyonu loglar.
+- Engelleyen konumlar sayılır: /blockers komutu ve
+  kova_event_loop_blocked_total metriği loop dışına taşınacak çağrıların listesini verir.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import config
+from utils.logger import logger
+from utils.metrics import registry, Counter as MetricCounter, EVENT_LOOP_LAG
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+LOOP_BLOCKED = registry.register(MetricCounter(
+    "kova_event_loop_blocked_total", "Eşiği aşan loop blokajları", ("location",)))
+
+
+def _project_frames(frame) -> List[traceback.FrameSummary]:
+    """Stack'teki proje dosyalarına ait frame'ler (dıştan içe)"""
+    frames = []
+    for summary in traceback.extract_stack(frame):
+        path = Path(summary.filename)
+        if PROJECT_ROOT in path.parents and "site-packages" not in path.parts:
+            frames.append(summary)
+    return frames
+
+
+def _location(summary: traceback.FrameSummary) -> str:
+    relative = Path(summary.filename).relative_to(PROJECT_ROOT).as_posix()
+    return f"{relative}:{summary.name}"
+
+
+class LoopWatchdog:
+    def __init__(self, threshold: float = 0.5, interval: float = 0.1):
+        self.threshold = threshold
+        self.interval = interval
+        self.blockers: Counter = Counter()
+        self.max_stall: Dict[str, float] = {}
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, watch: bool = True):
+        """
+        Loop içinden çağrılır: heartbeat görevini (lag metriği) başlatır;
+        watch=True ise blokajları yakalayan izleyici thread'i de başlatır.
+        """
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        if not watch:
+            return
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"🐕 Loop watchdog başlatıldı (eşik: {self.threshold}s)")
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.set(max(0.0, loop.time() - started - self.interval))
+
+    def _watch(self):
+        reported_beat = None
+        stall_location = None
+        while not self._stop.wait(self.interval):
+            last_beat = self._last_beat
+            stalled = time.monotonic() - last_beat
+
+            if stalled < self.threshold:
+                continue
+            if reported_beat == last_beat:
+                # Aynı blokaj devam ediyor: sadece en uzun süreyi güncelle
+                if stall_location:
+                    self.max_stall[stall_location] = max(self.max_stall.get(stall_location, 0), stalled)
+                continue
+
+            reported_beat = last_beat
+            stall_location = self._report(stalled)
+
+    def _report(self, stalled: float) -> Optional[str]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return None
+
+        project_frames = _project_frames(frame)
+        if project_frames:
+            handler = next(
+                (f for f in project_frames if Path(f.filename).parent.name == "handlers"),
+                project_frames[0]
+            )
+            location = _location(project_frames[-1])
+            origin = _location(handler)
+        else:
+            # Proje dışı (kütüphane) kod: en içteki frame
+            innermost = traceback.extract_stack(frame)[-1]
+            location = origin = f"{Path(innermost.filename).name}:{innermost.name}"
+
+        self.blockers[location] += 1
+        self.max_stall[location] = max(self.max_stall.get(location, 0), stalled)
+        LOOP_BLOCKED.inc(location=location)
+
+        stack = "".join(traceback.format_stack(frame)[-12:])
+        logger.warning(
+            f"🐢 Event loop {stalled:.2f}s bloke: {location} (kaynak: {origin})\n{stack}"
+        )
+        return location
+
+    def top_blockers(self, limit: int = 10) -> List[Dict]:
+        """En sık engelleyen konumlar"""
+        return [
+            {"location": location, "count": count, "max_stall": self.max_stall.get(location, 0)}
+            for location, count in self.blockers.most_common(limit)
+        ]
+
+
+# Global watchdog instance
+loop_watchdog = LoopWatchdog(threshold=config.LOOP_LAG_THRESHOLD)
@@ -9,111 +9,293 @@ Yandex Mail (smtp.yandex.com)
 Outlook/Hotmail (smtp-mail.outlook.com)
 ojmkrjzsxcxrpzuh
 """
-import aiosmtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
 from pathlib import Path
+from typing import Optional
 from config import config
 from utils.logger import logger
+from utils.attachment_plan import AttachmentPlan, hold_parts, plan_attachment, release_parts
+from utils.download_links import download_links
+from utils.mime_stream import StreamingMessage, send_streaming
+from utils.perf import timed
+from utils.metrics import SMTP_SEND_DURATION, SMTP_FAILURES, SMTP_RETRIES, SMTP_ACCOUNT_SENT
+from utils.smtp_health import smtp_health
+from utils.smtp_pool import smtp_pool, SMTPAccount
+import asyncio
+import socket
 import ssl
+import time
 
-async def send_email_with_attachment(
-    to_emails: list,
-    subject: str,
-    body: str,
-    attachment_path: Path,
-    max_retries: int = 2
-) -> bool:
-    """E-posta gönderir (ekli dosya ile) - DETAYLI LOGLAMALI"""
-    if not to_emails or not any(to_emails):
-        logger.warning("Alıcı email adresi yok")
-        return False
+_send_slots = None  # (limit, asyncio.Semaphore)
+
+# 5xx yanıtlarından login / TLS sorunu olanlar (uç noktaya yazılır, mesaja değil)
+AUTH_REPLY_CODES = {530, 534, 535, 538}
+
+
+class PermanentSMTPError(Exception):
+    """Sunucu mesajı veya alıcıyı kalıcı olarak reddetti (5xx): başka port / hesapta da denenmez"""
+
+    def __init__(self, message: str, parts_sent: int = 0):
+        super().__init__(message)
+        self.parts_sent = parts_sent  # bölünmüş ekte reddedilen parçadan önce gönderilenler
+
+
+def classify_error(error: Exception) -> str:
+    """
+    Gönderim hatasının türü:
+        endpoint   bağlantı, zaman aşımı, TLS, login: devre kesiciye yazılır, tekrar denenir
+        permanent  mesaj / alıcı / gönderen kalıcı reddedildi (5xx, ör. 550, 552): tekrar denenmez
+        transient  mesaj geçici reddedildi (4xx) veya yerel hata: tekrar denenir, devreye yazılmaz
+    """
+    import aiosmtplib
+
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        codes = [refused.code for refused in error.recipients]
+        return "permanent" if codes and all(500 <= code < 600 for code in codes) else "transient"
+    if isinstance(error, (aiosmtplib.SMTPAuthenticationError, aiosmtplib.SMTPHeloError)):
+        return "endpoint"
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        if error.code == 421 or error.code in AUTH_REPLY_CODES:
+            return "endpoint"  # servis kapanıyor / login gerekli
+        return "permanent" if 500 <= error.code < 600 else "transient"
+    if isinstance(error, (aiosmtplib.SMTPException, ConnectionError, TimeoutError, asyncio.TimeoutError,
+                          ssl.SSLError, socket.gaierror)):
+        return "endpoint"
+    return "transient"
+
+
+def _slots():
+    """SMTP_CONCURRENCY > 0 ise aynı anda açık oturum sayısını sınırlayan semafor"""
+    global _send_slots
+    limit = config.SMTP_CONCURRENCY
+    if limit <= 0:
+        return None
+    if _send_slots is None or _send_slots[0] != limit:
+        _send_slots = (limit, asyncio.Semaphore(limit))
+    return _send_slots[1]
+
+
+def create_ssl_context() -> ssl.SSLContext:
+    """SMTP_CA_FILE verilmişse (ör. yerel test sunucusunun sertifikası) onu kullanır"""
+    return ssl.create_default_context(cafile=config.SMTP_CA_FILE or None)
+
+
+def build_message(to_emails: list, subject: str, body: str, attachment_path: Optional[Path]) -> StreamingMessage:
+    """Ekli dosyalı MIME mesajını oluşturur (ek gönderim sırasında parça parça okunur)"""
+    if attachment_path is not None:
+        file_size = attachment_path.stat().st_size / 1024  # KB
+        logger.debug("📎 Eklenecek dosya: {} ({:.1f} KB)", attachment_path.name, file_size)
+    return StreamingMessage(to_emails, subject, body, attachment_path, sender=config.SMTP_USERNAME)
+
+
+def smtp_security(port: int, mode: str = None) -> str:
+    """Port için bağlantı güvenliği: "tls", "starttls" veya "none" """
+    mode = mode or config.SMTP_SECURITY
+    if mode == "auto":
+        # 465 için SSL, diğerleri için STARTTLS
+        return "tls" if port == 465 else "starttls"
+    return mode
+
+
+async def deliver_message(message: StreamingMessage, port: int, ssl_context: ssl.SSLContext = None,
+                          account: SMTPAccount = None) -> None:
+    """Mesajı tek bir porttan gönderir (bağlan, güvenliği kur, login, gönder)"""
+    import aiosmtplib  # ağır import: ilk mailde yüklenir
     
-    # SSL context oluştur
-    ssl_context = ssl.create_default_context()
+    account = account or smtp_pool.accounts()[0]
+    security = smtp_security(port, account.security)
+    if ssl_context is None and security != "none":
+        ssl_context = create_ssl_context()
     
-    successful = False
+    logger.debug("🔌 SMTP bağlantısı: {}:{} ({}, {})", account.server, port, security, account.name)
     
-    for port in config.SMTP_PORTS:
+    # start_tls açıkça verilir: None bırakılırsa aiosmtplib sunucu destekliyorsa
+    # kendisi yükseltir ve ardından gelen starttls() çağrısı hata verir
+    async with aiosmtplib.SMTP(
+        hostname=account.server,
+        port=port,
+        use_tls=security == "tls",
+        start_tls=security == "starttls",
+        tls_context=ssl_context
+    ) as server:
+        if account.username:
+            await server.login(account.username, account.password)
+        await send_streaming(server, message)
+
+
+async def _send_with_account(
+    account: SMTPAccount,
+    message: StreamingMessage,
+    to_emails: list,
+    ssl_context: ssl.SSLContext,
+    max_retries: int
+) -> bool:
+    """Mesajı tek bir hesabın portlarından göndermeyi dener"""
+    # Portlar sağlık durumuna göre sıralanır; devresi açık olanlar atlanır
+    ports = smtp_health.plan(account.health_key, account.ports)
+    if account.username:
+        message.sender = account.username
+    
+    for port in ports:
         for attempt in range(max_retries + 1):
+            # Deneme sırasında devre açıldıysa beklemeden sonraki porta geç
+            if not smtp_health.allow(account.health_key, port):
+                logger.warning(f"⛔ Port {port} devresi açık ({account.name}), sonraki porta geçiliyor")
+                break
+            attempt_started = time.perf_counter()
             try:
-                logger.info(f"📧 Mail gönderimi deneniyor: {to_emails}, Port: {port}, Deneme: {attempt + 1}")
-                
-                message = MIMEMultipart()
-                message["From"] = config.SMTP_USERNAME
-                message["To"] = ", ".join(to_emails)
-                message["Subject"] = subject
-                
-                # Mesaj gövdesi
-                message.attach(MIMEText(body, "plain", "utf-8"))
+                logger.debug("📧 Mail gönderimi deneniyor: {}, Hesap: {}, Port: {}, Deneme: {}",
+                             to_emails, account.name, port, attempt + 1)
                 
-                # Dosya eki
-                if attachment_path.exists():
-                    file_size = attachment_path.stat().st_size / 1024  # KB
-                    logger.info(f"📎 Eklenecek dosya: {attachment_path.name} ({file_size:.1f} KB)")
-                    
-                    with open(attachment_path, "rb") as f:
-                        attachment = MIMEApplication(f.read(), _subtype="xlsx")
-                        attachment.add_header(
-                            "Content-Disposition",
-                            "attachment",
-                            filename=attachment_path.name
-                        )
-                        message.attach(attachment)
+                slots = _slots()
+                if slots is None:
+                    await deliver_message(message, port, ssl_context, account)
                 else:
-                    logger.warning(f"❌ Eklenecek dosya bulunamadı: {attachment_path}")
-                    return False
-                
-                # PORT'A GÖRE BAĞLANTI AYARLARI
-                use_tls = port == 465  # 465 için SSL, 587 için STARTTLS
-                
-                logger.info(f"🔌 SMTP bağlantısı: {config.SMTP_SERVER}:{port} (TLS: {use_tls})")
+                    async with slots:
+                        await deliver_message(message, port, ssl_context, account)
                 
-                if port == 465:
-                    # SSL bağlantısı
-                    async with aiosmtplib.SMTP(
-                        hostname=config.SMTP_SERVER,
-                        port=port,
-                        use_tls=True,
-                        tls_context=ssl_context
-                    ) as server:
-                        await server.login(config.SMTP_USERNAME, config.SMTP_PASSWORD)
-                        await server.send_message(message)
-                
-                else:  # port 587
-                    # STARTTLS bağlantısı
-                    async with aiosmtplib.SMTP(
-                        hostname=config.SMTP_SERVER,
-                        port=port,
-                        use_tls=False
-                    ) as server:
-                        await server.starttls(tls_context=ssl_context)
-                        await server.login(config.SMTP_USERNAME, config.SMTP_PASSWORD)
-                        await server.send_message(message)
-                
-                logger.info(f"✅ Mail BAŞARIYLA gönderildi: {to_emails}")
-                successful = True
-                break  # Başarılı oldu, diğer portları deneme
+                elapsed = time.perf_counter() - attempt_started
+                SMTP_SEND_DURATION.observe(elapsed, port=port)
+                SMTP_ACCOUNT_SENT.inc(account=account.name)
+                smtp_health.record_success(account.health_key, port, elapsed)
+                logger.info(f"✅ Mail BAŞARIYLA gönderildi: {to_emails} ({account.name})")
+                return True
                 
             except Exception as e:
+                SMTP_FAILURES.inc(port=port)
                 error_msg = str(e)
-                logger.error(f"❌ Mail gönderme hatası (Port: {port}, Deneme: {attempt + 1}): {error_msg}")
+                logger.error(f"❌ Mail gönderme hatası ({account.name}, Port: {port}, Deneme: {attempt + 1}): {error_msg}")
+                
+                # Devre kesiciye sadece uç noktanın hatası yazılır: hatalı bir alıcı
+                # adresi veya büyük bir mesaj sağlıklı portun devresini açmaz
+                kind = classify_error(e)
+                if kind == "endpoint":
+                    smtp_health.record_failure(account.health_key, port, error_msg)
+                else:
+                    smtp_health.record_rejection(account.health_key, port)
+                if kind == "permanent":
+                    # Aynı mesaj diğer portlarda / hesaplarda da reddedilir
+                    raise PermanentSMTPError(error_msg) from e
                 
                 # Son denemede logla
                 if attempt == max_retries:
                     logger.error(f"❌ Port {port} için tüm denemeler başarısız")
                 
+                # Devre açıldıysa beklemeden sonraki porta geç
+                if smtp_health.is_open(account.health_key, port):
+                    break
+                
                 # Bekle ve tekrar dene
                 if attempt < max_retries:
                     wait_time = 2 ** attempt
-                    import asyncio
+                    SMTP_RETRIES.inc(port=port)
                     await asyncio.sleep(wait_time)
-        
-        if successful:
-            break  # Başarılı oldu, diğer portları deneme
     
-    if not successful:
+    return False
+
+
+@timed("mail", path_arg=3)
+async def _send_file(
+    to_emails: list,
+    subject: str,
+    body: str,
+    attachment_path: Optional[Path],
+    max_retries: int
+) -> bool:
+    """Tek mesajı hesap havuzu üzerinden gönderir (ek boyutu planlanmış olmalı, None = eksiz); kalıcı retde PermanentSMTPError"""
+    # SSL context oluştur
+    ssl_context = create_ssl_context()
+    
+    # Mesaj bir kez oluşturulur, tüm denemelerde aynı nesne kullanılır
+    message = build_message(to_emails, subject, body, attachment_path)
+    
+    # Hesaplar ağırlık ve kalan kotaya göre seçilir; başarısız hesaptan sonrakine geçilir
+    tried = set()
+    successful = False
+    while not successful:
+        account = smtp_pool.acquire(exclude=tried)
+        if account is None:
+            break
+        tried.add(account.name)
+        try:
+            successful = await _send_with_account(account, message, to_emails, ssl_context, max_retries)
+        finally:
+            smtp_pool.release(account, successful)
+        if not successful:
+            logger.warning(f"↪️ SMTP hesabı başarısız: {account.name}, varsa sonraki hesaba geçiliyor")
+    
+    if not tried:
+        logger.warning(f"⛔ Uygun SMTP hesabı yok (kota / devre kesici), mail gönderilmedi: {to_emails}")
+    elif not successful:
         logger.error(f"❌❌❌ TÜM MAIL GÖNDERME DENEMELERİ BAŞARISIZ: {to_emails}")
     
-    return successful
\ No newline at end of file
+    return successful
+
+
+async def send_attachment_parts(
+    to_emails: list,
+    subject: str,
+    body: str,
+    plan: AttachmentPlan,
+    start: int = 0,
+    max_retries: int = 2
+) -> int:
+    """
+    Planın parçalarını start'tan itibaren sırayla gönderir; gönderilmiş parça sayısını döner.
+    Kalıcı retde PermanentSMTPError yükseltilir (parts_sent o ana kadar gidenler).
+    """
+    count = len(plan.parts)
+    for index in range(start, count):
+        part_subject = f"{subject} ({index + 1}/{count})" if plan.split else subject
+        try:
+            sent = await _send_file(to_emails, part_subject, body + plan.note(index + 1), plan.parts[index], max_retries)
+        except PermanentSMTPError as e:
+            e.parts_sent = index
+            raise
+        if not sent:
+            return index
+    return count
+
+
+async def send_link_email(
+    to_emails: list,
+    subject: str,
+    body: str,
+    attachment_path: Path,
+    max_retries: int = 2
+) -> bool:
+    """Ek yerine imzalı, süreli indirme linki içeren mail gönderir (süre dosya boyutundan bağımsız)"""
+    url, expires = download_links.sign(attachment_path)
+    body += download_links.note(attachment_path, url, expires)
+    return await _send_file(to_emails, subject, body, None, max_retries)
+
+
+async def send_email_with_attachment(
+    to_emails: list,
+    subject: str,
+    body: str,
+    attachment_path: Path,
+    max_retries: int = 2
+) -> bool:
+    """E-posta gönderir (ekli dosya ile) - sınırı aşan ek ZIP'lenir veya parçalara bölünür"""
+    if not to_emails or not any(to_emails):
+        logger.warning("Alıcı email adresi yok")
+        return False
+    
+    if not attachment_path.exists():
+        logger.warning(f"❌ Eklenecek dosya bulunamadı: {attachment_path}")
+        return False
+    
+    try:
+        if download_links.should_link(attachment_path):
+            return await send_link_email(to_emails, subject, body, attachment_path, max_retries)
+        
+        # Boyut gönderimden önce ölçülür: sınırı aşan mesaj her denemede reddedilmez
+        hold_parts(attachment_path)
+        try:
+            plan = await asyncio.to_thread(plan_attachment, attachment_path)
+            return await send_attachment_parts(to_emails, subject, body, plan, max_retries=max_retries) == len(plan.parts)
+        finally:
+            release_parts(attachment_path)
+    except PermanentSMTPError as e:
+        logger.error(f"❌ Mail kalıcı olarak reddedildi, tekrar denenmeyecek: {to_emails}: {e}")
+        return False
@@ -0,0 +1,207 @@
+# utils/metrics.py
+"""
+Prometheus metin formatında metrikler (harici kütüphane yok)
+
+Counter / Gauge / Histogram süreç içi bir registry'de tutulur,
+health sunucusunun /metrics endpoint'i registry.render() çıktısını döner.
+Tüm sınıflar thread-safe (aşamalar thread'lerde de ölçülür).
+"""
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+LabelKey = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelKey, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def total(self) -> float:
+        """Tüm etiketlerin toplamı"""
+        with self._lock:
+            return sum(self._values.values())
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def __init__(self, *args, callback: Optional[Callable[[], float]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelKey, float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self) -> List[str]:
+        if self._callback is not None:
+            self.set(self._callback())
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, *args, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # label -> [bucket sayıları..., toplam, adet]
+        self._values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[index] += 1
+                    break
+            data[-2] += value
+            data[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(data)) for key, data in self._values.items()]
+        lines = self.header()
+        for key, data in items:
+            cumulative = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += data[index]
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, inf)} {data[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {data[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {data[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def _rss_bytes() -> int:
+    import psutil  # /metrics ilk istendiğinde yüklenir
+    return psutil.Process().memory_info().rss
+
+
+JOBS_PROCESSED = registry.register(Counter(
+    "kova_jobs_processed_total", "Tamamlanan işler", ("type", "status")))
+ROWS_SPLIT = registry.register(Counter(
+    "kova_rows_split_total", "Gruplara ayrılan toplam satır"))
+SPLIT_ROWS_PER_SECOND = registry.register(Gauge(
+    "kova_split_rows_per_second", "Son ayırma aşamasının satır/sn hızı"))
+STAGE_DURATION = registry.register(Histogram(
+    "kova_stage_duration_seconds", "İş aşaması süresi", ("stage",)))
+SMTP_SEND_DURATION = registry.register(Histogram(
+    "kova_smtp_send_duration_seconds", "Başarılı SMTP gönderim süresi", ("port",)))
+SMTP_FAILURES = registry.register(Counter(
+    "kova_smtp_failures_total", "Başarısız SMTP denemeleri", ("port",)))
+SMTP_RETRIES = registry.register(Counter(
+    "kova_smtp_retries_total", "Beklemeden sonra tekrarlanan SMTP denemeleri", ("port",)))
+SMTP_ACCOUNT_SENT = registry.register(Counter(
+    "kova_smtp_account_sent_total", "SMTP hesabı bazında gönderilen mailler", ("account",)))
+SMTP_BREAKER_STATE = registry.register(Gauge(
+    "kova_smtp_breaker_state", "SMTP devre kesici durumu (0 closed, 1 half_open, 2 open)", ("endpoint",)))
+QUEUE_DEPTH = registry.register(Gauge(
+    "kova_queue_depth", "Kuyrukta / işlemde bekleyen öğe sayısı", ("queue",)))
+WEBHOOK_UPDATES = registry.register(Counter(
+    "kova_webhook_updates_total", "Webhook'a gelen update'ler (queued/duplicate/full)", ("result",)))
+WEBHOOK_QUEUE_WAIT = registry.register(Histogram(
+    "kova_webhook_queue_wait_seconds", "Update'in kuyrukta işlenmeyi bekleme süresi"))
+OUTBOX_ATTEMPTS = registry.register(Counter(
+    "kova_outbox_attempts_total", "Outbox teslimat denemeleri (sent/retry/failed)", ("result",)))
+MAIL_ATTACHMENT_PLANS = registry.register(Counter(
+    "kova_mail_attachment_plans_total", "Boyut sınırını aşan ekler için seçilen yöntem (zip/rows/volumes)", ("mode",)))
+DOWNLOADS = registry.register(Counter(
+    "kova_downloads_total", "İndirme linki istekleri (ok/range/forbidden/expired/missing)", ("result",)))
+JANITOR_DELETED_FILES = registry.register(Counter(
+    "kova_janitor_deleted_files_total", "Janitor'un sildiği dosyalar", ("policy",)))
+JANITOR_DELETED_BYTES = registry.register(Counter(
+    "kova_janitor_deleted_bytes_total", "Janitor'un boşalttığı byte", ("policy",)))
+EVENT_LOOP_LAG = registry.register(Gauge(
+    "kova_event_loop_lag_seconds", "Event loop gecikmesi (son ölçüm, LOOP_WATCHDOG'dan bağımsız)"))
+RSS_BYTES = registry.register(Gauge(
+    "kova_process_resident_memory_bytes", "Süreç RSS bellek kullanımı",
+    callback=lambda: _rss_bytes()))
+
+
+def record_job_metrics(job_type: str, result: Dict):
+    """İş sonucu metriklerini günceller"""
+    JOBS_PROCESSED.inc(type=job_type, status="success" if result.get("success") else "failed")
+    if result.get("success"):
+        ROWS_SPLIT.inc(result.get("total_rows", 0))
+
@@ -0,0 +1,156 @@
+# utils/mime_stream.py
+"""
+Akış halinde MIME mesajı (büyük ekler belleğe alınmadan gönderilir)
+
+MIMEApplication(f.read()) ekin kendisini ve base64 kopyasını (~2.4×) bellekte
+tutar; eşzamanlı gönderimlerde RSS bununla çarpılır. StreamingMessage ise
+sadece başlıkları ve metin gövdesini oluşturur; ek dosyası CHUNK_BYTES'lık
+parçalar halinde okunup base64'lenir ve doğrudan SMTP DATA akışına yazılır:
+
+    message = StreamingMessage(to_emails, subject, body, attachment_path, sender)
+    await send_streaming(server, message)   # MAIL / RCPT / DATA
+
+Gönderim başına bellek ek boyutundan bağımsızdır (bir parça + base64'ü).
+attachment_path=None ekli olmayan (ör. indirme linkli) mesaj üretir.
+Başlıklar aiosmtplib.send_message ile aynı kurallarla (compat32, CRLF,
+sunucu 8BITMIME destekliyorsa 8bit) üretilir. Boyut önceden hesaplanır
+(SIZE uzantısı).
+"""
+import base64
+import email.generator
+import email.policy
+import io
+import re
+import uuid
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+LINE_BYTES = 57  # base64'te 76 karakterlik bir satır
+CHUNK_BYTES = LINE_BYTES * 1024  # ~57 KB okuma, ~78 KB yazma
+PERIOD_REGEX = re.compile(rb"(?m)^\.")  # RFC 5321 dot-stuffing
+
+
+def encoded_size(size: int) -> int:
+    """size byte'ın CRLF satırlı base64 uzunluğu"""
+    full_lines, rest = divmod(size, LINE_BYTES)
+    last = (4 * -(-rest // 3) + 2) if rest else 0
+    return full_lines * 78 + last
+
+
+class StreamingMessage:
+    def __init__(self, to_emails: List[str], subject: str, body: str, attachment_path: Optional[Path],
+                 sender: str = "", subtype: str = "xlsx"):
+        self.to_emails = list(to_emails)
+        self.subject = subject
+        self.body = body
+        self.attachment_path = Path(attachment_path) if attachment_path is not None else None
+        self.sender = sender
+        self.subtype = subtype
+        self._marker = f"@@ek-{uuid.uuid4().hex}@@"
+
+    def _skeleton(self) -> MIMEMultipart:
+        message = MIMEMultipart()
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.to_emails)
+        message["Subject"] = self.subject
+        message.attach(MIMEText(self.body, "plain", "utf-8"))
+        if self.attachment_path is None:
+            return message
+
+        # Ek gövdesi yerine işaret: akış sırasında dosyanın base64'ü yazılır
+        attachment = MIMEBase("application", self.subtype)
+        attachment["Content-Transfer-Encoding"] = "base64"
+        attachment.add_header("Content-Disposition", "attachment", filename=self.attachment_path.name)
+        attachment.set_payload(self._marker)
+        message.attach(attachment)
+        return message
+
+    def envelope(self, cte_type: str = "7bit") -> Tuple[bytes, bytes]:
+        """(ekten önceki, ekten sonraki) kısımlar; CRLF ve dot-stuffing uygulanmış"""
+        policy = email.policy.compat32.clone(linesep="\r\n", cte_type=cte_type)
+        with io.BytesIO() as buffer:
+            email.generator.BytesGenerator(buffer, policy=policy).flatten(self._skeleton())
+            flat = buffer.getvalue()
+        if self.attachment_path is None:
+            return PERIOD_REGEX.sub(b"..", flat), b""
+        head, tail = flat.split(self._marker.encode("ascii") + b"\r\n", 1)
+        if not tail.endswith(b"\r\n"):
+            tail += b"\r\n"
+        return PERIOD_REGEX.sub(b"..", head), PERIOD_REGEX.sub(b"..", tail)
+
+    def size(self, cte_type: str = "7bit") -> int:
+        head, tail = self.envelope(cte_type)
+        if self.attachment_path is None:
+            return len(head)
+        return len(head) + encoded_size(self.attachment_path.stat().st_size) + len(tail)
+
+    def chunks(self, cte_type: str = "7bit") -> Iterator[bytes]:
+        """Mesajın DATA'ya yazılacak parçaları (sondaki "." hariç)"""
+        head, tail = self.envelope(cte_type)
+        yield head
+        if self.attachment_path is None:
+            return
+        with open(self.attachment_path, "rb") as f:
+            while True:
+                data = f.read(CHUNK_BYTES)
+                if not data:
+                    break
+                yield base64.encodebytes(data).replace(b"\n", b"\r\n")
+        yield tail
+
+    def as_bytes(self, cte_type: str = "7bit") -> bytes:
+        """Tüm mesaj (test / benchmark; gönderimde chunks kullanılır)"""
+        return b"".join(self.chunks(cte_type))
+
+
+async def send_streaming(server, message: StreamingMessage) -> None:
+    """
+    Bağlı (ve gerekiyorsa login olmuş) aiosmtplib.SMTP üzerinden mesajı gönderir.
+    Hata durumunda zarf RSET ile sıfırlanır ve istisna yükseltilir.
+    """
+    from aiosmtplib import SMTPDataError, SMTPRecipientsRefused, SMTPRecipientRefused, SMTPResponseException
+    from aiosmtplib.typing import SMTPStatus
+
+    if server.is_ehlo_or_helo_needed:
+        await server.ehlo()
+    cte_type = "8bit" if server.supports_extension("8bitmime") else "7bit"
+    options = []
+    if server.supports_extension("size"):
+        options.append(f"SIZE={message.size(cte_type)}")
+    if cte_type == "8bit":
+        options.append("BODY=8BITMIME")
+
+    try:
+        await server.mail(message.sender, options=options)
+        refused = []
+        for recipient in message.to_emails:
+            try:
+                await server.rcpt(recipient)
+            except SMTPRecipientRefused as e:
+                refused.append(e)
+        if len(refused) == len(message.to_emails):
+            raise SMTPRecipientsRefused(refused)
+
+        response = await server.execute_command(b"DATA")
+        if response.code != SMTPStatus.start_input:
+            raise SMTPDataError(response.code, response.message)
+
+        protocol = server.protocol
+        for chunk in message.chunks(cte_type):
+            protocol.write(chunk)
+            # StreamWriter.drain ile aynı akış kontrolü: soket tamponu dolunca beklenir
+            await protocol._drain_helper()
+        protocol.write(b".\r\n")
+
+        response = await protocol.read_response(timeout=server.timeout)
+        if response.code != SMTPStatus.completed:
+            raise SMTPDataError(response.code, response.message)
+    except SMTPResponseException:
+        try:
+            await server.rset()
+        except Exception:
+            pass
+        raise
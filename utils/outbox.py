@@ -0,0 +1,545 @@
+# utils/outbox.py
+"""
+Kalıcı mail kutusu (outbox)
+
+Grup mailleri iş içinde doğrudan gönderilmez. Her (iş, grup, alıcı) teslimatı
+data/outbox.db'de bir satırdır ve arka plandaki gönderici tarafından işlenir:
+
+    ids = await outbox.enqueue(job_id, deliveries)        # Delivery listesi
+    rows = await outbox.status(ids)                       # iş raporu (bekletmez)
+    states = await outbox.wait(ids, config.OUTBOX_WAIT_SECONDS)  # sonradan bildirim
+
+- Durumlar: pending → sending → sent | failed | cancelled. Başarısız denemede attempts
+  artar ve next_attempt_at üstel geri çekilmeyle ileri atılır
+  (OUTBOX_RETRY_BASE × 2^n, en fazla OUTBOX_RETRY_MAX). OUTBOX_MAX_ATTEMPTS
+  denemeden sonra teslimat failed olur; admin /outbox retry ile yeniden açar.
+  Sunucunun kalıcı reddi (5xx: alıcı / gönderen reddi, 552 mesaj büyük)
+  tekrar denenmez, teslimat hemen failed olur.
+- (job_id, group_id, recipient) tekildir: aynı iş tekrar kuyruğa alınırsa
+  gönderilmiş teslimat yeniden gönderilmez, failed olan pending'e döner.
+- cancel(ids) henüz gönderilmemiş teslimatları iptal eder (ör. dosyası
+  ayrılırken hata veren iş; kullanıcı yeniden yükleyince alıcıya ikinci
+  kez gitmesin). Gönderimdeki denemeler durdurulur.
+- Gönderim sırasında kapanırsa "sending" kalan satırlar açılışta pending'e
+  döner (en az bir kez teslim).
+- İş teslimatları yazınca biter (gönderimi beklemez, worker'ı tutmaz);
+  kullanıcıya ilk denemelerin sonucu ayrıca bildirilir (wait, en fazla
+  OUTBOX_WAIT_SECONDS). İş raporundan sonra sonuçlanan teslimatlar "late"
+  işaretlidir ve job_store'a sonuçlandıkça yazılır.
+- Tekrar denemede (retry_failed, aynı işin yeniden kuyruğa alınması)
+  parts_sent korunur: gönderilmiş parçalar tekrar gönderilmez.
+- Bekleyen teslimatların ekleri janitor'dan korunur. data/outbox altındaki
+  ekler (toplu ZIP) son teslimatı gönderilince silinir; failed teslimatın
+  eki /outbox retry için saklanır (janitor outbox saklama süresiyle siler).
+- MAIL_MAX_MB'ı aşan ekler parçalara bölünür (utils/attachment_plan.py);
+  gönderilen parça sayısı parts_sent'te tutulur, tekrar denemede kalan
+  parçalardan devam edilir. Parçalar ekin son teslimatından sonra silinir.
+- MAIL_DELIVERY_MODE link / auto ise data/output altındaki ekler yerine
+  imzalı indirme linki gönderilir (utils/download_links.py).
+- SQLite okuma / yazmaları tek bir "outbox-db" thread'inde sırayla yapılır
+  (job_store.defer gibi); WAL fsync'i ve kilit beklemeleri loop'u durdurmaz.
+- Metrikler: kova_outbox_attempts_total{result}, kova_queue_depth{queue="outbox_pending"}.
+"""
+import asyncio
+import contextvars
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config import config
+from utils.janitor import janitor
+from utils.job_store import job_store
+from utils.logger import logger
+from utils.attachment_plan import discard_parts, plan_attachment
+from utils.download_links import download_links
+from utils.mailer import PermanentSMTPError, send_attachment_parts, send_link_email
+from utils.smtp_pool import smtp_pool
+from utils.metrics import OUTBOX_ATTEMPTS, QUEUE_DEPTH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deliveries (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id          TEXT NOT NULL,
+    group_id        TEXT NOT NULL,
+    recipient       TEXT NOT NULL,
+    subject         TEXT NOT NULL,
+    body            TEXT NOT NULL,
+    attachment      TEXT NOT NULL,
+    state           TEXT NOT NULL DEFAULT 'pending',
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error      TEXT,
+    late            INTEGER NOT NULL DEFAULT 0,  -- iş raporlandığında hâlâ bekliyordu
+    created_at      REAL NOT NULL,
+    updated_at      REAL NOT NULL,
+    sent_at         REAL,
+    parts_sent      INTEGER NOT NULL DEFAULT 0,  -- bölünmüş ekte gönderilen parça sayısı
+    UNIQUE (job_id, group_id, recipient)
+);
+CREATE INDEX IF NOT EXISTS idx_deliveries_due ON deliveries(state, next_attempt_at);
+"""
+
+# Eski veritabanlarına eklenen sütunlar
+MIGRATIONS = {
+    "parts_sent": "ALTER TABLE deliveries ADD COLUMN parts_sent INTEGER NOT NULL DEFAULT 0",
+}
+
+PENDING_STATES = ("pending", "sending")
+BULK_GROUP = "__bulk__"  # PERSONAL_EMAIL'e giden toplu ZIP teslimatı
+
+
+@dataclass
+class Delivery:
+    group_id: str
+    recipient: str
+    subject: str
+    body: str
+    attachment: Path
+
+
+class Outbox:
+    def __init__(self, db_path: Path, max_attempts: int, retry_base: float, retry_max: float, concurrency: int):
+        self.db_path = db_path
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.concurrency = max(1, concurrency)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()  # conn ilk açılışta _refresh'i kilit içinden çağırır
+        self._db: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._sending = set()  # gönderim task'ları
+        self._waiters: Dict[int, List[asyncio.Future]] = {}
+        self._protected = frozenset()  # bekleyen eklerin yolları (janitor thread'i okur)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Bağlantıyı ilk kullanımda açar; yarım kalan gönderimleri pending'e döndürür"""
+        with self._lock:
+            if self._conn is None:
+                self._open()
+            return self._conn
+
+    def _open(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(deliveries)")}
+        for column, statement in MIGRATIONS.items():
+            if column not in columns:
+                conn.execute(statement)
+        with conn:
+            resumed = conn.execute("UPDATE deliveries SET state = 'pending' WHERE state = 'sending'").rowcount
+            # Bitmiş eski kayıtlar çıktılarla aynı süre saklanır
+            conn.execute(
+                "DELETE FROM deliveries WHERE state IN ('sent', 'failed', 'cancelled') AND updated_at < ?",
+                (time.time() - config.OUTPUT_RETENTION_DAYS * 86400,)
+            )
+        self._conn = conn
+        if resumed:
+            logger.info(f"📮 Outbox: yarım kalan {resumed} teslimat yeniden sıraya alındı")
+        self._refresh()
+
+    async def _run(self, method, *args):
+        """Veritabanı işini outbox-db thread'inde çalıştırır (sırayla; loop fsync ve kilit beklemez)"""
+        if self._db is None:
+            self._db = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox-db")
+        return await asyncio.get_running_loop().run_in_executor(self._db, method, *args)
+
+    # ---- kuyruğa alma ----
+    async def enqueue(self, job_id: str, deliveries: List[Delivery]) -> List[int]:
+        """Teslimatları yazar ve kimliklerini döner (gönderilmiş olanlar tekrar gönderilmez)"""
+        ids = await self._run(self._insert, job_id, deliveries)
+        self.start()
+        self._wake.set()
+        return ids
+
+    def _insert(self, job_id: str, deliveries: List[Delivery]) -> List[int]:
+        now = time.time()
+        ids = []
+        with self._lock, self.conn:
+            for delivery in deliveries:
+                self.conn.execute(
+                    "INSERT INTO deliveries(job_id, group_id, recipient, subject, body, attachment, "
+                    "next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(job_id, group_id, recipient) DO UPDATE SET "
+                    "state = 'pending', attempts = 0, next_attempt_at = excluded.next_attempt_at, "
+                    "updated_at = excluded.updated_at WHERE deliveries.state = 'failed'",
+                    (job_id, delivery.group_id, delivery.recipient, delivery.subject, delivery.body,
+                     str(delivery.attachment), now, now, now)
+                )
+                row = self.conn.execute(
+                    "SELECT id FROM deliveries WHERE job_id = ? AND group_id = ? AND recipient = ?",
+                    (job_id, delivery.group_id, delivery.recipient)
+                ).fetchone()
+                ids.append(row["id"])
+        self._refresh()
+        return ids
+
+    async def wait(self, ids: List[int], timeout: float) -> Dict[int, sqlite3.Row]:
+        """Teslimatların ilk denemesini bekler (en fazla timeout sn), güncel satırları döner"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for row in (await self.get(ids)).values():
+            if row["state"] in PENDING_STATES and row["attempts"] == 0:
+                future = loop.create_future()
+                self._waiters.setdefault(row["id"], []).append(future)
+                futures.append(future)
+        if futures:
+            await asyncio.wait(futures, timeout=timeout)
+            for future in futures:
+                future.cancel()  # zaman aşımında kalanlar (waiter listesi çözümlenince temizlenir)
+        return await self.status(ids)
+
+    async def status(self, ids: List[int]) -> Dict[int, sqlite3.Row]:
+        """Güncel satırlar; hâlâ bekleyenler late işaretlenir (sonuçları job_store'a sonradan yazılır)"""
+        if not ids:
+            return {}
+        return await self._run(self._mark_late, ids)
+
+    def _mark_late(self, ids: List[int]) -> Dict[int, sqlite3.Row]:
+        with self._lock, self.conn:
+            # _save_result ile aynı thread: sonuçlanan teslimat ya burada ya late olarak sayılır
+            self.conn.execute(
+                f"UPDATE deliveries SET late = 1 WHERE id IN ({','.join('?' * len(ids))}) "
+                "AND state IN ('pending', 'sending')",
+                list(ids)
+            )
+            return self._get(ids)
+
+    async def cancel(self, ids: List[int]) -> int:
+        """Gönderilmemiş teslimatları iptal eder (gönderimdekiler durdurulur); iptal sayısını döner"""
+        if not ids:
+            return 0
+        rows = await self._run(self._cancel, ids)
+        cancelled = {f"outbox-{row['id']}" for row in rows}
+        for task in list(self._sending):
+            if task.get_name() in cancelled:
+                task.cancel()
+        for row in rows:
+            for future in self._waiters.pop(row["id"], []):
+                if not future.done():
+                    future.set_result("cancelled")
+        for attachment in {row["attachment"] for row in rows}:
+            await self._run(self._release, Path(attachment))
+        return len(rows)
+
+    def _cancel(self, ids: List[int]) -> List[sqlite3.Row]:
+        now = time.time()
+        placeholders = ",".join("?" * len(ids))
+        with self._lock, self.conn:
+            rows = self.conn.execute(
+                f"SELECT id, attachment FROM deliveries WHERE id IN ({placeholders}) "
+                "AND state IN ('pending', 'sending')",
+                list(ids)
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE deliveries SET state = 'cancelled', updated_at = ? WHERE id = ?",
+                [(now, row["id"]) for row in rows]
+            )
+        self._refresh()
+        return rows
+
+    async def get(self, ids: List[int]) -> Dict[int, sqlite3.Row]:
+        if not ids:
+            return {}
+        return await self._run(self._get, ids)
+
+    def _get(self, ids: List[int]) -> Dict[int, sqlite3.Row]:
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT * FROM deliveries WHERE id IN ({','.join('?' * len(ids))})", list(ids)
+            ).fetchall()
+        found = {row["id"]: row for row in rows}
+        return {delivery_id: found[delivery_id] for delivery_id in ids if delivery_id in found}
+
+    # ---- gönderici ----
+    def start(self):
+        """Göndericiyi başlatır (enqueue de çağırır; birden çok kez çağrılabilir)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._wake = asyncio.Event()
+        # Yeni context: gönderici, onu başlatan işin perf/profil context'ini taşımaz
+        self._task = asyncio.create_task(self._loop(), name="outbox", context=contextvars.Context())
+
+    async def stop(self):
+        """Göndericiyi durdurur; yarım kalan gönderimler pending'e döner"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        for task in list(self._sending):
+            task.cancel()
+        await asyncio.gather(self._task, *self._sending, return_exceptions=True)
+        self._task = None
+        await self._run(self._unclaim)
+
+    def _unclaim(self):
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE deliveries SET state = 'pending' WHERE state = 'sending'")
+
+    def close(self):
+        """Bekleyen veritabanı işlerini bitirip bağlantıyı kapatır"""
+        if self._db is not None:
+            self._db.shutdown(wait=True)
+            self._db = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def _loop(self):
+        while True:
+            self._wake.clear()
+            # Hiçbir SMTP hesabı uygun değilse (devre açık / kota dolu) deneme yapılmaz
+            recovery = smtp_pool.retry_after()
+            free = self.concurrency - len(self._sending)
+            if free > 0 and not recovery:
+                for row in await self._run(self._claim, free):
+                    task = asyncio.create_task(self._attempt(row), name=f"outbox-{row['id']}")
+                    self._sending.add(task)
+                    task.add_done_callback(self._on_done)
+            delay = None if len(self._sending) >= self.concurrency else await self._run(self._next_delay)
+            if recovery:
+                delay = recovery if delay is None else max(delay, recovery)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _on_done(self, task: asyncio.Task):
+        self._sending.discard(task)
+        if self._wake is not None:
+            self._wake.set()
+
+    def _claim(self, limit: int) -> List[sqlite3.Row]:
+        """Zamanı gelen teslimatları "sending" olarak işaretleyip döner"""
+        with self._lock, self.conn:
+            rows = self.conn.execute(
+                "SELECT * FROM deliveries WHERE state = 'pending' AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at, id LIMIT ?",
+                (time.time(), limit)
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE deliveries SET state = 'sending' WHERE id = ?", [(row["id"],) for row in rows]
+            )
+        return rows
+
+    def _next_delay(self) -> Optional[float]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT MIN(next_attempt_at) AS due FROM deliveries WHERE state = 'pending'"
+            ).fetchone()
+        if row["due"] is None:
+            return None  # enqueue uyandırır
+        return max(0.0, row["due"] - time.time())
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.2)  # aynı anda düşen teslimatlar birlikte dönmesin
+
+    async def _attempt(self, row: sqlite3.Row):
+        attachment = Path(row["attachment"])
+        error = None
+        recovery = smtp_pool.retry_after()
+        if recovery:
+            # Hesaplar claim'den sonra uygunluğunu yitirdi: deneme hakkı harcanmadan geri bırakılır
+            await self._run(self._defer, row, recovery)
+            return
+        if not attachment.exists():
+            ok, error, final = False, "Ek dosya bulunamadı", True
+        else:
+            try:
+                # Tekrarları outbox yönetir: mailer her portu bir kez dener
+                if download_links.should_link(attachment):
+                    # Ek yerine link: gönderim süresi dosya boyutundan bağımsız
+                    ok = await send_link_email(
+                        [row["recipient"]], row["subject"], row["body"], attachment, max_retries=0
+                    )
+                    if not ok:
+                        error = "SMTP gönderimi başarısız (link)"
+                else:
+                    ok, error = await self._send_parts(row, attachment)
+                final = False
+            except asyncio.CancelledError:
+                raise
+            except PermanentSMTPError as e:
+                # Sunucu mesajı / alıcıyı kalıcı reddetti: tekrar denemek sonucu değiştirmez
+                ok, error, final = False, f"Kalıcı ret: {e}", True
+            except Exception as e:
+                ok, error, final = False, str(e), False
+        await self._record(row, ok, error, final)
+
+    async def _send_parts(self, row: sqlite3.Row, attachment: Path) -> Tuple[bool, Optional[str]]:
+        """Boyut sınırını aşan ek bölünür; önceki denemede giden parçalar atlanır"""
+        plan = await asyncio.to_thread(plan_attachment, attachment)
+        start = min(row["parts_sent"], len(plan.parts))
+        try:
+            sent = await send_attachment_parts(
+                [row["recipient"]], row["subject"], row["body"], plan, start=start, max_retries=0
+            )
+        except PermanentSMTPError as e:
+            if e.parts_sent > start:
+                await self._run(self._set_parts_sent, row["id"], e.parts_sent)
+            raise
+        if sent > start:
+            await self._run(self._set_parts_sent, row["id"], sent)
+        if sent == len(plan.parts):
+            return True, None
+        error = "SMTP gönderimi başarısız"
+        if plan.split:
+            error += f" (parça {sent + 1}/{len(plan.parts)})"
+        return False, error
+
+    def _set_parts_sent(self, delivery_id: int, sent: int):
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE deliveries SET parts_sent = ? WHERE id = ?", (sent, delivery_id))
+
+    def _defer(self, row: sqlite3.Row, delay: float):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE deliveries SET state = 'pending', next_attempt_at = ? WHERE id = ? AND state = 'sending'",
+                (time.time() + delay, row["id"])
+            )
+
+    async def _record(self, row: sqlite3.Row, ok: bool, error: Optional[str], final: bool):
+        now = time.time()
+        attempts = row["attempts"] + 1
+        if ok:
+            state, next_at = "sent", row["next_attempt_at"]
+        elif final or attempts >= self.max_attempts:
+            state, next_at = "failed", row["next_attempt_at"]
+        else:
+            state, next_at = "pending", now + self._backoff(attempts)
+
+        late = await self._run(self._save_result, row["id"], state, attempts, next_at, error, now if ok else None)
+        if late is None:
+            return  # bu arada iptal edildi (cancel waiter'ları ve eki zaten bıraktı)
+        if late and state != "pending" and row["group_id"] != BULK_GROUP:
+            job_store.defer(job_store.record_late_email, row["job_id"], ok)
+
+        OUTBOX_ATTEMPTS.inc(result="sent" if ok else ("failed" if state == "failed" else "retry"))
+        if state == "pending":
+            logger.warning(
+                f"📮 Teslimat ertelendi [{row['job_id']}] {row['recipient']}: {error} "
+                f"(deneme {attempts}/{self.max_attempts}, {next_at - now:.0f} sn sonra)"
+            )
+        elif state == "failed":
+            logger.error(f"📮 Teslimat başarısız [{row['job_id']}] {row['recipient']}: {error}")
+        elif attempts > 1:
+            logger.info(f"📮 Teslimat {attempts}. denemede gönderildi [{row['job_id']}] {row['recipient']}")
+
+        for future in self._waiters.pop(row["id"], []):
+            if not future.done():
+                future.set_result(state)
+        if state == "sent":
+            await self._run(self._release, Path(row["attachment"]))
+
+    def _save_result(self, delivery_id: int, state: str, attempts: int, next_at: float,
+                     error: Optional[str], sent_at: Optional[float]) -> Optional[int]:
+        """Deneme sonucunu yazar; late değerini döner (satır artık sending değilse None)"""
+        with self._lock, self.conn:
+            updated = self.conn.execute(
+                "UPDATE deliveries SET state = ?, attempts = ?, next_attempt_at = ?, last_error = ?, "
+                "updated_at = ?, sent_at = ? WHERE id = ? AND state = 'sending'",
+                (state, attempts, next_at, error, time.time(), sent_at, delivery_id)
+            ).rowcount
+            if not updated:
+                return None
+            late = self.conn.execute("SELECT late FROM deliveries WHERE id = ?", (delivery_id,)).fetchone()["late"]
+        self._refresh()
+        return late
+
+    def _release(self, attachment: Path):
+        """
+        Ekin parçaları ve outbox dizinindeki ek, bekleyen veya failed başka
+        teslimatı yoksa silinir. failed teslimatın eki /outbox retry için
+        saklanır (janitor'un outbox saklama süresi sonunda silinir).
+        """
+        if str(attachment) in self._protected:
+            return
+        with self._lock:
+            failed = self.conn.execute(
+                "SELECT 1 FROM deliveries WHERE attachment = ? AND state = 'failed' LIMIT 1", (str(attachment),)
+            ).fetchone()
+        if failed:
+            return
+        discard_parts(attachment)
+        if config.OUTBOX_DIR not in attachment.parents:
+            return
+        attachment.unlink(missing_ok=True)
+        try:
+            attachment.parent.rmdir()
+        except OSError:
+            pass
+
+    def _refresh(self):
+        """Bekleyen ek listesini ve kuyruk metriğini günceller"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT attachment, COUNT(*) AS n FROM deliveries WHERE state IN ('pending', 'sending') "
+                "GROUP BY attachment"
+            ).fetchall()
+        self._protected = frozenset(row["attachment"] for row in rows)
+        QUEUE_DEPTH.set(sum(row["n"] for row in rows), queue="outbox_pending")
+
+    def is_protected(self, path: Path) -> bool:
+        """Janitor koruması: bekleyen bir teslimatın eki mi"""
+        return str(path) in self._protected
+
+    # ---- durum ----
+    async def summary(self) -> Dict[str, int]:
+        return await self._run(self._summary)
+
+    def _summary(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self.conn.execute("SELECT state, COUNT(*) AS n FROM deliveries GROUP BY state").fetchall()
+        return {row["state"]: row["n"] for row in rows}
+
+    async def recent(self, states: tuple, limit: int = 10) -> List[sqlite3.Row]:
+        return await self._run(self._recent, states, limit)
+
+    def _recent(self, states: tuple, limit: int) -> List[sqlite3.Row]:
+        with self._lock:
+            return self.conn.execute(
+                f"SELECT * FROM deliveries WHERE state IN ({','.join('?' * len(states))}) "
+                "ORDER BY updated_at DESC LIMIT ?",
+                (*states, limit)
+            ).fetchall()
+
+    async def retry_failed(self) -> int:
+        """failed teslimatları hemen denenmek üzere pending'e alır"""
+        count = await self._run(self._retry_failed)
+        if count:
+            self.start()
+            self._wake.set()
+        return count
+
+    def _retry_failed(self) -> int:
+        now = time.time()
+        with self._lock, self.conn:
+            count = self.conn.execute(
+                "UPDATE deliveries SET state = 'pending', attempts = 0, next_attempt_at = ?, "
+                "updated_at = ? WHERE state = 'failed'",
+                (now, now)
+            ).rowcount
+        self._refresh()
+        return count
+
+
+outbox = Outbox(
+    config.OUTBOX_DB,
+    max_attempts=config.OUTBOX_MAX_ATTEMPTS,
+    retry_base=config.OUTBOX_RETRY_BASE,
+    retry_max=config.OUTBOX_RETRY_MAX,
+    concurrency=config.OUTBOX_CONCURRENCY,
+)
+janitor.register_guard(outbox.is_protected)
@@ -0,0 +1,259 @@
+# utils/perf.py
+"""
+İş bazlı süre ölçümü (span/timer)
+
+Kullanım:
+    with job_perf(job_id, "process"):
+        ...
+        with span("clean") as s:
+            result = clean_excel_headers(path)
+            s.rows = result["row_count"]
+
+- Aktif iş contextvars ile taşınır; span() iş dışında çağrılırsa hiçbir şey yapmaz
+  (email_handler gibi iş dışı kullanımlar ölçülmez).
+- asyncio.to_thread context'i kopyaladığı için thread'e taşınan aşamalar da ölçülür.
+  Senkron span'ler çalıştıkları thread'i iş profillenirken örneklemeye ekler
+  (utils/profiler.py profiled_thread).
+- Her span: duvar süresi, CPU süresi, satır, byte ve span boyunca görülen
+  en yüksek RSS. İş bitince job_store'a yazılır.
+- RSS tepesi: span / iş açıkken arka plandaki tek bir thread RSS'i
+  RSS_SAMPLE_INTERVAL'da bir örnekler; her pencere kendi tepesini tutar.
+  RSS süreç geneli olduğundan eşzamanlı işlerin belleği de içindedir.
+- CPU: senkron span'lerde span'i açan thread'in CPU süresi (thread_time;
+  to_thread'deki aşamalar için o aşamanın kendisi). Async span'lerde (await
+  içeren, ör. mail) loop thread'i başka coroutine'leri de çalıştırdığından
+  CPU ölçülmez (0). "job" satırındaki CPU süreç geneli CPU'dur
+  (process_time; iş süresince çalışan diğer işler ve thread'ler dahil).
+"""
+import functools
+import inspect
+import math
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from utils.logger import logger
+from utils.metrics import STAGE_DURATION, SPLIT_ROWS_PER_SECOND
+from utils.profiler import profiled_thread
+
+_current_job: ContextVar[Optional["JobPerf"]] = ContextVar("perf_job", default=None)
+_process = None
+
+RSS_SAMPLE_INTERVAL = 0.05  # sn
+
+
+def _rss_mb() -> float:
+    global _process
+    if _process is None:
+        import psutil  # ilk ölçümde yüklenir
+        _process = psutil.Process()
+    return _process.memory_info().rss / 1024 / 1024
+
+
+class RssSampler:
+    """
+    Açık pencereler (span / iş) boyunca RSS'i örnekler. Thread ilk pencere
+    açılınca başlar, son pencere kapanınca durur.
+    """
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._windows: Dict[int, List[float]] = {}  # id -> [tepe MB]
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def open(self) -> List[float]:
+        window = [_rss_mb()]
+        with self._lock:
+            self._windows[id(window)] = window
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+                self._thread.start()
+        return window
+
+    def close(self, window: List[float]) -> float:
+        """Pencereyi kapatır, tepe RSS'i (MB) döner"""
+        rss = _rss_mb()
+        with self._lock:
+            self._windows.pop(id(window), None)
+            window[0] = max(window[0], rss)
+        return window[0]
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            rss = _rss_mb()
+            with self._lock:
+                if not self._windows:
+                    self._thread = None
+                    return
+                for window in self._windows.values():
+                    if rss > window[0]:
+                        window[0] = rss
+
+
+_sampler = RssSampler()
+
+
+class Span:
+    __slots__ = ("stage", "rows", "bytes")
+
+    def __init__(self, stage: str, rows: int = 0, nbytes: int = 0):
+        self.stage = stage
+        self.rows = rows
+        self.bytes = nbytes
+
+
+class JobPerf:
+    def __init__(self, job_id: str, job_type: str):
+        self.job_id = job_id
+        self.job_type = job_type
+        self.stages: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, wall: float, cpu: float, rows: int, nbytes: int, rss: float):
+        STAGE_DURATION.observe(wall, stage=stage)
+        if stage == "split" and wall > 0:
+            SPLIT_ROWS_PER_SECOND.set((rows or 0) / wall)
+        record = {
+            "stage": stage,
+            "wall_ms": wall * 1000,
+            "cpu_ms": cpu * 1000,
+            "rows": rows or 0,
+            "bytes": nbytes or 0,
+            "rss_mb": rss,
+        }
+        with self._lock:
+            self.stages.append(record)
+        return record
+
+
+@contextmanager
+def span(stage: str, rows: int = 0, nbytes: int = 0, measure_cpu: bool = True):
+    """
+    Aktif iş varsa aşama süresini ölçer.
+    measure_cpu=False: await içeren span (loop thread'inin CPU'su aşamaya ait değildir)
+    """
+    job = _current_job.get()
+    current = Span(stage, rows, nbytes)
+    if job is None:
+        yield current
+        return
+
+    window = _sampler.open()
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        with profiled_thread() if measure_cpu else nullcontext():
+            yield current
+    finally:
+        cpu = time.thread_time() - cpu_start if measure_cpu else 0.0
+        record = job.add(
+            stage,
+            time.perf_counter() - wall_start,
+            cpu,
+            current.rows,
+            current.bytes,
+            _sampler.close(window),
+        )
+        logger.debug(
+            "⏱️ [{}] {}: {:.0f} ms (cpu {:.0f} ms, {} satır)",
+            job.job_id, stage, record["wall_ms"], record["cpu_ms"], record["rows"]
+        )
+
+
+def _file_size(args, path_arg: Optional[int]) -> int:
+    if path_arg is None or len(args) <= path_arg:
+        return 0
+    try:
+        return Path(args[path_arg]).stat().st_size
+    except (OSError, TypeError):
+        return 0
+
+
+def timed(stage: str, rows_key: Optional[str] = None, path_arg: Optional[int] = None):
+    """
+    Fonksiyonun tamamını span olarak ölçen dekoratör (sync ve async).
+    rows_key: dönen dict'teki satır sayısı anahtarı
+    path_arg: boyutu 'bytes' olarak sayılacak dosya yolunun pozisyonel indeksi
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage, nbytes=_file_size(args, path_arg), measure_cpu=False) as current:
+                    result = await func(*args, **kwargs)
+                    if rows_key and isinstance(result, dict):
+                        current.rows = result.get(rows_key, 0) or 0
+                    return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage, nbytes=_file_size(args, path_arg)) as current:
+                result = func(*args, **kwargs)
+                if rows_key and isinstance(result, dict):
+                    current.rows = result.get(rows_key, 0) or 0
+                return result
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def job_perf(job_id: str, job_type: str, save: bool = True):
+    """
+    İş boyunca span'leri toplar, sonunda 'job' toplamıyla birlikte kaydeder.
+    save=False: span'ler sadece toplanır (benchmark'lar job_store'a yazmaz)
+    """
+    job = JobPerf(job_id, job_type)
+    token = _current_job.set(job)
+    window = _sampler.open()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield job
+    finally:
+        _current_job.reset(token)
+        rows = max((s["rows"] for s in job.stages), default=0)
+        job.add(
+            "job", time.perf_counter() - wall_start, time.process_time() - cpu_start, rows, 0,
+            _sampler.close(window),
+        )
+
+        if save:
+            from utils.job_store import job_store
+            job_store.defer(job_store.save_stages, job_id, job_type, job.stages)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """En yakın sıra (nearest-rank) yöntemiyle yüzdelik"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize_stages(stages: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Aşama bazında p50/p95 süre, ortalama CPU, satır/sn ve tepe RSS (örneklenmiş)"""
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for record in stages:
+        grouped.setdefault(record["stage"], []).append(record)
+
+    summary = {}
+    for stage, records in grouped.items():
+        walls = [r["wall_ms"] for r in records]
+        total_wall_s = sum(walls) / 1000
+        total_rows = sum(r["rows"] for r in records)
+        summary[stage] = {
+            "count": len(records),
+            "p50_ms": percentile(walls, 50),
+            "p95_ms": percentile(walls, 95),
+            "avg_cpu_ms": sum(r["cpu_ms"] for r in records) / len(records),
+            "rows_per_s": total_rows / total_wall_s if total_wall_s > 0 else 0.0,
+            "bytes": sum(r["bytes"] for r in records),
+            "peak_rss_mb": max(r["rss_mb"] for r in records),
+        }
+    return summary
@@ -0,0 +1,205 @@
+# utils/profiler.py
+"""
+İşler için örnekleyici (sampling) profiler
+
+/profile on [N] → sonraki N process_excel_task / process_tek_task çalışması
+profillenir. Ayrı bir thread her `interval` saniyede profillenen işin
+thread'lerinin stack'ini sys._current_frames() ile alır (kodu değiştirmez,
+üretimde güvenli).
+
+İşin thread'leri: event loop thread'i ve işin thread'de çalışan aşamaları
+(temizleme, ayırma, zip). Aşamalar perf.span içinde profiled_thread() ile
+kendi thread'lerini kaydeder; iş contextvar ile taşındığından JOB_WORKERS > 1
+iken aynı anda çalışan diğer işlerin thread'leri profile girmez. Loop thread'i
+paylaşıldığından oradaki örneklerde diğer işlerin coroutine'leri de olabilir.
+
+İş bitince profili açan admine gönderilir:
+- en çok zaman alan fonksiyonlar (self / toplam örnek)
+- flamegraph.pl / speedscope uyumlu "collapsed stack" dosyası
+"""
+import asyncio
+import html
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+from aiogram.types import BufferedInputFile
+
+from utils.logger import logger
+
+# Boşta bekleyen thread'lerin en üst fonksiyonları (örneğe katılmaz)
+IDLE_FUNCTIONS = {"select", "poll", "wait", "_wait_for_tstate_lock", "sleep", "_worker"}
+Frame = Tuple[str, str]  # (fonksiyon, dosya:satır)
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.sample_count = 0
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._threads: Counter = Counter()  # örneklenen thread ident -> açık kayıt sayısı
+        self._threads_lock = threading.Lock()
+
+    def attach(self, thread_id: int):
+        with self._threads_lock:
+            self._threads[thread_id] += 1
+
+    def detach(self, thread_id: int):
+        with self._threads_lock:
+            self._threads[thread_id] -= 1
+            if self._threads[thread_id] <= 0:
+                del self._threads[thread_id]
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._threads_lock:
+                threads = set(self._threads)
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in threads:
+                    continue
+                name = names.get(thread_id, str(thread_id))
+                if frame.f_code.co_name in IDLE_FUNCTIONS:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(name)
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+            self.sample_count += 1
+
+    def collapsed(self) -> str:
+        """Brendan Gregg collapsed formatı: 'a;b;c adet'"""
+        lines = []
+        for stack, count in self.stacks.most_common():
+            lines.append(";".join(part.replace(";", ":") for part in stack) + f" {count}")
+        return "\n".join(lines) + "\n"
+
+    def top_functions(self, limit: int = 15) -> List[Tuple[str, int, int]]:
+        """(fonksiyon, self örnek, toplam örnek) - self'e göre sıralı"""
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            self_counts[stack[-1]] += count
+            for function in set(stack[1:]):
+                total_counts[function] += count
+        return [
+            (function, count, total_counts[function])
+            for function, count in self_counts.most_common(limit)
+        ]
+
+
+_active: ContextVar[Optional[SamplingProfiler]] = ContextVar("profiler", default=None)
+
+
+@contextmanager
+def profiled_thread():
+    """Blok süresince çağıran thread'i aktif profile ekler (profil yoksa bir şey yapmaz)"""
+    profiler = _active.get()
+    if profiler is None:
+        yield
+        return
+    thread_id = threading.get_ident()
+    profiler.attach(thread_id)
+    try:
+        yield
+    finally:
+        profiler.detach(thread_id)
+
+
+class ProfileManager:
+    def __init__(self):
+        self.remaining = 0
+        self.interval = 0.005
+        self._bot = None
+        self._chat_id: Optional[int] = None
+        self._reports: Set[asyncio.Task] = set()
+
+    def enable(self, bot, chat_id: int, runs: int = 1, interval: float = 0.005):
+        self.remaining = runs
+        self.interval = interval
+        self._bot = bot
+        self._chat_id = chat_id
+
+    def disable(self):
+        self.remaining = 0
+
+    @asynccontextmanager
+    async def session(self, label: str):
+        """Profil açıksa bloğu örnekler; rapor arka planda admine gönderilir (işi bekletmez)"""
+        if self.remaining <= 0:
+            yield None
+            return
+
+        self.remaining -= 1
+        bot, chat_id = self._bot, self._chat_id
+        profiler = SamplingProfiler(self.interval)
+        token = _active.set(profiler)
+        profiler.start()
+        try:
+            with profiled_thread():  # loop thread'i
+                yield profiler
+        finally:
+            _active.reset(token)
+            profiler.stop()
+            task = asyncio.create_task(self._send_report(bot, chat_id, label, profiler), name="profile-report")
+            self._reports.add(task)
+            task.add_done_callback(self._reports.discard)
+
+    async def _send_report(self, bot, chat_id: int, label: str, profiler: SamplingProfiler):
+        try:
+            total = sum(profiler.stacks.values()) or 1
+            lines = [
+                f"🔬 <b>Profil: {html.escape(label)}</b>",
+                f"Süre: {profiler.duration:.1f}s, örnek: {profiler.sample_count}",
+                "",
+                "<b>En çok zaman alan fonksiyonlar</b> (self% / toplam%):",
+            ]
+            for function, self_count, total_count in profiler.top_functions():
+                lines.append(
+                    f"• {self_count / total * 100:.1f}% / {total_count / total * 100:.1f}% "
+                    f"<code>{html.escape(function[:80])}</code>"
+                )
+            await bot.send_message(chat_id, "\n".join(lines))
+        except Exception as e:
+            logger.error(f"Profil özeti gönderilemedi: {e}")
+
+        # Özet gönderilemese de collapsed stack ayrıca gönderilir
+        try:
+            filename = f"profile_{label}_{datetime.now().strftime('%m%d_%H%M%S')}.collapsed"
+            await bot.send_document(
+                chat_id,
+                BufferedInputFile(profiler.collapsed().encode("utf-8"), filename=filename),
+                caption="🔥 Flamegraph için collapsed stack (flamegraph.pl / speedscope)"
+            )
+        except Exception as e:
+            logger.error(f"Profil dosyası gönderilemedi: {e}")
+
+
+# Global profile manager instance
+profile_manager = ProfileManager()
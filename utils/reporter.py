@@ -18,7 +18,8 @@ def generate_processing_report(result: Dict) -> str:
     user_id = result.get("user_id", "Bilinmeyen")
     
     successful_emails = sum(1 for res in email_results if res.get("success", False))
-    failed_emails = len(email_results) - successful_emails
+    queued_emails = sum(1 for res in email_results if res.get("queued", False))
+    failed_emails = len(email_results) - successful_emails - queued_emails
     
     # YENİ: Toplu mail bilgisi
     bulk_email_sent = result.get("bulk_email_sent", False)
@@ -37,10 +38,14 @@ def generate_processing_report(result: Dict) -> str:
         f"• Başarılı mail: {successful_emails}",
         f"• Başarısız mail: {failed_emails}",
     ]
+    if queued_emails:
+        report_lines.append(f"• ⏳ Gönderimdeki mail: {queued_emails} (sonuç ayrıca bildirilecek)")
     
     # YENİ: Toplu mail durumu
     if bulk_email_sent and bulk_email_recipient:
         report_lines.append(f"• 📧 Otomatik toplu mail: {bulk_email_recipient} ✅")
+    elif result.get("bulk_email_queued"):
+        report_lines.append("• 📧 Otomatik toplu mail: Gönderimde ⏳")
     else:
         report_lines.append("• 📧 Otomatik toplu mail: Gönderilemedi ❌")
     
@@ -76,7 +81,7 @@ def generate_processing_report(result: Dict) -> str:
         ])
         error_count = 0
         for error in email_results:
-            if not error.get("success", False) and error_count < 3:
+            if not error.get("success", False) and not error.get("queued", False) and error_count < 3:
                 report_lines.append(f"• {error.get('recipient', 'Bilinmeyen')}: {error.get('error', 'Bilinmeyen hata')}")
                 error_count += 1
         if failed_emails > 3:
@@ -106,6 +111,30 @@ def generate_email_report(email_results: List[Dict]) -> str:
     return "\n".join(report)
     
 
+def generate_delivery_report(rows: List) -> str:
+    """İş raporundan sonra outbox teslimat sonuçları (grup mailleri + toplu mail)"""
+    sent = [row for row in rows if row["state"] == "sent"]
+    failed = [row for row in rows if row["state"] in ("failed", "cancelled")]
+    pending = len(rows) - len(sent) - len(failed)
+    
+    report = [
+        "📧 **MAIL TESLİMAT SONUCU**",
+        f"✅ Gönderilen: {len(sent)}",
+        f"❌ Başarısız: {len(failed)}",
+    ]
+    if pending:
+        report.append(f"⏳ Tekrar denenecek: {pending}")
+    
+    if failed:
+        report.extend(["", "**Hatalar:**"])
+        for row in failed[:5]:
+            report.append(f"• {row['recipient']}: {row['last_error'] or row['state']}")
+        if len(failed) > 5:
+            report.append(f"• ... ve {len(failed) - 5} diğer hata")
+    
+    return "\n".join(report)
+
+
 def generate_personal_email_report(result: Dict) -> str:
     """Kişisel mail gönderim raporu oluşturur"""
     if not result.get("success", False):
@@ -0,0 +1,247 @@
+# utils/scheduler.py
+"""
+Adil iş zamanlayıcısı (process / tek işleri)
+
+Handler'lar işi doğrudan çalıştırmaz, buraya bırakır ve hemen döner:
+
+    ticket = job_scheduler.submit(user_id, rows, run_job, admin=is_admin)  # run_job(ticket)
+    await message.answer(describe_ticket(ticket))
+
+- Aynı anda en fazla JOB_WORKERS iş çalışır (varsayılan 1: her temizleme
+  tüm workbook'u belleğe yükler, işçi sayısı tepe belleği çarpar); bir
+  kullanıcının en fazla JOB_USER_LIMIT işi aynı anda çalışır, fazlası sırada bekler.
+- Öncelik şeritleri: admin > small (SMALL_JOB_ROWS altı) > normal. Böylece
+  küçük dosyalar 300 bin satırlık bir işin arkasında beklemez.
+- Şerit içinde kullanıcılar arası ağırlıklı adil sıralama: her kullanıcının
+  sanal zamanı çalıştırdığı satır kadar ilerler; sırada en geride kalan
+  kullanıcının işi önce başlar (tek kullanıcı kuyruğu tekelleyemez).
+- Sıra ve tahmini bekleme: tamamlanan işlerden öğrenilen sn/satır ile hesaplanır.
+- Metrikler: kova_queue_depth{queue="jobs_waiting"}.
+"""
+import asyncio
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from config import config
+from utils.logger import logger
+from utils.metrics import QUEUE_DEPTH
+
+LANES = ("admin", "small", "normal")  # öncelik sırası
+MIN_JOB_SECONDS = 2.0  # tahminlerde iş başına alt sınır (indirme, mail vb.)
+EWMA_ALPHA = 0.3
+RATE_MIN_ROWS = 1000  # sn/satır sadece bu boyuttan büyük işlerden öğrenilir (küçüklerde sabit maliyet baskın)
+
+_sequence = itertools.count(1)
+
+
+@dataclass
+class Ticket:
+    user_id: int
+    rows: int
+    lane: str
+    factory: Callable[["Ticket"], Awaitable[Any]] = field(repr=False)
+    seq: int = field(default_factory=lambda: next(_sequence))
+    submitted_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    future: asyncio.Future = field(default=None, repr=False)
+    queued: bool = False  # gönderildiğinde hemen başlayamadıysa True
+
+    @property
+    def waiting(self) -> bool:
+        return self.started_at is None and not self.future.done()
+
+
+class JobScheduler:
+    def __init__(self, workers: int, per_user: int, small_rows: int, sec_per_row: float):
+        self.workers = max(1, workers)
+        self.per_user = max(1, per_user)
+        self.small_rows = small_rows
+        self.sec_per_row = sec_per_row  # tamamlanan işlerle güncellenir (EWMA)
+        self._lanes: Dict[str, Dict[int, Deque[Ticket]]] = {lane: {} for lane in LANES}
+        self._vtime: Dict[str, Dict[int, float]] = {lane: {} for lane in LANES}
+        self._clock: Dict[str, float] = {lane: 0.0 for lane in LANES}  # son başlatılan işin sanal zamanı
+        self._running: Dict[int, Ticket] = {}  # seq -> ticket
+        self._in_flight: Dict[int, int] = {}   # user_id -> çalışan iş sayısı
+        self._tasks = set()
+
+    # ---- kuyruğa alma ----
+    def lane_for(self, rows: int, admin: bool) -> str:
+        if admin:
+            return "admin"
+        return "small" if rows < self.small_rows else "normal"
+
+    def submit(self, user_id: int, rows: int, factory: Callable[[Ticket], Awaitable[Any]], admin: bool = False) -> Ticket:
+        """İşi sıraya koyar; uygun işçi varsa hemen başlatır"""
+        lane = self.lane_for(rows, admin)
+        ticket = Ticket(user_id, max(rows, 0), lane, factory)
+        ticket.future = asyncio.get_running_loop().create_future()
+
+        users = self._lanes[lane]
+        if user_id not in users:
+            users[user_id] = deque()
+            # Boşta kalmış kullanıcı şeridin sanal saatinden başlar (beklemediği süre için hak biriktirmez)
+            vtimes = self._vtime[lane]
+            vtimes[user_id] = max(vtimes.get(user_id, 0.0), self._clock[lane])
+        users[user_id].append(ticket)
+
+        logger.info(f"🗂️ İş sıraya alındı: kullanıcı {user_id}, {ticket.rows} satır, şerit {lane}")
+        self._dispatch()
+        ticket.queued = ticket.started_at is None
+        return ticket
+
+    # ---- seçim ----
+    def _cost(self, ticket: Ticket) -> float:
+        return float(max(ticket.rows, 1))
+
+    def _pick(self, vtimes: Dict[str, Dict[int, float]], in_flight: Dict[int, int],
+              lanes: Dict[str, Dict[int, Deque[Ticket]]]) -> Optional[Ticket]:
+        """Sıradaki işi seçer (limitini doldurmuş kullanıcılar atlanır)"""
+        for lane in LANES:
+            candidates = [
+                (vtimes[lane][user], queue[0].seq, user)
+                for user, queue in lanes[lane].items()
+                if queue and in_flight.get(user, 0) < self.per_user
+            ]
+            if candidates:
+                _, _, user = min(candidates)
+                return lanes[lane][user][0]
+        return None
+
+    def _dispatch(self):
+        while len(self._running) < self.workers:
+            ticket = self._pick(self._vtime, self._in_flight, self._lanes)
+            if ticket is None:
+                break
+            queue = self._lanes[ticket.lane][ticket.user_id]
+            queue.popleft()
+            if not queue:
+                del self._lanes[ticket.lane][ticket.user_id]
+            self._clock[ticket.lane] = self._vtime[ticket.lane][ticket.user_id]
+            self._vtime[ticket.lane][ticket.user_id] += self._cost(ticket)
+            self._start(ticket)
+        self._update_gauge()
+
+    def _start(self, ticket: Ticket):
+        ticket.started_at = time.monotonic()
+        self._running[ticket.seq] = ticket
+        self._in_flight[ticket.user_id] = self._in_flight.get(ticket.user_id, 0) + 1
+        waited = ticket.started_at - ticket.submitted_at
+        if waited >= 1:
+            logger.info(f"▶️ İş başladı: kullanıcı {ticket.user_id}, {waited:.0f} sn beklendi")
+        task = asyncio.create_task(self._run(ticket), name=f"job-{ticket.seq}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, ticket: Ticket):
+        try:
+            result = await ticket.factory(ticket)
+        except Exception as e:
+            logger.error(f"Zamanlanmış iş hatası (kullanıcı {ticket.user_id}): {e}", exc_info=True)
+            if not ticket.future.done():
+                ticket.future.set_exception(e)
+                ticket.future.exception()  # kimse beklemiyorsa uyarı üretmesin
+        else:
+            if not ticket.future.done():
+                ticket.future.set_result(result)
+        finally:
+            self._finish(ticket)
+
+    def _finish(self, ticket: Ticket):
+        elapsed = time.monotonic() - ticket.started_at
+        if ticket.rows >= RATE_MIN_ROWS:
+            self.sec_per_row = (1 - EWMA_ALPHA) * self.sec_per_row + EWMA_ALPHA * (elapsed / ticket.rows)
+        self._running.pop(ticket.seq, None)
+        remaining = self._in_flight.get(ticket.user_id, 1) - 1
+        if remaining:
+            self._in_flight[ticket.user_id] = remaining
+        else:
+            self._in_flight.pop(ticket.user_id, None)
+        self._dispatch()
+
+    # ---- durum ----
+    def estimate(self, rows: int) -> float:
+        return max(MIN_JOB_SECONDS, rows * self.sec_per_row)
+
+    def waiting_count(self) -> int:
+        return sum(len(queue) for users in self._lanes.values() for queue in users.values())
+
+    def _update_gauge(self):
+        QUEUE_DEPTH.set(self.waiting_count(), queue="jobs_waiting")
+
+    def queue_order(self) -> List[Ticket]:
+        """Bekleyen işlerin tahmini başlama sırası (seçimi kopya durum üzerinde taklit eder)"""
+        vtimes = {lane: dict(users) for lane, users in self._vtime.items()}
+        lanes = {lane: {user: deque(queue) for user, queue in users.items()} for lane, users in self._lanes.items()}
+        order = []
+        while True:
+            ticket = self._pick(vtimes, {}, lanes)
+            if ticket is None:
+                return order
+            queue = lanes[ticket.lane][ticket.user_id]
+            queue.popleft()
+            if not queue:
+                del lanes[ticket.lane][ticket.user_id]
+            vtimes[ticket.lane][ticket.user_id] += self._cost(ticket)
+            order.append(ticket)
+
+    def position(self, ticket: Ticket) -> int:
+        """1'den başlayan sıra numarası; başlamışsa 0"""
+        if not ticket.waiting:
+            return 0
+        for index, queued in enumerate(self.queue_order(), 1):
+            if queued is ticket:
+                return index
+        return 0
+
+    def eta(self, ticket: Ticket) -> float:
+        """Tahmini bekleme (sn): çalışan işlerin kalanı + öndeki işler, işçi sayısına bölünür"""
+        if not ticket.waiting:
+            return 0.0
+        now = time.monotonic()
+        work = sum(
+            max(0.0, self.estimate(running.rows) - (now - running.started_at))
+            for running in self._running.values()
+        )
+        for queued in self.queue_order():
+            if queued is ticket:
+                break
+            work += self.estimate(queued.rows)
+        return work / self.workers
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "running": len(self._running),
+            "waiting": self.waiting_count(),
+            "workers": self.workers,
+            "per_lane": {lane: sum(len(q) for q in users.values()) for lane, users in self._lanes.items()},
+            "sec_per_row": self.sec_per_row,
+        }
+
+
+def format_wait(seconds: float) -> str:
+    if seconds < 60:
+        return f"{max(1, round(seconds))} sn"
+    return f"{round(seconds / 60)} dk"
+
+
+def describe_ticket(ticket: Ticket) -> str:
+    """Kullanıcıya gösterilecek sıra mesajı"""
+    if not ticket.waiting:
+        return "⏳ Dosya işleniyor, lütfen bekleyin..."
+    return (
+        f"🕒 Dosyanız sıraya alındı.\n"
+        f"• Sıranız: {job_scheduler.position(ticket)}\n"
+        f"• Tahmini bekleme: ~{format_wait(job_scheduler.eta(ticket))}\n"
+        f"İşlem başlayınca ve bitince bilgilendirileceksiniz."
+    )
+
+
+job_scheduler = JobScheduler(
+    workers=config.JOB_WORKERS,
+    per_user=config.JOB_USER_LIMIT,
+    small_rows=config.SMALL_JOB_ROWS,
+    sec_per_row=config.JOB_SEC_PER_ROW,
+)
@@ -0,0 +1,205 @@
+# utils/smtp_health.py
+"""
+SMTP uç noktası (sunucu:port) sağlık takibi ve devre kesici
+
+Mailer her denemenin sonucunu buraya yazar; süreç boyunca tutulur:
+    - EWMA hata oranı ve başarılı gönderim süresi
+    - son başarılı port, ardışık hata sayısı
+
+ports = smtp_health.plan(account.health_key, account.ports) denenecek portları en iyiden
+başlayarak döner: önce son başarılı port, sonra hata oranı + gecikme puanı
+düşük olanlar. Eşitlikte config sırası korunur.
+
+Devre kesiciye sadece uç noktanın hataları yazılır (bağlantı, zaman aşımı,
+TLS, login; mailer.classify_error). Sunucunun mesajı veya alıcıyı reddetmesi
+(550 alıcı yok, 552 mesaj büyük ...) uç noktayı sağlıklı sayar: record_rejection.
+
+Devre kesici:
+    closed     normal; SMTP_BREAKER_THRESHOLD ardışık hatada open olur
+    open       port plan'a girmez (mesaj beklemeden diğer porta geçer);
+               SMTP_BREAKER_COOLDOWN sn sonra half_open
+    half_open  tek bir deneme (probe) geçer; başarılıysa closed, değilse
+               bekleme süresi ikiye katlanarak (en fazla SMTP_BREAKER_MAX_COOLDOWN)
+               tekrar open
+
+Bir hesabın tüm portlarının devresi açıksa mailer beklemeden sonraki hesaba
+geçer (utils/smtp_pool.py); hiçbir hesap uygun değilse hemen False döner ve
+outbox kurtarmayı bekler, teslimatların deneme hakkını harcamaz.
+Metrikler: kova_smtp_breaker_state{endpoint} (0 closed, 1 half_open, 2 open).
+"""
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from config import config
+from utils.logger import logger
+from utils.metrics import SMTP_BREAKER_STATE
+
+EWMA_ALPHA = 0.2
+STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+PROBE_TIMEOUT = 120  # sn; sonucu gelmeyen probe'dan sonra yeni probe'a izin verilir
+
+
+@dataclass
+class EndpointHealth:
+    endpoint: str
+    host: str
+    order: int  # config'deki sıra (eşitlikte)
+    state: str = "closed"
+    error_rate: float = 0.0  # EWMA, 0..1
+    latency: float = 0.0  # EWMA, başarılı gönderim süresi (sn)
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    cooldown: float = 0.0
+    open_until: float = 0.0
+    probing: bool = False
+    probe_started: float = 0.0
+    last_success_at: Optional[float] = None
+    last_error: Optional[str] = None
+
+    @property
+    def score(self) -> float:
+        """Küçük olan önce denenir (hata oranı baskın, gecikme eşitlik bozar)"""
+        return self.error_rate * 10 + self.latency
+
+
+class SMTPHealth:
+    def __init__(self, threshold: int, cooldown: float, max_cooldown: float):
+        self.threshold = max(1, threshold)
+        self.base_cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+        self._endpoints: Dict[str, EndpointHealth] = {}
+        self._last_success: Dict[str, str] = {}  # host -> endpoint
+
+    @staticmethod
+    def key(host: str, port: int) -> str:
+        return f"{host}:{port}"
+
+    def _get(self, host: str, port: int, order: int = 0) -> EndpointHealth:
+        endpoint = self.key(host, port)
+        health = self._endpoints.get(endpoint)
+        if health is None:
+            health = self._endpoints[endpoint] = EndpointHealth(endpoint, host, order)
+        return health
+
+    def _set_state(self, health: EndpointHealth, state: str):
+        if health.state != state:
+            health.state = state
+            SMTP_BREAKER_STATE.set(STATE_VALUES[state], endpoint=health.endpoint)
+
+    def _refresh(self, health: EndpointHealth, now: float):
+        if health.state == "open" and now >= health.open_until:
+            self._set_state(health, "half_open")
+            health.probing = False
+        elif health.probing and now - health.probe_started > PROBE_TIMEOUT:
+            health.probing = False  # sonucu yazılmadan biten (iptal edilen) probe
+
+    # ---- seçim ----
+    def plan(self, host: str, ports: List[int]) -> List[int]:
+        """Denenecek portlar, en iyiden başlayarak; devresi açık olanlar hariç"""
+        now = time.time()
+        candidates = []
+        for order, port in enumerate(ports):
+            health = self._get(host, port, order)
+            health.order = order
+            self._refresh(health, now)
+            if health.state == "open" or (health.state == "half_open" and health.probing):
+                continue
+            preferred = self._last_success.get(host) == health.endpoint
+            candidates.append((not preferred, health.score, order, port))
+        return [port for *_, port in sorted(candidates)]
+
+    def allow(self, host: str, port: int) -> bool:
+        """Bu porta şimdi deneme yapılabilir mi (half_open'da tek probe geçer)"""
+        health = self._get(host, port)
+        self._refresh(health, time.time())
+        if health.state == "open":
+            return False
+        if health.state == "half_open":
+            if health.probing:
+                return False
+            health.probing = True
+            health.probe_started = time.time()
+        return True
+
+    def is_open(self, host: str, port: int) -> bool:
+        return self._get(host, port).state == "open"
+
+    def available(self, host: str, ports: List[int]) -> bool:
+        return bool(self.plan(host, ports))
+
+    def retry_after(self, host: str, ports: List[int]) -> float:
+        """Tüm devreler açıksa ilk half_open'a kalan süre (sn), değilse 0"""
+        if self.available(host, ports):
+            return 0.0
+        now = time.time()
+        waits = [
+            self._get(host, port).open_until - now
+            for port in ports if self._get(host, port).state == "open"
+        ]
+        # half_open probe sürüyorsa kısa bir bekleme yeter
+        return max(1.0, min(waits)) if waits else 1.0
+
+    # ---- sonuçlar ----
+    def record_success(self, host: str, port: int, seconds: float):
+        health = self._get(host, port)
+        health.successes += 1
+        health.consecutive_failures = 0
+        health.error_rate = (1 - EWMA_ALPHA) * health.error_rate
+        health.latency = seconds if health.successes == 1 else (1 - EWMA_ALPHA) * health.latency + EWMA_ALPHA * seconds
+        health.last_success_at = time.time()
+        health.probing = False
+        health.cooldown = 0.0
+        if health.state != "closed":
+            logger.info(f"🟢 SMTP devresi kapandı: {health.endpoint}")
+        self._set_state(health, "closed")
+        self._last_success[host] = health.endpoint
+
+    def record_rejection(self, host: str, port: int):
+        """Sunucu yanıt verdi ama mesajı reddetti: ardışık hata sıfırlanır, probe başarılı sayılır"""
+        health = self._get(host, port)
+        health.consecutive_failures = 0
+        health.probing = False
+        if health.state == "half_open":
+            health.cooldown = 0.0
+            logger.info(f"🟢 SMTP devresi kapandı: {health.endpoint}")
+            self._set_state(health, "closed")
+
+    def record_failure(self, host: str, port: int, error: str):
+        health = self._get(host, port)
+        health.failures += 1
+        health.consecutive_failures += 1
+        health.error_rate = (1 - EWMA_ALPHA) * health.error_rate + EWMA_ALPHA
+        health.last_error = error
+        if health.state == "open":
+            return  # devre açılmadan önce başlamış denemeler süreyi uzatmaz
+        if health.state == "half_open" or health.consecutive_failures >= self.threshold:
+            self._open(health)
+
+    def _open(self, health: EndpointHealth):
+        health.cooldown = min(self.max_cooldown, health.cooldown * 2 if health.cooldown else self.base_cooldown)
+        health.open_until = time.time() + health.cooldown
+        health.probing = False
+        if self._last_success.get(health.host) == health.endpoint:
+            del self._last_success[health.host]
+        if health.state != "open":
+            logger.warning(
+                f"🔴 SMTP devresi açıldı: {health.endpoint} "
+                f"({health.consecutive_failures} ardışık hata, {health.cooldown:.0f} sn): {health.last_error}"
+            )
+        self._set_state(health, "open")
+
+    # ---- durum ----
+    def snapshot(self) -> List[EndpointHealth]:
+        now = time.time()
+        for health in self._endpoints.values():
+            self._refresh(health, now)
+        return sorted(self._endpoints.values(), key=lambda health: (health.host, health.order))
+
+
+smtp_health = SMTPHealth(
+    threshold=config.SMTP_BREAKER_THRESHOLD,
+    cooldown=config.SMTP_BREAKER_COOLDOWN,
+    max_cooldown=config.SMTP_BREAKER_MAX_COOLDOWN,
+)
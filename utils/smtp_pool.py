@@ -0,0 +1,231 @@
+# utils/smtp_pool.py
+"""
+SMTP hesap havuzu (birden fazla hesap / sunucu, ağırlık ve kota ile)
+
+SMTP_ACCOUNTS (JSON liste) verilmişse mailer gönderimleri bu hesaplara dağıtır:
+
+    SMTP_ACCOUNTS='[
+        {"name": "gmail1", "server": "smtp.gmail.com", "username": "a@gmail.com",
+         "password": "...", "weight": 2, "daily_limit": 500, "per_minute": 20},
+        {"name": "yandex", "server": "smtp.yandex.com", "username": "b@yandex.com",
+         "password": "...", "daily_limit": 300}
+    ]'
+
+    İsteğe bağlı alanlar: ports (varsayılan SMTP_PORTS kuralı), security
+    (varsayılan SMTP_SECURITY), weight (1), daily_limit / per_minute (0 = sınırsız).
+
+Verilmemişse SMTP_SERVER / SMTP_USERNAME / SMTP_PASSWORD / SMTP_PORTS tek bir
+"default" hesaptır; SMTP_DAILY_LIMIT ve SMTP_PER_MINUTE bu hesaba uygulanır.
+
+- Seçim: kotası ve dakika penceresi dolmamış, en az bir portunun devresi
+  kapalı (utils/smtp_health.py) hesaplar arasından ağırlık × kalan kota
+  oranıyla rastgele. Hesap başarısız olursa mailer sıradakine geçer.
+- Günlük kullanım job_store'da (smtp_usage) sunucu + kullanıcı adına göre
+  tutulur (hesap adı değişse de sayaç korunur, farklı sunucuya yönlendirilen
+  gönderimler gerçek hesabın kotasına yazılmaz); yeniden başlatmada sıfırlanmaz.
+- Seçilen hesap gönderim bitene kadar bir kota birimi ayırır (eşzamanlı
+  gönderimler kotayı aşmaz).
+"""
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Deque, Dict, List, Optional, Set
+
+from config import config
+from utils import json_codec
+from utils.job_store import job_store
+from utils.logger import logger
+from utils.smtp_health import smtp_health
+
+
+@dataclass
+class SMTPAccount:
+    name: str
+    server: str
+    username: str
+    password: str
+    ports: List[int]
+    security: str
+    weight: float = 1.0
+    daily_limit: int = 0  # 0 = sınırsız
+    per_minute: int = 0  # 0 = sınırsız
+
+    @property
+    def health_key(self) -> str:
+        """smtp_health anahtarı: aynı sunucudaki iki hesabın devresi ayrı tutulur"""
+        return self.server if self.name == "default" else f"{self.name}@{self.server}"
+
+    @property
+    def usage_key(self) -> str:
+        """Günlük kullanım anahtarı: kota sunucudaki kullanıcıya aittir"""
+        return f"{self.server}:{self.username}"
+
+
+@dataclass
+class AccountUsage:
+    day: str = ""
+    sent: int = 0
+    reserved: int = 0  # seçilmiş, sonucu beklenen gönderimler
+    recent: Deque[float] = field(default_factory=deque)  # son 60 sn'deki seçimler
+
+
+def default_ports(server: str) -> List[int]:
+    """config'deki SMTP_PORTS kuralı: Yandex sadece 465, diğerleri 465 + 587"""
+    return [465] if "yandex" in server.lower() else [465, 587]
+
+
+def parse_accounts(raw: str) -> List[SMTPAccount]:
+    """SMTP_ACCOUNTS JSON'unu hesap listesine çevirir (hatalı girişler atlanır)"""
+    try:
+        items = json_codec.loads(raw)
+    except json_codec.JSONDecodeError as e:
+        logger.error(f"❌ SMTP_ACCOUNTS okunamadı: {e}")
+        return []
+    if not isinstance(items, list):
+        logger.error("❌ SMTP_ACCOUNTS bir JSON liste olmalı")
+        return []
+
+    accounts = []
+    for index, item in enumerate(items, 1):
+        try:
+            server = item["server"]
+            accounts.append(SMTPAccount(
+                name=str(item.get("name") or f"hesap{index}"),
+                server=server,
+                username=item.get("username", ""),
+                password=item.get("password", ""),
+                ports=[int(port) for port in item.get("ports") or default_ports(server)],
+                security=str(item.get("security", config.SMTP_SECURITY)).lower(),
+                weight=max(float(item.get("weight", 1)), 0.0),
+                daily_limit=int(item.get("daily_limit", 0)),
+                per_minute=int(item.get("per_minute", 0)),
+            ))
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            logger.error(f"❌ SMTP_ACCOUNTS {index}. hesap geçersiz: {e}")
+    return accounts
+
+
+class SMTPPool:
+    def __init__(self):
+        self._parsed = (None, [])  # (ham JSON, hesaplar)
+        self._usage: Dict[str, AccountUsage] = {}
+        self._loaded_day: Optional[str] = None
+        self._stored: Dict[str, int] = {}  # günün kayıtlı sayaçları
+
+    def accounts(self) -> List[SMTPAccount]:
+        """Güncel hesaplar (benchmark'lar config'i çalışırken değiştirebilir)"""
+        raw = config.SMTP_ACCOUNTS.strip()
+        if raw:
+            if self._parsed[0] != raw:
+                self._parsed = (raw, parse_accounts(raw))
+            if self._parsed[1]:
+                return self._parsed[1]
+        return [SMTPAccount(
+            name="default",
+            server=config.SMTP_SERVER,
+            username=config.SMTP_USERNAME,
+            password=config.SMTP_PASSWORD,
+            ports=list(config.SMTP_PORTS),
+            security=config.SMTP_SECURITY,
+            daily_limit=config.SMTP_DAILY_LIMIT,
+            per_minute=config.SMTP_PER_MINUTE,
+        )]
+
+    # ---- kullanım ----
+    def usage(self, account: SMTPAccount) -> AccountUsage:
+        today = date.today().isoformat()
+        if self._loaded_day != today:
+            # Gün değişti (veya ilk kullanım): kayıtlı sayaçlar yüklenir
+            stored = job_store.smtp_usage(today)
+            for key, usage in self._usage.items():
+                usage.day, usage.sent = today, stored.get(key, 0)
+            self._loaded_day = today
+            self._stored = stored
+        usage = self._usage.get(account.usage_key)
+        if usage is None:
+            usage = self._usage[account.usage_key] = AccountUsage(today, self._stored.get(account.usage_key, 0))
+        now = time.monotonic()
+        while usage.recent and now - usage.recent[0] >= 60:
+            usage.recent.popleft()
+        return usage
+
+    def remaining(self, account: SMTPAccount) -> Optional[int]:
+        """Bugün kalan gönderim (sınırsızsa None)"""
+        if account.daily_limit <= 0:
+            return None
+        usage = self.usage(account)
+        return max(0, account.daily_limit - usage.sent - usage.reserved)
+
+    def _ready(self, account: SMTPAccount) -> bool:
+        remaining = self.remaining(account)
+        if remaining == 0:
+            return False
+        if account.per_minute > 0 and len(self.usage(account).recent) >= account.per_minute:
+            return False
+        return smtp_health.available(account.health_key, account.ports)
+
+    # ---- seçim ----
+    def acquire(self, exclude: Set[str] = frozenset()) -> Optional[SMTPAccount]:
+        """Gönderim için hesap seçer ve bir kota birimi ayırır; uygun hesap yoksa None"""
+        candidates, weights = [], []
+        for account in self.accounts():
+            if account.name in exclude or account.weight <= 0 or not self._ready(account):
+                continue
+            remaining = self.remaining(account)
+            ratio = 1.0 if remaining is None else remaining / account.daily_limit
+            candidates.append(account)
+            weights.append(account.weight * max(ratio, 0.01))
+        if not candidates:
+            return None
+
+        account = random.choices(candidates, weights=weights)[0]
+        usage = self.usage(account)
+        usage.reserved += 1
+        usage.recent.append(time.monotonic())
+        return account
+
+    def release(self, account: SMTPAccount, sent: bool):
+        """Ayrılan birimi bırakır; gönderildiyse günlük kullanıma yazar"""
+        usage = self.usage(account)
+        usage.reserved = max(0, usage.reserved - 1)
+        if sent:
+            usage.sent += 1
+            job_store.defer(job_store.add_smtp_usage, usage.day, account.usage_key)
+            if account.daily_limit and usage.sent >= account.daily_limit:
+                logger.warning(f"📮 SMTP hesabı günlük kotasını doldurdu: {account.name} ({account.daily_limit})")
+
+    def retry_after(self) -> float:
+        """Hiçbir hesap uygun değilse ilk uygun olacağı ana kalan süre (sn), değilse 0"""
+        waits = []
+        for account in self.accounts():
+            if account.weight <= 0:
+                continue
+            if self._ready(account):
+                return 0.0
+            usage = self.usage(account)
+            wait = smtp_health.retry_after(account.health_key, account.ports)
+            if account.per_minute > 0 and len(usage.recent) >= account.per_minute:
+                wait = max(wait, 60 - (time.monotonic() - usage.recent[0]))
+            if self.remaining(account) == 0:
+                midnight = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+                wait = max(wait, (midnight - datetime.now()).total_seconds())
+            waits.append(wait)
+        return max(1.0, min(waits)) if waits else 60.0
+
+    def snapshot(self) -> List[Dict]:
+        return [
+            {
+                "name": account.name,
+                "server": account.server,
+                "sent_today": self.usage(account).sent,
+                "daily_limit": account.daily_limit,
+                "weight": account.weight,
+                "ready": self._ready(account),
+            }
+            for account in self.accounts()
+        ]
+
+
+smtp_pool = SMTPPool()
@@ -0,0 +1,45 @@
+# utils/telegram_files.py
+"""
+Telegram dosya indirme yardımcısı
+
+Bulut Bot API: dosya HTTP üzerinden indirilir (20 MB sınırı).
+Local Bot API (telegram-bot-api --local): dosya zaten sunucunun diskindedir,
+HTTP ile tekrar indirilmez; hedefe hard link verilir (aynı disk) ya da kopyalanır.
+"""
+import asyncio
+import os
+import shutil
+from pathlib import Path
+
+from aiogram import Bot
+
+from utils.logger import logger
+
+
+def _link_or_copy(source: Path, destination: Path):
+    """Kaynağı hedefe hard link ile bağlar, olmazsa kopyalar"""
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    if destination.exists():
+        destination.unlink()
+    try:
+        os.link(source, destination)  # Sıfır kopya (aynı dosya sistemi)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+async def download_document(bot: Bot, file_id: str, destination: Path) -> Path:
+    """Telegram dosyasını destination yoluna getirir (local modda HTTP'siz)"""
+    file = await bot.get_file(file_id)
+    api = bot.session.api
+
+    if api.is_local:
+        source = Path(api.wrap_local_file.to_local(file.file_path))
+        if not source.exists():
+            raise FileNotFoundError(f"Local Bot API dosyası bulunamadı: {source}")
+
+        await asyncio.to_thread(_link_or_copy, source, destination)
+        logger.info(f"📥 Dosya local Bot API dizininden alındı: {destination.name}")
+        return destination
+
+    await bot.download_file(file.file_path, destination)
+    return destination
@@ -0,0 +1,144 @@
+# utils/update_queue.py
+"""
+Webhook update kuyruğu (hızlı onay)
+
+webhook_handler update'i doğrulayıp buraya bırakır ve Telegram'a hemen 200
+döner; işleyiciler (Excel işi dahil) arka plandaki worker'larda çalışır.
+Böylece Telegram yanıt beklerken zaman aşımına düşüp aynı update'i tekrar
+göndermez.
+
+- Update'ler sohbet (chat_id) bazında worker'lara dağıtılır: her worker'ın
+  kendi kuyruğu vardır ve aynı sohbetin update'leri hep aynı worker'da,
+  geliş sırasıyla işlenir (FSM durumu yarışmaz). Farklı sohbetler paralel
+  çalışır.
+- Kuyruk sınırlı (WEBHOOK_QUEUE_SIZE, worker'lara bölünür): doluysa offer()
+  "full" döner, handler 503 verir ve Telegram update'i daha sonra tekrar dener.
+- Son WEBHOOK_DEDUPE_SIZE update_id hatırlanır; tekrar gelenler atlanır.
+- Metrikler: kova_webhook_updates_total{result}, kova_queue_depth{queue="webhook"},
+  kova_webhook_queue_wait_seconds.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import List
+
+from config import config
+from utils.logger import logger
+from utils.metrics import QUEUE_DEPTH, WEBHOOK_UPDATES, WEBHOOK_QUEUE_WAIT
+
+QUEUED = "queued"
+DUPLICATE = "duplicate"
+FULL = "full"
+
+
+def shard_key(update: dict) -> int:
+    """Update'in sohbeti (yoksa gönderen, o da yoksa update_id)"""
+    for value in update.values():
+        if not isinstance(value, dict):
+            continue
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if chat and "id" in chat:
+            return chat["id"]
+        sender = value.get("from") or value.get("user")
+        if sender and "id" in sender:
+            return sender["id"]
+    return update.get("update_id") or 0
+
+
+class UpdateQueue:
+    def __init__(self, maxsize: int, workers: int, dedupe_size: int):
+        self.maxsize = maxsize
+        self.worker_count = workers
+        self.dedupe_size = dedupe_size
+        self._queues: List[asyncio.Queue] = []
+        self._seen: "OrderedDict[int, None]" = OrderedDict()
+        self._workers = []
+        self._bot = None
+        self._dp = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self, bot, dp):
+        """Worker'ları başlatır (event loop içinde çağrılmalı)"""
+        if self.running:
+            return
+        self._bot, self._dp = bot, dp
+        count = max(1, self.worker_count)
+        self._queues = [asyncio.Queue(maxsize=math.ceil(self.maxsize / count)) for _ in range(count)]
+        self._workers = [
+            asyncio.create_task(self._worker(queue), name=f"webhook-worker-{index}")
+            for index, queue in enumerate(self._queues)
+        ]
+        logger.info(f"📥 Webhook kuyruğu başlatıldı ({self.worker_count} worker, kapasite {self.maxsize})")
+
+    def _remember(self, update_id: int) -> bool:
+        """update_id yeni ise kaydeder ve True döner"""
+        if update_id in self._seen:
+            self._seen.move_to_end(update_id)
+            return False
+        self._seen[update_id] = None
+        if len(self._seen) > self.dedupe_size:
+            self._seen.popitem(last=False)
+        return True
+
+    def offer(self, update: dict) -> str:
+        """Update'i beklemeden kuyruğa koyar: QUEUED, DUPLICATE veya FULL"""
+        update_id = update.get("update_id")
+        if update_id is not None and update_id in self._seen:
+            self._seen.move_to_end(update_id)
+            WEBHOOK_UPDATES.inc(result=DUPLICATE)
+            return DUPLICATE
+
+        queue = self._queues[shard_key(update) % len(self._queues)]
+        try:
+            queue.put_nowait((time.perf_counter(), update))
+        except asyncio.QueueFull:
+            # Kaydedilmez: Telegram'ın tekrar denemesi işlenebilmeli
+            WEBHOOK_UPDATES.inc(result=FULL)
+            logger.warning(f"⚠️ Webhook kuyruğu dolu, update reddedildi: {update_id}")
+            return FULL
+
+        if update_id is not None:
+            self._remember(update_id)
+        WEBHOOK_UPDATES.inc(result=QUEUED)
+        QUEUE_DEPTH.set(self.depth(), queue="webhook")
+        return QUEUED
+
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def _worker(self, queue: asyncio.Queue):
+        """Tek kuyruğu (bir grup sohbet) sırayla işler"""
+        while True:
+            enqueued_at, update = await queue.get()
+            QUEUE_DEPTH.set(self.depth(), queue="webhook")
+            WEBHOOK_QUEUE_WAIT.observe(time.perf_counter() - enqueued_at)
+            try:
+                await self._dp.feed_webhook_update(self._bot, update)
+            except Exception as e:
+                logger.error(f"Webhook update işlenemedi ({update.get('update_id')}): {e}")
+            finally:
+                queue.task_done()
+
+    async def stop(self, timeout: float = 10.0):
+        """Kuyruktakileri en fazla timeout saniye işler, sonra worker'ları durdurur"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Webhook kuyruğunda {self.depth()} update işlenmeden kapatılıyor")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+update_queue = UpdateQueue(
+    maxsize=config.WEBHOOK_QUEUE_SIZE,
+    workers=config.WEBHOOK_WORKERS,
+    dedupe_size=config.WEBHOOK_DEDUPE_SIZE,
+)
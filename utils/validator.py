@@ -3,8 +3,6 @@
 "TARİH", "İL" doğrulaması yapar
 
 """
-from openpyxl import load_workbook
-from openpyxl.utils import get_column_letter
 from typing import Dict, Any
 from utils.logger import logger
 
@@ -12,9 +10,14 @@ def validate_excel_file(file_path: str) -> Dict[str, Any]:
     """
     Excel dosyasını doğrular
     """
+    from openpyxl import load_workbook  # ağır import: bot açılışını yavaşlatmasın
+    
     try:
         wb = load_workbook(filename=file_path, read_only=True)
         ws = wb.active
+        # Bazı üreticiler (write_only openpyxl dahil) <dimension> yazmaz
+        if ws.max_row is None or ws.max_column is None:
+            ws.calculate_dimension(force=True)
         
         # Başlık satırını al
         headers = []
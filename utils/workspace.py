@@ -0,0 +1,138 @@
+# utils/workspace.py
+"""
+İş çalışma alanları (eşzamanlı işlerde dosya yolu çakışmasını önler)
+
+Her iş kendi dizinlerini kullanır:
+    data/input/<job_id>/     indirilen dosya (iş bitince saklanır)
+    data/output/<job_id>/    grup dosyaları (iş bitince saklanır)
+    data/scratch/<job_id>/   temizlenmiş ara dosya, spill, ZIP (iş bitince silinir)
+
+    with JobWorkspace.create("process") as workspace:
+        path = workspace.input_path(file_name)
+        ...
+        workspace.discard()  # doğrulama hatası gibi durumlarda tüm dosyaları siler
+
+Aynı dakikada çalışan iki iş aynı grup dosya adını üretse bile dosyalar ayrı
+dizinlerdedir. Açık çalışma alanları kayıtlıdır (active_workspaces); temizlik
+komutları bunların dosyalarına dokunmaz.
+"""
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from config import config
+from utils.logger import logger
+
+_active: Dict[str, "JobWorkspace"] = {}
+
+
+class JobWorkspace:
+    def __init__(self, job_id: str, kind: str):
+        self.job_id = job_id
+        self.kind = kind
+        self.created_at = time.time()
+        self.input_dir = config.INPUT_DIR / job_id
+        self.output_dir = config.OUTPUT_DIR / job_id
+        self.scratch_dir = config.SCRATCH_DIR / job_id
+        self.closed = False
+
+    @classmethod
+    def create(cls, kind: str, job_id: Optional[str] = None) -> "JobWorkspace":
+        """Yeni çalışma alanı açar ve kaydeder"""
+        from utils.job_store import new_job_id
+
+        workspace = cls(job_id or new_job_id(), kind)
+        _active[workspace.job_id] = workspace
+        return workspace
+
+    def __enter__(self) -> "JobWorkspace":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _unique(directory: Path, name: str) -> Path:
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / name
+        counter = 2
+        while path.exists():
+            path = directory / f"{Path(name).stem}_{counter}{Path(name).suffix}"
+            counter += 1
+        return path
+
+    def input_path(self, file_name: str) -> Path:
+        """Yüklenen dosyanın yolu (dizin kısmı atılır)"""
+        return self._unique(self.input_dir, Path(file_name).name)
+
+    def output_path(self, file_name: str) -> Path:
+        """Çıktı dosyası yolu; iş içinde aynı ad varsa _2, _3 eklenir"""
+        return self._unique(self.output_dir, file_name)
+
+    def scratch_path(self, file_name: str) -> Path:
+        """İş bitince silinecek ara dosya yolu"""
+        return self._unique(self.scratch_dir, file_name)
+
+    def owns(self, path: Path) -> bool:
+        """Yol bu çalışma alanının dizinlerinden birinde mi"""
+        path = Path(path)
+        return any(
+            path == directory or directory in path.parents
+            for directory in (self.input_dir, self.output_dir, self.scratch_dir)
+        )
+
+    def discard(self):
+        """Girdi ve çıktılar dahil tüm dosyaları siler"""
+        for directory in (self.input_dir, self.output_dir):
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def close(self):
+        """Ara dosyaları siler, boş kalan dizinleri kaldırır, kaydı düşer"""
+        if self.closed:
+            return
+        self.closed = True
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+        for directory in (self.input_dir, self.output_dir):
+            try:
+                directory.rmdir()  # sadece boşsa
+            except OSError:
+                pass
+        _active.pop(self.job_id, None)
+
+
+def active_workspaces() -> List[JobWorkspace]:
+    return list(_active.values())
+
+
+def active_ids() -> set:
+    """Açık işlerin kimlikleri (kopya; başka thread'den okunabilir)"""
+    return set(list(_active))
+
+
+def is_active_path(path: Path) -> bool:
+    """Yol açık bir çalışma alanına mı ait"""
+    return any(workspace.owns(path) for workspace in _active.values())
+
+
+def iter_files(root: Path) -> Iterator[Path]:
+    """Kök altındaki dosyalar (iş alt dizinleri dahil), açık işlerinkiler hariç"""
+    if not root.exists():
+        return
+    for path in root.rglob("*"):
+        if path.is_file() and not is_active_path(path):
+            yield path
+
+
+def clear_stale_scratch():
+    """Önceki çalışmadan kalan ara dosyaları siler (açılışta)"""
+    if not config.SCRATCH_DIR.exists():
+        return
+    for directory in config.SCRATCH_DIR.iterdir():
+        if directory.name in _active:
+            continue
+        if directory.is_dir():
+            shutil.rmtree(directory, ignore_errors=True)
+        else:
+            directory.unlink(missing_ok=True)
+        logger.info(f"🧹 Eski ara dosya silindi: {directory.name}")